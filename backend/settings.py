@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 REACT_APP_DIR = BASE_DIR / 'deltad_loc' / 'build'
@@ -48,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.metricas.MetricasMiddleware',
+    'main.replicas.FixacaoPrimarioMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -88,6 +93,44 @@ DATABASES = {
     }
 }
 
+# Réplica de leitura para relatórios e listagens (main/replicas.py), ativada pela variável
+# DELTAD_DB_REPLICA. Para testar localmente, aponte para um segundo arquivo SQLite e
+# atualize-o com `python manage.py copiar_replica`
+if os.environ.get('DELTAD_DB_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['DELTAD_DB_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['main.replicas.ReplicaRouter']
+
+# Segundos em que as leituras de quem acabou de gravar continuam no banco principal
+# (tempo máximo esperado para a réplica receber a gravação)
+REPLICA_FIXACAO_SEGUNDOS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'deltad-loc',
+    }
+}
+
+# Cache com as versões usadas para invalidar as respostas em cache (main/versoes.py).
+# O LocMemCache é de cada processo: com mais de um processo servindo a API, as
+# versões precisam de um cache compartilhado, por exemplo um alias 'versoes' com
+# {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': BASE_DIR / 'cache'}
+VERSOES_CACHE = 'default'
+
+
+# Métricas por requisição (main/metricas.py)
+# Consultas SQL mais demoradas que este limite (em ms) são registradas no log
+# 'main.metricas' com a view e a origem no código; None desliga o log
+METRICAS_CONSULTA_LENTA_MS = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -163,3 +206,8 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# Idempotency-Key torna seguras as repetições de criação de locações, devoluções e ajustes de estoque;
+# If-Match/ETag levam a versão de peças e locações (controle de concorrência otimista)
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'if-match')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'ETag']
@@ -3,10 +3,12 @@ from django.urls import path, re_path, include
 from django.views.static import serve
 from rest_framework.routers import DefaultRouter
 from main.views import IndexView
+from main import views_async
+from main.metricas import metricas
 from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from main.controller import TipoPecaViewSet, PecaViewSet, ClienteViewSet, LocacaoViewSet, ItemLocacaoViewSet, MovimentacaoEstoqueViewSet
+from main.controller import TipoPecaViewSet, PecaViewSet, ClienteViewSet, LocacaoViewSet, ItemLocacaoViewSet, MovimentacaoEstoqueViewSet, DashboardViewSet, DisponibilidadeViewSet
 
 router = DefaultRouter()
 router.register(r'tipos-peca', TipoPecaViewSet, basename='tipopeca')
@@ -15,9 +17,19 @@ router.register(r'clientes', ClienteViewSet, basename='cliente')
 router.register(r'locacoes', LocacaoViewSet, basename='locacao')
 router.register(r'itens-locacao', ItemLocacaoViewSet, basename='itemlocacao')
 router.register(r'movimentacoes', MovimentacaoEstoqueViewSet, basename='movimentacaoestoque')
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'disponibilidade', DisponibilidadeViewSet, basename='disponibilidade')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/_metrics', metricas, name='metricas'),
+    path('api/async/tipos-peca/estatisticas/', views_async.estatisticas_tipos, name='async-tipopeca-estatisticas'),
+    path('api/async/pecas/relatorio_estoque/', views_async.relatorio_estoque, name='async-peca-relatorio-estoque'),
+    path('api/async/locacoes/relatorio_financeiro/', views_async.relatorio_financeiro,
+         name='async-locacao-relatorio-financeiro'),
+    path('api/async/movimentacoes/relatorio_movimentacoes/', views_async.relatorio_movimentacoes,
+         name='async-movimentacaoestoque-relatorio-movimentacoes'),
+    path('api/async/dashboard/', views_async.dashboard, name='async-dashboard'),
     path('api/', include(router.urls)),
     path('api-auth/', include('rest_framework.urls')),
     path('favicon.ico', serve, {'document_root': settings.REACT_APP_DIR, 'path': 'favicon.ico'}),
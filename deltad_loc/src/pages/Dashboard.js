@@ -21,12 +21,7 @@ import {
   Assignment as AssignmentIcon,
   Warning as WarningIcon,
 } from '@mui/icons-material';
-import {
-  pecasService,
-  clientesService,
-  locacoesService,
-  tiposPecaService,
-} from '../services/api';
+import { dashboardService } from '../services/api';
 import { formatCurrency, formatDate, getStatusColor } from '../utils/helpers';
 import Loading from '../components/Loading';
 
@@ -64,15 +59,7 @@ const StatCard = ({ title, value, icon, color = 'primary', trend = null }) => (
 
 const Dashboard = () => {
   const [loading, setLoading] = useState(true);
-  const [data, setData] = useState({
-    estoque: null,
-    locacoes: null,
-    clientes: null,
-    tipos: null,
-    baixoEstoque: null,
-    vencidas: null,
-    relatorioFinanceiro: null,
-  });
+  const [data, setData] = useState({});
 
   useEffect(() => {
     loadDashboardData();
@@ -81,34 +68,8 @@ const Dashboard = () => {
   const loadDashboardData = async () => {
     try {
       setLoading(true);
-      
-      const [
-        estoqueData,
-        locacoesAtivas,
-        clientesData,
-        tiposData,
-        baixoEstoque,
-        vencidas,
-        relatorioFinanceiro,
-      ] = await Promise.all([
-        pecasService.getRelatorioEstoque(),
-        locacoesService.getAtivas(),
-        clientesService.getAll(),
-        tiposPecaService.getEstatisticas(),
-        pecasService.getBaixoEstoque(),
-        locacoesService.getVencidas(),
-        locacoesService.getRelatorioFinanceiro({ periodo: '30' }),
-      ]);
-
-      setData({
-        estoque: estoqueData.data,
-        locacoes: locacoesAtivas.data,
-        clientes: clientesData.data,
-        tipos: tiposData.data,
-        baixoEstoque: baixoEstoque.data,
-        vencidas: vencidas.data,
-        relatorioFinanceiro: relatorioFinanceiro.data,
-      });
+      const response = await dashboardService.get({ periodo: '30' });
+      setData(response.data);
     } catch (error) {
       console.error('Erro ao carregar dados do dashboard:', error);
     } finally {
@@ -139,7 +100,7 @@ const Dashboard = () => {
         <Grid item xs={12} sm={6} md={3}>
           <StatCard
             title="Locações Ativas"
-            value={data.locacoes?.length || 0}
+            value={data.locacoes_ativas || 0}
             icon={<AssignmentIcon fontSize="large" />}
             color="success"
           />
@@ -147,7 +108,7 @@ const Dashboard = () => {
         <Grid item xs={12} sm={6} md={3}>
           <StatCard
             title="Total de Clientes"
-            value={data.clientes?.count || 0}
+            value={data.total_clientes || 0}
             icon={<PeopleIcon fontSize="large" />}
             color="info"
           />
@@ -155,7 +116,7 @@ const Dashboard = () => {
         <Grid item xs={12} sm={6} md={3}>
           <StatCard
             title="Receita (30 dias)"
-            value={formatCurrency(data.relatorioFinanceiro?.receita_total)}
+            value={formatCurrency(data.financeiro?.receita_total)}
             icon={<TrendingUpIcon fontSize="large" />}
             color="warning"
           />
@@ -191,7 +152,7 @@ const Dashboard = () => {
         <Grid item xs={12} sm={6} md={3}>
           <StatCard
             title="Locações Vencidas"
-            value={data.vencidas?.length || 0}
+            value={data.locacoes_vencidas || 0}
             icon={<WarningIcon fontSize="large" />}
             color="error"
           />
@@ -200,14 +161,14 @@ const Dashboard = () => {
 
       <Grid container spacing={3}>
         {/* Alertas de estoque baixo */}
-        {data.baixoEstoque && data.baixoEstoque.length > 0 && (
+        {data.estoque_baixo && data.estoque_baixo.length > 0 && (
           <Grid item xs={12} md={6}>
             <Paper elevation={2} sx={{ p: 2 }}>
               <Typography variant="h6" gutterBottom color="error">
                 ⚠️ Peças com Estoque Baixo
               </Typography>
               <List dense>
-                {data.baixoEstoque.slice(0, 5).map((peca) => (
+                {data.estoque_baixo.slice(0, 5).map((peca) => (
                   <ListItem key={peca.id} divider>
                     <ListItemIcon>
                       <WarningIcon color="error" />
@@ -219,9 +180,9 @@ const Dashboard = () => {
                   </ListItem>
                 ))}
               </List>
-              {data.baixoEstoque.length > 5 && (
+              {data.estoque?.pecas_estoque_baixo > 5 && (
                 <Typography variant="body2" color="text.secondary" mt={1}>
-                  ... e mais {data.baixoEstoque.length - 5} peças
+                  ... e mais {data.estoque.pecas_estoque_baixo - 5} peças
                 </Typography>
               )}
             </Paper>
@@ -250,9 +211,9 @@ const Dashboard = () => {
                   </ListItem>
                 ))}
               </List>
-              {data.vencidas.length > 5 && (
+              {data.locacoes_vencidas > 5 && (
                 <Typography variant="body2" color="text.secondary" mt={1}>
-                  ... e mais {data.vencidas.length - 5} locações
+                  ... e mais {data.locacoes_vencidas - 5} locações
                 </Typography>
               )}
             </Paper>
@@ -270,7 +231,7 @@ const Dashboard = () => {
                 Receita Total
               </Typography>
               <Typography variant="h5" color="success.main">
-                {formatCurrency(data.relatorioFinanceiro?.receita_total)}
+                {formatCurrency(data.financeiro?.receita_total)}
               </Typography>
             </Box>
             <Box mb={2}>
@@ -278,10 +239,10 @@ const Dashboard = () => {
                 Total de Locações
               </Typography>
               <Typography variant="h6">
-                {data.relatorioFinanceiro?.total_locacoes || 0}
+                {data.financeiro?.total_locacoes || 0}
               </Typography>
             </Box>
-            {data.relatorioFinanceiro?.por_status?.map((status) => (
+            {data.financeiro?.por_status?.map((status) => (
               <Box key={status.status} display="flex" justifyContent="space-between" mb={1}>
                 <Typography variant="body2">
                   Status {status.status}: {status.count} locações
@@ -295,14 +256,14 @@ const Dashboard = () => {
         </Grid>
 
         {/* Tipos de peças mais populares */}
-        {data.tipos?.tipos_populares && data.tipos.tipos_populares.length > 0 && (
+        {data.tipos_populares && data.tipos_populares.length > 0 && (
           <Grid item xs={12} md={6}>
             <Paper elevation={2} sx={{ p: 2 }}>
               <Typography variant="h6" gutterBottom>
                 🏆 Tipos Mais Locados
               </Typography>
               <List dense>
-                {data.tipos.tipos_populares.slice(0, 5).map((tipo, index) => (
+                {data.tipos_populares.slice(0, 5).map((tipo, index) => (
                   <ListItem key={tipo.id} divider>
                     <ListItemText
                       primary={`${index + 1}º ${tipo.nome}`}
@@ -317,7 +278,7 @@ const Dashboard = () => {
       </Grid>
 
       {/* Alertas gerais */}
-      {(!data.baixoEstoque || data.baixoEstoque.length === 0) &&
+      {(!data.estoque_baixo || data.estoque_baixo.length === 0) &&
        (!data.vencidas || data.vencidas.length === 0) && (
         <Alert severity="success" sx={{ mt: 3 }}>
           ✅ Tudo funcionando perfeitamente! Não há alertas no momento.
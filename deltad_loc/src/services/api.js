@@ -23,6 +23,10 @@ api.interceptors.response.use(
   }
 );
 
+// Cabeçalho que torna segura a repetição de uma operação: reenvie com a mesma chave
+// (ex.: crypto.randomUUID() gerado antes da primeira tentativa) para não executá-la duas vezes
+const idempotente = (chave) => (chave ? { headers: { 'Idempotency-Key': chave } } : {});
+
 // Serviços para cada modelo
 export const tiposPecaService = {
   getAll: (params = {}) => api.get('/tipos-peca/', { params }),
@@ -41,7 +45,8 @@ export const pecasService = {
   delete: (id) => api.delete(`/pecas/${id}/`),
   getBaixoEstoque: () => api.get('/pecas/estoque_baixo/'),
   getRelatorioEstoque: () => api.get('/pecas/relatorio_estoque/'),
-  ajustarEstoque: (id, data) => api.post(`/pecas/${id}/ajustar_estoque/`, data),
+  ajustarEstoque: (id, data, chave) => api.post(`/pecas/${id}/ajustar_estoque/`, data, idempotente(chave)),
+  importar: (formData, params = {}) => api.post('/pecas/importar/', formData, { params }),
 };
 
 export const clientesService = {
@@ -52,18 +57,21 @@ export const clientesService = {
   delete: (id) => api.delete(`/clientes/${id}/`),
   getInadimplentes: () => api.get('/clientes/inadimplentes/'),
   getHistoricoLocacoes: (id) => api.get(`/clientes/${id}/historico_locacoes/`),
+  importar: (formData, params = {}) => api.post('/clientes/importar/', formData, { params }),
 };
 
 export const locacoesService = {
   getAll: (params = {}) => api.get('/locacoes/', { params }),
   getById: (id) => api.get(`/locacoes/${id}/`),
-  create: (data) => api.post('/locacoes/', data),
+  create: (data, chave) => api.post('/locacoes/', data, idempotente(chave)),
   update: (id, data) => api.put(`/locacoes/${id}/`, data),
   delete: (id) => api.delete(`/locacoes/${id}/`),
   getAtivas: () => api.get('/locacoes/ativas/'),
   getVencidas: () => api.get('/locacoes/vencidas/'),
-  finalizar: (id, data) => api.post(`/locacoes/${id}/finalizar/`, data),
+  finalizar: (id, data, chave) => api.post(`/locacoes/${id}/finalizar/`, data, idempotente(chave)),
+  finalizarLote: (data, chave) => api.post('/locacoes/finalizar_lote/', data, idempotente(chave)),
   getRelatorioFinanceiro: (params = {}) => api.get('/locacoes/relatorio_financeiro/', { params }),
+  exportar: (params = {}) => api.get('/locacoes/exportar/', { params, responseType: 'blob' }),
 };
 
 export const itensLocacaoService = {
@@ -81,6 +89,16 @@ export const movimentacoesService = {
   update: (id, data) => api.put(`/movimentacoes/${id}/`, data),
   delete: (id) => api.delete(`/movimentacoes/${id}/`),
   getRelatorio: (params = {}) => api.get('/movimentacoes/relatorio_movimentacoes/', { params }),
+  exportar: (params = {}) => api.get('/movimentacoes/exportar/', { params, responseType: 'blob' }),
+};
+
+export const dashboardService = {
+  get: (params = {}) => api.get('/dashboard/', { params }),
+};
+
+export const disponibilidadeService = {
+  get: (params = {}) => api.get('/disponibilidade/', { params }),
+  verificar: (data) => api.post('/disponibilidade/verificar/', data),
 };
 
 export default api;
\ No newline at end of file
@@ -1,54 +1,164 @@
-from django.contrib import admin
-from .models import TipoPeca, Peca, Cliente, Locacao, ItemLocacao, MovimentacaoEstoque
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import TipoPeca, Peca, Cliente, Locacao, ItemLocacao, MovimentacaoEstoque, DescontoVolume
+from .operacoes import ajustar_estoque, finalizar_locacoes
+
+
+# Abaixo disto o COUNT(*) é barato e a listagem mostra o total exato
+LIMITE_CONTAGEM_EXATA = 10000
+
+
+def estimar_linhas(queryset):
+    """
+    Número aproximado de linhas da tabela, lido das estatísticas do banco
+    (pg_class no PostgreSQL; sqlite_stat1, gerada pelo ANALYZE, no SQLite).
+    Retorna None para consultas filtradas ou quando não há estatísticas.
+    """
+    if queryset.query.where:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    elif connection.vendor == 'sqlite':
+        # A primeira coluna de stat é o número de linhas do índice (os parciais têm menos)
+        sql = 'SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [queryset.model._meta.db_table])
+            linha = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return linha[0] if linha and linha[0] and linha[0] > 0 else None
+
+
+class ContagemEstimadaPaginator(Paginator):
+    """
+    Paginador das listagens do admin: sem filtros, as tabelas grandes são
+    contadas pela estimativa do banco em vez de um COUNT(*) completo
+    """
+
+    @cached_property
+    def count(self):
+        estimativa = estimar_linhas(self.object_list)
+        if estimativa is None or estimativa < LIMITE_CONTAGEM_EXATA:
+            return super().count
+        return estimativa
+
+
+class TabelaGrandeAdmin(admin.ModelAdmin):
+    """
+    Admin de tabela grande: contagem estimada, sem o segundo COUNT(*) do total
+    sem filtros e sem as contagens por opção dos filtros
+    """
+    paginator = ContagemEstimadaPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+class AjusteEstoqueForm(ActionForm):
+    quantidade = forms.IntegerField(required=False, label='Quantidade')
 
 
 @admin.register(TipoPeca)
 class TipoPecaAdmin(admin.ModelAdmin):
-    list_display = ['nome', 'valor_locacao', 'created_at']
+    list_display = ['nome', 'valor_locacao', 'valor_diaria', 'valor_semanal', 'valor_mensal', 'created_at']
     list_filter = ['created_at']
     search_fields = ['nome', 'descricao']
     ordering = ['nome']
 
 
+@admin.register(DescontoVolume)
+class DescontoVolumeAdmin(admin.ModelAdmin):
+    list_display = ['quantidade_minima', 'percentual']
+    ordering = ['quantidade_minima']
+
+
 @admin.register(Peca)
-class PecaAdmin(admin.ModelAdmin):
+class PecaAdmin(TabelaGrandeAdmin):
     list_display = ['codigo', 'tipo_peca', 'quantidade_total', 'quantidade_disponivel', 'quantidade_locada']
-    list_filter = ['tipo_peca', 'created_at']
+    list_filter = ['tipo_peca']
+    list_select_related = ['tipo_peca']
     search_fields = ['codigo', 'tipo_peca__nome']
-    ordering = ['tipo_peca__nome', 'codigo']
-    readonly_fields = ['created_at', 'updated_at']
+    # Índice único do código (ordenar pelo nome do tipo exigiria juntar e ordenar a tabela toda)
+    ordering = ['codigo']
+    readonly_fields = ['created_at', 'updated_at', 'versao']
+    autocomplete_fields = ['tipo_peca']
+    action_form = AjusteEstoqueForm
+    actions = ['ajustar_estoque']
+
+    def get_queryset(self, request):
+        # O tipo aparece no __str__ da peça, usado nos resultados do autocomplete
+        return super().get_queryset(request).select_related('tipo_peca')
+
+    @admin.action(description='Somar a quantidade informada ao estoque das peças selecionadas', permissions=['change'])
+    def ajustar_estoque(self, request, queryset):
+        try:
+            diferenca = int(request.POST.get('quantidade'))
+        except (TypeError, ValueError):
+            self.message_user(request, 'Informe a quantidade a somar (negativa para retirar).', messages.ERROR)
+            return
+        ajustadas = ajustar_estoque(queryset.values('pk'), diferenca, request.user)
+        self.message_user(request, f'Estoque ajustado em {len(ajustadas)} peças.', messages.SUCCESS)
 
 
 @admin.register(Cliente)
-class ClienteAdmin(admin.ModelAdmin):
+class ClienteAdmin(TabelaGrandeAdmin):
     list_display = ['nome', 'cpf_cnpj', 'tipo_pessoa', 'status', 'cidade', 'estado']
-    list_filter = ['tipo_pessoa', 'status', 'estado', 'created_at']
+    list_filter = ['tipo_pessoa', 'status', 'estado']
     search_fields = ['nome', 'cpf_cnpj', 'email', 'telefone']
     ordering = ['nome']
     readonly_fields = ['created_at', 'updated_at']
 
 
 @admin.register(Locacao)
-class LocacaoAdmin(admin.ModelAdmin):
+class LocacaoAdmin(TabelaGrandeAdmin):
     list_display = ['numero_locacao', 'cliente', 'data_locacao', 'data_previsao_devolucao', 'status', 'valor_final']
-    list_filter = ['status', 'data_locacao', 'created_at']
+    list_filter = ['status', 'vencida']
+    list_select_related = ['cliente']
+    date_hierarchy = 'data_locacao'
     search_fields = ['numero_locacao', 'cliente__nome']
     ordering = ['-data_locacao', '-numero_locacao']
-    readonly_fields = ['created_at', 'updated_at', 'valor_final']
+    readonly_fields = ['created_at', 'updated_at', 'valor_final', 'versao']
+    autocomplete_fields = ['cliente']
+    actions = ['finalizar']
+
+    def get_queryset(self, request):
+        # O cliente aparece no __str__ da locação, usado nos resultados do autocomplete
+        return super().get_queryset(request).select_related('cliente')
+
+    @admin.action(description='Finalizar as locações ativas selecionadas', permissions=['change'])
+    def finalizar(self, request, queryset):
+        finalizadas = finalizar_locacoes(queryset.values('pk'), timezone.now().date(), request.user)
+        self.message_user(request, f'{len(finalizadas)} locações finalizadas.', messages.SUCCESS)
 
 
 @admin.register(ItemLocacao)
-class ItemLocacaoAdmin(admin.ModelAdmin):
+class ItemLocacaoAdmin(TabelaGrandeAdmin):
     list_display = ['locacao', 'peca', 'quantidade', 'valor_total_item']
     list_filter = ['locacao__status']
+    list_select_related = ['locacao__cliente', 'peca__tipo_peca']
     search_fields = ['locacao__numero_locacao', 'peca__codigo']
-    ordering = ['locacao__numero_locacao']
+    # Índice único (locacao, peca): as locações mais recentes primeiro, sem juntar para ordenar
+    ordering = ['-locacao_id', 'peca_id']
+    autocomplete_fields = ['locacao', 'peca']
 
 
 @admin.register(MovimentacaoEstoque)
-class MovimentacaoEstoqueAdmin(admin.ModelAdmin):
+class MovimentacaoEstoqueAdmin(TabelaGrandeAdmin):
     list_display = ['peca', 'tipo_movimentacao', 'quantidade', 'data_movimentacao', 'usuario']
+    # Filtro de data por intervalo no índice; a hierarquia de datas agruparia a tabela toda por ano
     list_filter = ['tipo_movimentacao', 'data_movimentacao']
+    list_select_related = ['peca__tipo_peca', 'usuario']
     search_fields = ['peca__codigo', 'motivo']
-    ordering = ['-data_movimentacao']
+    ordering = ['-data_movimentacao', '-id']
     readonly_fields = ['data_movimentacao']
+    autocomplete_fields = ['peca', 'locacao']
+    raw_id_fields = ['usuario']
@@ -0,0 +1,117 @@
+"""
+Arquivamento do histórico: move as locações finalizadas/canceladas (com os
+itens e as movimentações) e os ajustes de estoque mais antigos que o prazo de
+retenção para as tabelas de arquivo, mantendo pequenas as tabelas usadas no
+dia a dia (ativas, vencidas, disponibilidade, extratos).
+
+Os registros mantêm os ids e números originais. Os resumos diários não são
+alterados (os relatórios continuam contando o histórico arquivado) e as
+leituras que precisam do histórico completo somam as tabelas de arquivo:
+historico_locacoes, tipos mais locados, conciliação do estoque e a
+reconstrução dos resumos.
+
+Deve ser agendado fora do horário de pico (comando `arquivar_historico`);
+cada lote é movido em uma transação própria.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Locacao, ItemLocacao, MovimentacaoEstoque, LocacaoArquivada, ItemLocacaoArquivado, MovimentacaoArquivada
+)
+from .search import get_backend
+from .signals import exclusao_em_lote
+from .versoes import incrementar_versao
+
+
+# Locações encerradas e ajustes mais antigos que isto vão para o arquivo
+RETENCAO_DIAS = 365
+
+# Locações (ou movimentações sem locação) movidas por transação
+LOTE_ARQUIVAMENTO = 1000
+
+
+def _campos(model_arquivo):
+    """
+    Colunas copiadas da tabela de origem (todas as do arquivo, exceto a data de arquivamento)
+    """
+    return [campo.attname for campo in model_arquivo._meta.concrete_fields if campo.name != 'arquivada_em']
+
+
+def _mover(queryset, model_arquivo):
+    """
+    Copia as linhas para o arquivo e as apaga da origem. A exclusão ignora os
+    receptores de post_delete, que retirariam os registros dos resumos diários.
+    """
+    linhas = [model_arquivo(**linha) for linha in queryset.order_by().values(*_campos(model_arquivo))]
+    model_arquivo.objects.bulk_create(linhas, batch_size=LOTE_ARQUIVAMENTO)
+    with exclusao_em_lote():
+        queryset.model.objects.filter(pk__in=[linha.pk for linha in linhas]).delete()
+    return len(linhas)
+
+
+def locacoes_arquivaveis(limite):
+    """
+    Locações encerradas antes da data limite (as canceladas pela data prevista de devolução)
+    """
+    return Locacao.objects.filter(
+        Q(data_devolucao__isnull=True) | Q(data_devolucao__lt=limite),
+        status__in=('F', 'C'),
+        data_previsao_devolucao__lt=limite,
+    )
+
+
+@transaction.atomic
+def _arquivar_lote_locacoes(limite, lote):
+    ids = list(locacoes_arquivaveis(limite).order_by('pk').values_list('pk', flat=True)[:lote])
+    if not ids:
+        return 0, 0, 0
+    # Ordem das chaves estrangeiras: o arquivo recebe a locação antes dos itens,
+    # e a origem perde os itens e as movimentações antes da locação
+    locacoes = LocacaoArquivada.objects.bulk_create([
+        LocacaoArquivada(**linha)
+        for linha in Locacao.objects.filter(pk__in=ids).order_by().values(*_campos(LocacaoArquivada))
+    ], batch_size=LOTE_ARQUIVAMENTO)
+    itens = _mover(ItemLocacao.objects.filter(locacao_id__in=ids), ItemLocacaoArquivado)
+    movimentacoes = _mover(MovimentacaoEstoque.objects.filter(locacao_id__in=ids), MovimentacaoArquivada)
+    with exclusao_em_lote():
+        Locacao.objects.filter(pk__in=ids).delete()
+    get_backend().remover(Locacao, ids)
+    incrementar_versao(Locacao, ItemLocacao)
+    return len(locacoes), itens, movimentacoes
+
+
+@transaction.atomic
+def _arquivar_lote_ajustes(limite, lote):
+    inicio_limite = timezone.make_aware(datetime.combine(limite, time.min))
+    ids = list(
+        MovimentacaoEstoque.objects.filter(
+            locacao__isnull=True, data_movimentacao__lt=inicio_limite
+        ).order_by('pk').values_list('pk', flat=True)[:lote]
+    )
+    return _mover(MovimentacaoEstoque.objects.filter(pk__in=ids), MovimentacaoArquivada) if ids else 0
+
+
+def arquivar(dias=RETENCAO_DIAS, lote=LOTE_ARQUIVAMENTO, hoje=None):
+    """
+    Move para o arquivo, em lotes, o que ficou fora do prazo de retenção.
+    Retorna a quantidade de registros arquivados de cada tipo.
+    """
+    limite = (hoje or timezone.now().date()) - timedelta(days=dias)
+    totais = {'locacoes': 0, 'itens': 0, 'movimentacoes': 0}
+
+    while True:
+        locacoes, itens, movimentacoes = _arquivar_lote_locacoes(limite, lote)
+        if not locacoes:
+            break
+        totais['locacoes'] += locacoes
+        totais['itens'] += itens
+        totais['movimentacoes'] += movimentacoes
+
+    while ajustes := _arquivar_lote_ajustes(limite, lote):
+        totais['movimentacoes'] += ajustes
+
+    return totais
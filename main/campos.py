@@ -0,0 +1,196 @@
+"""
+Representações parciais: ?fields= escolhe os campos da resposta (com a notação
+`itens.peca_codigo` para os campos aninhados) e ?expand= inclui os campos
+aninhados marcados como expansíveis (Meta.expansiveis), que nas listagens só
+são serializados quando pedidos. A consulta é montada a partir dos campos que
+serão lidos: select_related, prefetch_related e only() acompanham a seleção.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def separar_lista(valor):
+    return {item.strip() for item in (valor or '').split(',') if item.strip()}
+
+
+class Selecao:
+    """
+    Campos pedidos (`campos`, None para todos) e campos aninhados a expandir
+    (`expandir`, None para todos) em um nível da representação
+    """
+
+    def __init__(self, campos=None, expandir=None):
+        self.campos = campos
+        self.expandir = expandir
+
+    def inclui(self, nome, expansivel):
+        if self.expandir is not None and nome in self.expandir:
+            return True
+        if self.campos is not None:
+            # Pedir um campo aninhado (itens ou itens.peca_codigo) também o expande
+            return nome in self.campos or any(campo.startswith(f'{nome}.') for campo in self.campos)
+        return not expansivel or self.expandir is None
+
+    def de(self, nome):
+        """
+        Seleção dos campos do serializer aninhado em `nome`
+        """
+        prefixo = f'{nome}.'
+        campos = None
+        if self.campos is not None:
+            campos = {campo[len(prefixo):] for campo in self.campos if campo.startswith(prefixo)} or None
+        expandir = None
+        if self.expandir is not None:
+            expandir = {campo[len(prefixo):] for campo in self.expandir if campo.startswith(prefixo)}
+        return Selecao(campos, expandir)
+
+
+class CamposDinamicosMixin:
+    """
+    Serializa apenas os campos da seleção recebida no contexto (`selecao`).
+    Sem seleção no contexto todos os campos são serializados, inclusive os expansíveis.
+    """
+
+    def selecao(self):
+        selecao = self.context.get('selecao')
+        if selecao is None:
+            return None
+        caminho = []
+        serializer = self
+        while serializer.parent is not None:
+            if serializer.field_name:
+                caminho.append(serializer.field_name)
+            serializer = serializer.parent
+        for nome in reversed(caminho):
+            selecao = selecao.de(nome)
+        return selecao
+
+    @property
+    def _readable_fields(self):
+        # Calculado uma vez por serializer (o filho de um many=True é reaproveitado em todas as linhas)
+        if not hasattr(self, '_campos_selecionados'):
+            selecao = self.selecao()
+            expansiveis = getattr(self.Meta, 'expansiveis', ())
+            self._campos_selecionados = [
+                campo for campo in super()._readable_fields
+                if selecao is None or selecao.inclui(campo.field_name, campo.field_name in expansiveis)
+            ]
+        return self._campos_selecionados
+
+
+def _dependencias(model, serializer):
+    """
+    Relações, prefetches, campos e anotações de que a representação depende.
+    `campos` é None quando algum campo não pode ser mapeado para colunas do modelo.
+    """
+    relacionados = set()
+    prefetches = []
+    campos = {model._meta.pk.name}
+    anotacoes = getattr(getattr(serializer, 'Meta', None), 'anotacoes', {})
+    metodos = []
+
+    for campo in serializer._readable_fields:
+        if campo.source == '*':
+            campos = None
+            continue
+
+        if isinstance(campo, serializers.ListSerializer):
+            relacao = model._meta.get_field(campo.source)
+            # A chave que liga cada item ao pai é sempre carregada
+            filhos = otimizar_queryset(
+                relacao.related_model._default_manager.all(), campo.child, campos_extras=(relacao.field.name,)
+            )
+            prefetches.append(Prefetch(campo.source, queryset=filhos))
+            continue
+
+        caminho = []
+        atual = model
+        try:
+            for atributo in campo.source_attrs[:-1]:
+                relacao = atual._meta.get_field(atributo)
+                if not (relacao.many_to_one or relacao.one_to_one) or not relacao.concrete:
+                    raise FieldDoesNotExist
+                caminho.append(atributo)
+                atual = relacao.related_model
+            final = atual._meta.get_field(campo.source_attrs[-1])
+            if not final.concrete:
+                raise FieldDoesNotExist
+        except FieldDoesNotExist:
+            if campo.source in anotacoes:
+                if anotacoes[campo.source] not in metodos:
+                    metodos.append(anotacoes[campo.source])
+            elif campos is not None:
+                campos = None
+            continue
+
+        if caminho:
+            relacionados.add('__'.join(caminho))
+        if campos is not None:
+            campos.update('__'.join(caminho[:i]) for i in range(1, len(caminho) + 1))
+            campos.add('__'.join(campo.source_attrs))
+
+    return relacionados, prefetches, campos, metodos
+
+
+def otimizar_queryset(queryset, serializer, restringir_colunas=True, campos_extras=()):
+    """
+    Acrescenta ao queryset os select_related, prefetch_related e anotações
+    (Meta.anotacoes: {'campo': 'método do queryset'}) que o serializer vai ler
+    e, quando a seleção restringe os campos, limita as colunas com only()
+    (mais `campos_extras`, lidos fora do serializer)
+    """
+    relacionados, prefetches, campos, metodos = _dependencias(queryset.model, serializer)
+    if relacionados:
+        queryset = queryset.select_related(*sorted(relacionados))
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    for metodo in metodos:
+        queryset = getattr(queryset, metodo)()
+    selecao = serializer.selecao() if isinstance(serializer, CamposDinamicosMixin) else None
+    if restringir_colunas and campos is not None and selecao is not None and selecao.campos is not None:
+        queryset = queryset.only(*sorted(campos), *campos_extras)
+    return queryset
+
+
+class CamposDinamicosViewMixin:
+    """
+    Lê ?fields= e ?expand= nas ações de `acoes_selecionaveis` e monta o
+    queryset conforme a representação pedida. Nas ações de detalhe os campos
+    expansíveis são incluídos quando ?expand= não é informado.
+    O `queryset` da view deve ser o básico (sem select_related/prefetch_related).
+    """
+    acoes_selecionaveis = ('list', 'retrieve')
+
+    def get_selecao(self):
+        if self.request is None or self.action not in self.acoes_selecionaveis:
+            return None
+        params = self.request.query_params
+        campos = separar_lista(params.get('fields')) or None
+        if 'expand' in params:
+            expandir = separar_lista(params['expand'])
+        else:
+            expandir = None if self.detail else set()
+        return Selecao(campos, expandir)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['selecao'] = self.get_selecao()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer = self.get_serializer()
+        if not isinstance(serializer, CamposDinamicosMixin):
+            return queryset
+        # A paginação por cursor lê os campos de ordenação do primeiro e do último registro
+        ordenacao = getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(ordenacao, str):
+            ordenacao = (ordenacao,)
+        return otimizar_queryset(
+            queryset,
+            serializer,
+            restringir_colunas=self.request.method in SAFE_METHODS,
+            campos_extras=[campo.lstrip('-') for campo in ordenacao],
+        )
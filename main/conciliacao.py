@@ -0,0 +1,150 @@
+"""
+Conciliação dos contadores de estoque das peças com o livro razão.
+
+- quantidade_total esperada: saldo de abertura + entradas - saídas das
+  movimentações sem locação (as movimentações de locação só trocam peças
+  entre disponível e locada). O saldo é acumulado em SaldoEstoque a cada
+  execução, que soma apenas as movimentações posteriores à última processada.
+- quantidade_locada esperada: soma dos itens das locações ativas e pendentes
+  já iniciadas que reservaram o estoque (as reservas antecipadas só ocupam o
+  estoque atual depois de ativadas, mesmo que a data de locação já tenha chegado).
+- quantidade_disponivel esperada: total esperado - locada esperada.
+
+Na primeira conciliação de cada peça o saldo de abertura é a quantidade
+total do momento (o cadastro da peça não gera movimentação). As movimentações
+arquivadas (main/arquivamento.py) continuam fazendo parte do livro razão.
+Movimentações alteradas ou excluídas depois de processadas só são percebidas com
+`completa=True`, que soma o livro razão inteiro novamente.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Max, Sum, When
+from django.db.models.functions import Abs
+from django.utils import timezone
+
+from .disponibilidade import STATUS_OCUPAM_ESTOQUE
+from .models import (
+    Peca, ItemLocacao, MovimentacaoEstoque, MovimentacaoArquivada, SaldoEstoque, ConciliacaoEstoque,
+    DivergenciaEstoque
+)
+from .versoes import incrementar_versao
+
+
+# Registros por INSERT/UPDATE em lote
+LOTE_CONCILIACAO = 500
+
+CONTADORES = ('quantidade_total', 'quantidade_locada', 'quantidade_disponivel')
+
+
+def saldo_razao(inicio, fim):
+    """
+    {peca_id: entradas - saídas} das movimentações sem locação com id em
+    (inicio, fim], somando as arquivadas, em uma consulta agrupada por tabela
+    """
+    saldos = defaultdict(int)
+    for model in (MovimentacaoEstoque, MovimentacaoArquivada):
+        for peca_id, saldo in model.objects.filter(
+            pk__gt=inicio, pk__lte=fim, locacao_id__isnull=True
+        ).order_by().values('peca_id').annotate(
+            saldo=Sum(Case(
+                When(tipo_movimentacao='E', then=Abs('quantidade')),
+                default=-Abs('quantidade'),
+            ))
+        ).values_list('peca_id', 'saldo'):
+            saldos[peca_id] += saldo
+    return saldos
+
+
+def quantidades_locadas(hoje):
+    """
+    {peca_id: quantidade} dos itens que ocupam o estoque hoje, em uma consulta agrupada
+    """
+    return dict(
+        ItemLocacao.objects.filter(
+            locacao__status__in=STATUS_OCUPAM_ESTOQUE,
+            locacao__data_locacao__lte=hoje,
+            locacao__estoque_reservado=True,
+        ).order_by().values('peca_id').annotate(total=Sum('quantidade')).values_list('peca_id', 'total')
+    )
+
+
+@transaction.atomic
+def conciliar(corrigir=False, completa=False):
+    """
+    Compara os contadores de todas as peças com os valores esperados e registra
+    as divergências. Com corrigir=True grava os valores esperados nas peças
+    divergentes (exceto quando a locada esperada supera o total esperado, que
+    exige conferência manual). Retorna a ConciliacaoEstoque criada.
+    """
+    anterior = ConciliacaoEstoque.objects.order_by('-id').first()
+    inicio = 0 if completa or anterior is None else anterior.ultima_movimentacao
+    ultima = max(
+        model.objects.aggregate(ultima=Max('id'))['ultima'] or 0
+        for model in (MovimentacaoEstoque, MovimentacaoArquivada)
+    )
+
+    novas = saldo_razao(inicio, ultima)
+    locadas = quantidades_locadas(timezone.now().date())
+    saldos = SaldoEstoque.objects.in_bulk()
+
+    conciliacao = ConciliacaoEstoque.objects.create(ultima_movimentacao=ultima, completa=completa)
+    saldos_novos = []
+    saldos_alterados = []
+    divergencias = []
+    for peca_id, total, locada, disponivel in Peca.objects.order_by().values_list(
+        'id', *CONTADORES
+    ).iterator(chunk_size=5000):
+        movimentado = novas.get(peca_id, 0)
+        saldo = saldos.get(peca_id)
+        if saldo is None:
+            # Peça ainda não conciliada: as movimentações dela são todas posteriores à
+            # última conciliação, e a quantidade total atual é adotada como esperada
+            saldo = SaldoEstoque(peca_id=peca_id, abertura=total - movimentado, movimentacoes=movimentado)
+            saldos_novos.append(saldo)
+        elif completa or movimentado:
+            saldo.movimentacoes = movimentado if completa else saldo.movimentacoes + movimentado
+            saldos_alterados.append(saldo)
+
+        total_esperado = saldo.quantidade_total
+        locada_esperada = locadas.get(peca_id, 0)
+        esperado = (total_esperado, locada_esperada, total_esperado - locada_esperada)
+        if (total, locada, disponivel) != esperado:
+            divergencias.append(DivergenciaEstoque(
+                conciliacao=conciliacao,
+                peca_id=peca_id,
+                quantidade_total=total,
+                quantidade_total_esperada=esperado[0],
+                quantidade_locada=locada,
+                quantidade_locada_esperada=esperado[1],
+                quantidade_disponivel=disponivel,
+                quantidade_disponivel_esperada=esperado[2],
+                corrigida=corrigir and min(esperado) >= 0,
+            ))
+        conciliacao.pecas_verificadas += 1
+
+    SaldoEstoque.objects.bulk_create(saldos_novos, batch_size=LOTE_CONCILIACAO)
+    SaldoEstoque.objects.bulk_update(saldos_alterados, ['movimentacoes'], batch_size=LOTE_CONCILIACAO)
+    DivergenciaEstoque.objects.bulk_create(divergencias, batch_size=LOTE_CONCILIACAO)
+
+    corrigidas = [divergencia for divergencia in divergencias if divergencia.corrigida]
+    if corrigidas:
+        agora = timezone.now()
+        Peca.objects.bulk_update([
+            Peca(
+                pk=divergencia.peca_id,
+                quantidade_total=divergencia.quantidade_total_esperada,
+                quantidade_locada=divergencia.quantidade_locada_esperada,
+                quantidade_disponivel=divergencia.quantidade_disponivel_esperada,
+                versao=F('versao') + 1,
+                updated_at=agora,
+            )
+            for divergencia in corrigidas
+        ], [*CONTADORES, 'versao', 'updated_at'], batch_size=LOTE_CONCILIACAO)
+        # bulk_update não dispara os sinais que invalidam as respostas em cache
+        incrementar_versao(Peca)
+
+    conciliacao.total_divergencias = len(divergencias)
+    conciliacao.total_corrigidas = len(corrigidas)
+    conciliacao.save(update_fields=['pecas_verificadas', 'total_divergencias', 'total_corrigidas'])
+    return conciliacao
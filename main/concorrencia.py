@@ -0,0 +1,67 @@
+from django.utils.http import quote_etag
+from rest_framework import serializers, status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .models import ConflitoVersao
+
+
+CABECALHO_VERSAO = 'If-Match'
+
+
+def versao_esperada(request):
+    """
+    Versão do registro que o cliente leu, informada no cabeçalho If-Match
+    ("3", W/"3" ou 3) ou no campo versao do corpo. Retorna None quando não
+    informada ou quando If-Match é *; levanta ValueError se for inválida.
+    """
+    valor = request.headers.get(CABECALHO_VERSAO)
+    if valor is None:
+        valor = request.data.get('versao') if hasattr(request.data, 'get') else None
+        if valor in (None, ''):
+            return None
+    valor = str(valor).strip()
+    if valor == '*':
+        return None
+    return int(valor.removeprefix('W/').strip('"'))
+
+
+class ConcorrenciaOtimistaMixin:
+    """
+    ViewSet de um modelo com controle de versão (VersaoOtimistaModel): as
+    alterações com If-Match (ou o campo versao) de uma versão que já não é a
+    atual, e as gravações que perdem a corrida para outra, respondem 409
+    Conflict em vez de sobrescrever a outra alteração. As respostas de um
+    registro trazem a versão no cabeçalho ETag.
+    """
+
+    def get_object(self):
+        instancia = super().get_object()
+        # Só a primeira leitura é conferida: as ações leem o registro de novo para a resposta
+        if self.request.method not in SAFE_METHODS and not getattr(self, '_versao_conferida', False):
+            self._versao_conferida = True
+            try:
+                esperada = versao_esperada(self.request)
+            except ValueError:
+                raise serializers.ValidationError(
+                    {'versao': f'{CABECALHO_VERSAO} deve ser o número da versão do registro'}
+                )
+            if esperada is not None and esperada != instancia.versao:
+                raise ConflitoVersao(
+                    f'{instancia._meta.verbose_name} {instancia.pk} foi alterado(a) por outra gravação '
+                    f'(versão atual: {instancia.versao})'
+                )
+        return instancia
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConflitoVersao):
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        dados = getattr(response, 'data', None)
+        detalhe = getattr(self, 'detail', False)
+        if detalhe and response.status_code < 300 and isinstance(dados, dict) and 'versao' in dados:
+            response['ETag'] = quote_etag(str(dados['versao']))
+        return response
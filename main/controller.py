@@ -6,19 +6,40 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum, Count
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from .models import TipoPeca, Peca, Cliente, Locacao, ItemLocacao, MovimentacaoEstoque
+from .models import TipoPeca, Peca, Cliente, Locacao, ItemLocacao, MovimentacaoEstoque, LocacaoArquivada
 from .serializers import (
     TipoPecaSerializer, PecaSerializer, ClienteSerializer, 
-    LocacaoSerializer, LocacaoCreateSerializer, ItemLocacaoSerializer, 
-    MovimentacaoEstoqueSerializer
+    LocacaoSerializer, LocacaoCreateSerializer, CotacaoSerializer, ItemLocacaoSerializer, 
+    MovimentacaoEstoqueSerializer, LocacaoArquivadaSerializer
 )
+from .search import BuscaIndexadaFilter
+from .exportacao import ExportacaoMixin
+from .campos import CamposDinamicosViewMixin
+from .importacao import ImportacaoMixin, PecaImportador, ClienteImportador
+from .pagination import PaginacaoSelecionavelMixin, MovimentacaoKeysetPagination, ItemLocacaoKeysetPagination
+from .versoes import resposta_versionada, incrementar_versao
+from .idempotencia import idempotente
+from .concorrencia import ConcorrenciaOtimistaMixin
+from .replicas import ListagemReplicaMixin, leitura_replica
+from .disponibilidade import motor
+from .operacoes import finalizar_locacoes
+from .relatorios import (
+    LIMITE_ESTOQUE_BAIXO, intervalo_relatorio,
+    EstatisticasTipos, RelatorioEstoque, RelatorioFinanceiro, RelatorioMovimentacoes, Dashboard
+)
+
 
+# Tempo (em segundos) que os números do dashboard ficam em cache
+DASHBOARD_CACHE_TIMEOUT = 30
 
-class TipoPecaViewSet(viewsets.ModelViewSet):
+
+class TipoPecaViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     """
     ViewSet para tipos de peças
     """
@@ -29,73 +50,62 @@ class TipoPecaViewSet(viewsets.ModelViewSet):
     ordering_fields = ['nome', 'valor_locacao', 'created_at']
     ordering = ['nome']
 
+    @leitura_replica
+    @resposta_versionada(TipoPeca)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @resposta_versionada(TipoPeca)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=['get'])
+    @leitura_replica
+    @resposta_versionada(TipoPeca, Peca, ItemLocacao)
     def estatisticas(self, request):
         """
         Retorna estatísticas dos tipos de peças
         """
-        total_tipos = self.queryset.count()
-        valor_medio = self.queryset.aggregate(
-            valor_medio=Sum('valor_locacao')
-        )['valor_medio'] or 0
-        
-        # Tipos mais utilizados
-        tipos_populares = TipoPeca.objects.annotate(
-            total_pecas=Count('peca'),
-            total_locacoes=Count('peca__itemlocacao')
-        ).order_by('-total_locacoes')[:5]
-        
-        return Response({
-            'total_tipos': total_tipos,
-            'valor_medio': valor_medio / total_tipos if total_tipos > 0 else 0,
-            'tipos_populares': TipoPecaSerializer(tipos_populares, many=True).data
-        })
+        return Response(EstatisticasTipos().executar())
 
 
-class PecaViewSet(viewsets.ModelViewSet):
+class PecaViewSet(
+    ConcorrenciaOtimistaMixin, CamposDinamicosViewMixin, ImportacaoMixin, ListagemReplicaMixin, viewsets.ModelViewSet
+):
     """
     ViewSet para peças individuais
     """
-    queryset = Peca.objects.select_related('tipo_peca').all()
+    importador_class = PecaImportador
+    queryset = Peca.objects.all()
+    acoes_selecionaveis = ('list', 'retrieve', 'estoque_baixo')
     serializer_class = PecaSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BuscaIndexadaFilter]
     filterset_fields = ['tipo_peca', 'quantidade_disponivel']
     search_fields = ['codigo', 'tipo_peca__nome', 'observacoes']
     ordering_fields = ['codigo', 'quantidade_total', 'quantidade_disponivel', 'created_at']
     ordering = ['tipo_peca__nome', 'codigo']
 
     @action(detail=False, methods=['get'])
+    @leitura_replica
     def estoque_baixo(self, request):
         """
-        Retorna peças com estoque baixo (quantidade disponível <= 5)
+        Retorna peças com estoque baixo (quantidade disponível <= LIMITE_ESTOQUE_BAIXO)
         """
-        pecas_baixo_estoque = self.queryset.filter(quantidade_disponivel__lte=5)
+        pecas_baixo_estoque = self.get_queryset().filter(quantidade_disponivel__lte=LIMITE_ESTOQUE_BAIXO)
         serializer = self.get_serializer(pecas_baixo_estoque, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @leitura_replica
+    @resposta_versionada(Peca)
     def relatorio_estoque(self, request):
         """
         Relatório completo do estoque
         """
-        total_pecas = self.queryset.count()
-        total_quantidade = self.queryset.aggregate(
-            total=Sum('quantidade_total'),
-            disponivel=Sum('quantidade_disponivel'),
-            locado=Sum('quantidade_locada')
-        )
-        
-        pecas_zeradas = self.queryset.filter(quantidade_disponivel=0).count()
-        
-        return Response({
-            'total_pecas': total_pecas,
-            'quantidade_total': total_quantidade['total'] or 0,
-            'quantidade_disponivel': total_quantidade['disponivel'] or 0,
-            'quantidade_locada': total_quantidade['locado'] or 0,
-            'pecas_sem_estoque': pecas_zeradas,
-        })
+        return Response(RelatorioEstoque().executar())
 
     @action(detail=True, methods=['post'])
+    @idempotente
     def ajustar_estoque(self, request, pk=None):
         """
         Ajustar manualmente o estoque de uma peça
@@ -120,109 +130,153 @@ class PecaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Criar movimentação de estoque
-        diferenca = nova_quantidade - peca.quantidade_total
-        if diferenca != 0:
-            MovimentacaoEstoque.objects.create(
-                peca=peca,
-                tipo_movimentacao='E' if diferenca > 0 else 'S',
-                quantidade=abs(diferenca),
-                motivo=motivo,
-                usuario=request.user
-            )
-        
-        # Atualizar estoque
-        peca.quantidade_total = nova_quantidade
-        peca.quantidade_disponivel = nova_quantidade - peca.quantidade_locada
-        peca.save()
+        # A movimentação é desfeita se a peça foi alterada (ex.: reservada) depois de lida
+        with transaction.atomic():
+            # Criar movimentação de estoque
+            diferenca = nova_quantidade - peca.quantidade_total
+            if diferenca != 0:
+                MovimentacaoEstoque.objects.create(
+                    peca=peca,
+                    tipo_movimentacao='E' if diferenca > 0 else 'S',
+                    quantidade=abs(diferenca),
+                    motivo=motivo,
+                    usuario=request.user
+                )
+            
+            # Atualizar estoque (UPDATE condicional na versão lida)
+            peca.quantidade_total = nova_quantidade
+            peca.quantidade_disponivel = nova_quantidade - peca.quantidade_locada
+            peca.save()
         
         return Response(self.get_serializer(peca).data)
 
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(CamposDinamicosViewMixin, ImportacaoMixin, ListagemReplicaMixin, viewsets.ModelViewSet):
     """
     ViewSet para clientes
     """
+    importador_class = ClienteImportador
     queryset = Cliente.objects.all()
+    acoes_selecionaveis = ('list', 'retrieve', 'inadimplentes')
     serializer_class = ClienteSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BuscaIndexadaFilter]
     filterset_fields = ['tipo_pessoa', 'status', 'cidade', 'estado']
     search_fields = ['nome', 'cpf_cnpj', 'email', 'telefone']
     ordering_fields = ['nome', 'created_at']
     ordering = ['nome']
 
     @action(detail=False, methods=['get'])
+    @leitura_replica
+    @resposta_versionada(Cliente)
     def inadimplentes(self, request):
         """
         Retorna clientes inadimplentes
         """
-        clientes_inadimplentes = self.queryset.filter(status='I')
+        clientes_inadimplentes = self.get_queryset().filter(status='I')
         serializer = self.get_serializer(clientes_inadimplentes, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
+    @leitura_replica
     def historico_locacoes(self, request, pk=None):
         """
-        Histórico de locações do cliente
+        Histórico de locações do cliente, incluindo as arquivadas
         """
         cliente = self.get_object()
         locacoes = Locacao.objects.filter(cliente=cliente).order_by('-data_locacao')
+        arquivadas = LocacaoArquivada.objects.filter(cliente=cliente).order_by('-data_locacao')
         
-        # Estatísticas
-        total_locacoes = locacoes.count()
-        valor_total_gasto = locacoes.aggregate(
-            total=Sum('valor_final')
-        )['total'] or 0
+        # Estatísticas (as locações arquivadas estão todas encerradas)
+        estatisticas = locacoes.aggregate(
+            total=Count('id'), valor=Sum('valor_final'), ativas=Count('id', filter=Q(status='A'))
+        )
+        estatisticas_arquivo = arquivadas.aggregate(total=Count('id'), valor=Sum('valor_final'))
         
-        locacoes_ativas = locacoes.filter(status='A').count()
+        # Últimas 10, entre as últimas 10 de cada tabela
+        ultimas = [
+            *LocacaoSerializer(
+                locacoes.select_related('cliente').prefetch_related('itens__peca__tipo_peca').com_totais()[:10],
+                many=True
+            ).data,
+            *LocacaoArquivadaSerializer(
+                arquivadas.select_related('cliente').prefetch_related('itens__peca__tipo_peca').com_totais()[:10],
+                many=True
+            ).data,
+        ]
+        ultimas.sort(key=lambda locacao: locacao['data_locacao'], reverse=True)
         
         return Response({
-            'total_locacoes': total_locacoes,
-            'valor_total_gasto': valor_total_gasto,
-            'locacoes_ativas': locacoes_ativas,
-            'locacoes': LocacaoSerializer(locacoes[:10], many=True).data  # Últimas 10
+            'total_locacoes': estatisticas['total'] + estatisticas_arquivo['total'],
+            'valor_total_gasto': (estatisticas['valor'] or 0) + (estatisticas_arquivo['valor'] or 0),
+            'locacoes_ativas': estatisticas['ativas'],
+            'locacoes': ultimas[:10]
         })
 
 
-class LocacaoViewSet(viewsets.ModelViewSet):
+class LocacaoViewSet(
+    ConcorrenciaOtimistaMixin, CamposDinamicosViewMixin, ExportacaoMixin, ListagemReplicaMixin, viewsets.ModelViewSet
+):
     """
-    ViewSet para locações
+    ViewSet para locações (os itens só são incluídos nas listagens com ?expand=itens)
     """
-    queryset = Locacao.objects.select_related('cliente').prefetch_related('itens__peca__tipo_peca').all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Relações, itens e totais são acrescentados conforme os campos pedidos
+    queryset = Locacao.objects.all()
+    acoes_selecionaveis = ('list', 'retrieve', 'ativas', 'vencidas')
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BuscaIndexadaFilter]
     filterset_fields = ['status', 'cliente', 'data_locacao']
     search_fields = ['numero_locacao', 'cliente__nome', 'observacoes']
     ordering_fields = ['numero_locacao', 'data_locacao', 'data_previsao_devolucao', 'valor_final']
     ordering = ['-data_locacao', '-numero_locacao']
+    exportacao_nome = 'locacoes'
+    exportacao_campos = (
+        'id', 'numero_locacao', 'cliente_id', 'data_locacao', 'data_previsao_devolucao', 'data_devolucao',
+        'status', 'valor_total', 'desconto', 'valor_final', 'total_itens', 'valor_itens',
+    )
+    exportacao_expressoes = {
+        'cliente_nome': F('cliente__nome'),
+        'cliente_cpf_cnpj': F('cliente__cpf_cnpj'),
+    }
 
     def get_serializer_class(self):
         if self.action == 'create':
             return LocacaoCreateSerializer
         return LocacaoSerializer
 
+    @idempotente
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'])
+    def cotacao(self, request):
+        """
+        Cota o carrinho (datas e itens, como na criação) sem gravar nada
+        """
+        serializer = CotacaoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.cotar())
+
     @action(detail=False, methods=['get'])
+    @leitura_replica
     def ativas(self, request):
         """
         Retorna locações ativas
         """
-        locacoes_ativas = self.queryset.filter(status='A')
+        locacoes_ativas = self.get_queryset().filter(status='A')
         serializer = self.get_serializer(locacoes_ativas, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @leitura_replica
     def vencidas(self, request):
         """
-        Retorna locações com prazo vencido
+        Retorna locações com prazo vencido (marcadas pela rotina de inadimplência)
         """
-        hoje = timezone.now().date()
-        locacoes_vencidas = self.queryset.filter(
-            status='A',
-            data_previsao_devolucao__lt=hoje
-        )
+        locacoes_vencidas = self.get_queryset().filter(vencida=True)
         serializer = self.get_serializer(locacoes_vencidas, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
+    @idempotente
     def finalizar(self, request, pk=None):
         """
         Finalizar uma locação (devolver peças)
@@ -235,116 +289,232 @@ class LocacaoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        data_devolucao = request.data.get('data_devolucao')
-        if data_devolucao:
-            try:
-                data_devolucao = datetime.strptime(data_devolucao, '%Y-%m-%d').date()
-            except ValueError:
-                return Response(
-                    {'error': 'Formato de data inválido. Use YYYY-MM-DD'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        else:
-            data_devolucao = timezone.now().date()
-        
-        # Devolver peças ao estoque
-        for item in locacao.itens.all():
-            peca = item.peca
-            peca.quantidade_locada -= item.quantidade
-            peca.quantidade_disponivel += item.quantidade
-            peca.save()
-            
-            # Registrar movimentação
-            MovimentacaoEstoque.objects.create(
-                peca=peca,
-                tipo_movimentacao='E',
-                quantidade=item.quantidade,
-                locacao=locacao,
-                motivo='Devolução de locação',
-                usuario=request.user
+        try:
+            data_devolucao = self._data_devolucao(request)
+        except ValueError:
+            return Response(
+                {'error': 'Formato de data inválido. Use YYYY-MM-DD'}, 
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Atualizar status da locação
-        locacao.status = 'F'
-        locacao.data_devolucao = data_devolucao
-        locacao.save()
+        if not finalizar_locacoes([locacao.pk], data_devolucao, request.user):
+            return Response(
+                {'error': 'Apenas locações ativas podem ser finalizadas'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        return Response(self.get_serializer(locacao).data)
+        return Response(self.get_serializer(self.get_object()).data)
 
-    @action(detail=False, methods=['get'])
-    def relatorio_financeiro(self, request):
+    @action(detail=False, methods=['post'])
+    @idempotente
+    def finalizar_lote(self, request):
         """
-        Relatório financeiro das locações
+        Finalizar várias locações de uma vez (devolver peças)
         """
-        periodo = request.query_params.get('periodo', '30')  # dias
-        data_inicio = timezone.now().date() - timedelta(days=int(periodo))
+        ids = request.data.get('locacoes')
+        if not isinstance(ids, list) or not ids:
+            return Response(
+                {'error': 'Informe a lista de locações a finalizar'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        locacoes_periodo = self.queryset.filter(data_locacao__gte=data_inicio)
+        try:
+            ids = {int(locacao_id) for locacao_id in ids}
+        except (ValueError, TypeError):
+            return Response(
+                {'error': 'Os identificadores das locações devem ser números inteiros'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        receita_total = locacoes_periodo.aggregate(
-            total=Sum('valor_final')
-        )['total'] or 0
+        try:
+            data_devolucao = self._data_devolucao(request)
+        except ValueError:
+            return Response(
+                {'error': 'Formato de data inválido. Use YYYY-MM-DD'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        locacoes_por_status = locacoes_periodo.values('status').annotate(
-            count=Count('id'),
-            valor=Sum('valor_final')
-        )
+        finalizadas = finalizar_locacoes(ids, data_devolucao, request.user)
         
         return Response({
-            'periodo_dias': periodo,
-            'receita_total': receita_total,
-            'total_locacoes': locacoes_periodo.count(),
-            'por_status': list(locacoes_por_status)
+            'finalizadas': sorted(finalizadas),
+            'ignoradas': sorted(ids - set(finalizadas)),
         })
 
+    def _data_devolucao(self, request):
+        data_devolucao = request.data.get('data_devolucao')
+        if data_devolucao:
+            return datetime.strptime(data_devolucao, '%Y-%m-%d').date()
+        return timezone.now().date()
+
+    @action(detail=False, methods=['get'])
+    @leitura_replica
+    def relatorio_financeiro(self, request):
+        """
+        Relatório financeiro das locações, lido do resumo diário
+        """
+        try:
+            periodo, data_inicio, data_fim, agrupamento = intervalo_relatorio(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(RelatorioFinanceiro(periodo, data_inicio, data_fim, agrupamento).executar())
+
 
-class ItemLocacaoViewSet(viewsets.ModelViewSet):
+class ItemLocacaoViewSet(
+    CamposDinamicosViewMixin, PaginacaoSelecionavelMixin, ListagemReplicaMixin, viewsets.ModelViewSet
+):
     """
     ViewSet para itens de locação
     """
-    queryset = ItemLocacao.objects.select_related('locacao', 'peca__tipo_peca').all()
+    cursor_pagination_class = ItemLocacaoKeysetPagination
+    queryset = ItemLocacao.objects.all()
     serializer_class = ItemLocacaoSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['locacao', 'peca']
     ordering = ['locacao__numero_locacao']
 
 
-class MovimentacaoEstoqueViewSet(viewsets.ModelViewSet):
+class MovimentacaoEstoqueViewSet(
+    CamposDinamicosViewMixin, PaginacaoSelecionavelMixin, ExportacaoMixin, ListagemReplicaMixin, viewsets.ModelViewSet
+):
     """
     ViewSet para movimentações de estoque
     """
-    queryset = MovimentacaoEstoque.objects.select_related('peca__tipo_peca', 'usuario', 'locacao').all()
+    cursor_pagination_class = MovimentacaoKeysetPagination
+    queryset = MovimentacaoEstoque.objects.all()
     serializer_class = MovimentacaoEstoqueSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['tipo_movimentacao', 'peca', 'locacao', 'usuario']
     search_fields = ['motivo', 'observacoes', 'peca__codigo']
     ordering_fields = ['data_movimentacao']
     ordering = ['-data_movimentacao']
+    exportacao_nome = 'movimentacoes'
+    exportacao_campos = (
+        'id', 'data_movimentacao', 'peca_id', 'tipo_movimentacao', 'quantidade', 'locacao_id', 'motivo', 'observacoes',
+    )
+    exportacao_expressoes = {
+        'peca_codigo': F('peca__codigo'),
+        'peca_nome': F('peca__tipo_peca__nome'),
+        'locacao_numero': F('locacao__numero_locacao'),
+        'usuario_nome': F('usuario__username'),
+    }
 
     @action(detail=False, methods=['get'])
+    @leitura_replica
     def relatorio_movimentacoes(self, request):
         """
-        Relatório de movimentações por período
+        Relatório de movimentações por período, lido do resumo diário
         """
-        periodo = request.query_params.get('periodo', '30')  # dias
-        data_inicio = timezone.now().date() - timedelta(days=int(periodo))
+        try:
+            periodo, data_inicio, data_fim, agrupamento = intervalo_relatorio(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        movimentacoes_periodo = self.queryset.filter(
-            data_movimentacao__date__gte=data_inicio
-        )
+        return Response(RelatorioMovimentacoes(periodo, data_inicio, data_fim, agrupamento).executar())
+
+
+class DashboardViewSet(viewsets.ViewSet):
+    """
+    ViewSet com os números consolidados do dashboard em uma única chamada
+    """
+
+    @leitura_replica
+    def list(self, request):
+        """
+        Retorna apenas os dados exibidos nos cards do dashboard
+        """
+        periodo = request.query_params.get('periodo', '30')  # dias
+        try:
+            periodo = int(periodo)
+        except ValueError:
+            return Response(
+                {'error': 'Período deve ser um número inteiro de dias'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache_key = f'dashboard:{periodo}'
+        dados = cache.get(cache_key)
+        if dados is None:
+            dados = Dashboard(periodo).executar()
+            cache.set(cache_key, dados, DASHBOARD_CACHE_TIMEOUT)
+        return Response(dados)
+
+
+class DisponibilidadeViewSet(viewsets.GenericViewSet):
+    """
+    ViewSet com a disponibilidade das peças em um período, considerando as
+    locações ativas e pendentes (inclusive as reservadas para datas futuras)
+    """
+    queryset = Peca.objects.order_by('id')
+
+    def _periodo(self, dados):
+        hoje = timezone.now().date().isoformat()
+        data_inicio = datetime.strptime(dados.get('data_inicio') or hoje, '%Y-%m-%d').date()
+        data_fim = datetime.strptime(dados.get('data_fim') or data_inicio.isoformat(), '%Y-%m-%d').date()
+        if data_fim < data_inicio:
+            raise ValueError
+        return data_inicio, data_fim
+
+    def list(self, request):
+        """
+        Disponibilidade das peças (todas, paginadas, ou só as de ?pecas=1,2,3)
+        entre data_inicio e data_fim (hoje, por padrão)
+        """
+        try:
+            data_inicio, data_fim = self._periodo(request.query_params)
+            pecas = [int(peca) for peca in request.query_params.get('pecas', '').split(',') if peca]
+        except ValueError:
+            return Response(
+                {'error': 'Informe pecas como ids separados por vírgula e datas no formato YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        entradas = movimentacoes_periodo.filter(tipo_movimentacao='E').aggregate(
-            total=Sum('quantidade')
-        )['total'] or 0
+        if pecas:
+            disponibilidade = motor.consultar(pecas, data_inicio, data_fim)
+            return Response({
+                'data_inicio': data_inicio,
+                'data_fim': data_fim,
+                'results': [disponibilidade[peca] for peca in pecas if peca in disponibilidade],
+            })
         
-        saidas = movimentacoes_periodo.filter(tipo_movimentacao='S').aggregate(
-            total=Sum('quantidade')
-        )['total'] or 0
+        pagina = self.paginate_queryset(self.get_queryset().values_list('id', flat=True))
+        disponibilidade = motor.consultar(pagina, data_inicio, data_fim)
+        response = self.get_paginated_response([disponibilidade[peca] for peca in pagina if peca in disponibilidade])
+        response.data['data_inicio'] = data_inicio
+        response.data['data_fim'] = data_fim
+        return response
+
+    @action(detail=False, methods=['post'])
+    def verificar(self, request):
+        """
+        Verifica se todos os itens ({'peca', 'quantidade'}) cabem no período
+        """
+        try:
+            data_inicio, data_fim = self._periodo(request.data)
+            quantidades = {int(item['peca']): int(item['quantidade']) for item in request.data['itens']}
+            if not quantidades:
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {'error': 'Informe itens ({peca, quantidade}) e datas no formato YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
+        disponibilidade = motor.consultar(list(quantidades), data_inicio, data_fim)
+        itens = [
+            {
+                'peca': peca,
+                'quantidade': quantidade,
+                'quantidade_disponivel': disponibilidade[peca]['quantidade_disponivel'] if peca in disponibilidade else 0,
+            }
+            for peca, quantidade in quantidades.items()
+        ]
+        for item in itens:
+            item['disponivel'] = item['quantidade'] <= item['quantidade_disponivel']
         return Response({
-            'periodo_dias': periodo,
-            'total_entradas': entradas,
-            'total_saidas': saidas,
-            'saldo': entradas - saidas,
-            'total_movimentacoes': movimentacoes_periodo.count()
+            'data_inicio': data_inicio,
+            'data_fim': data_fim,
+            'disponivel': all(item['disponivel'] for item in itens),
+            'itens': itens,
         })
@@ -0,0 +1,149 @@
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Peca, Locacao, ItemLocacao
+from .versoes import obter_versoes
+
+
+# Locações que ocupam estoque nas suas datas
+STATUS_OCUPAM_ESTOQUE = ('A', 'P')
+
+# Acima deste número de peças é mais rápido ler de uma vez os itens de todas as
+# locações ativas e pendentes do que buscá-los peça por peça
+LIMITE_CONSULTA_POR_PECA = 10
+
+
+class MapaDisponibilidade:
+    """
+    Ocupação de uma peça ao longo do tempo, montada por varredura (sweep-line)
+    sobre os intervalos das locações: `datas` são os pontos em que a ocupação
+    muda (dias ordinais) e `ocupado[i]` é a quantidade locada de datas[i] até
+    o dia anterior a datas[i + 1].
+    """
+    __slots__ = ('quantidade_total', 'datas', 'ocupado')
+
+    def __init__(self, quantidade_total, intervalos):
+        self.quantidade_total = quantidade_total
+        eventos = defaultdict(int)
+        for inicio, fim, quantidade in intervalos:
+            eventos[inicio] += quantidade
+            eventos[fim + 1] -= quantidade
+        self.datas = []
+        self.ocupado = []
+        atual = 0
+        for dia in sorted(eventos):
+            atual += eventos[dia]
+            self.datas.append(dia)
+            self.ocupado.append(atual)
+
+    def ocupacao_maxima(self, inicio, fim):
+        """
+        Maior quantidade locada ao mesmo tempo entre os dias ordinais inicio e fim (inclusive)
+        """
+        primeiro = bisect_right(self.datas, inicio) - 1
+        ultimo = bisect_right(self.datas, fim) - 1
+        if ultimo < 0:
+            return 0
+        return max(self.ocupado[max(primeiro, 0):ultimo + 1])
+
+    def disponivel(self, inicio, fim):
+        return max(self.quantidade_total - self.ocupacao_maxima(inicio, fim), 0)
+
+
+def montar_mapas(peca_ids=None, hoje=None):
+    """
+    Monta os mapas das peças informadas (ou de todas) com duas consultas
+    """
+    hoje = (hoje or timezone.now().date()).toordinal()
+    itens = ItemLocacao.objects.filter(locacao__status__in=STATUS_OCUPAM_ESTOQUE)
+    pecas = Peca.objects.all()
+    if peca_ids is not None:
+        peca_ids = list(peca_ids)
+        pecas = pecas.filter(pk__in=peca_ids)
+        if len(peca_ids) <= LIMITE_CONSULTA_POR_PECA:
+            itens = itens.filter(peca_id__in=peca_ids)
+
+    intervalos = defaultdict(list)
+    for peca_id, status, data_locacao, previsao, quantidade in itens.order_by().values_list(
+        'peca_id', 'locacao__status', 'locacao__data_locacao', 'locacao__data_previsao_devolucao', 'quantidade'
+    ).iterator(chunk_size=5000):
+        fim = previsao.toordinal()
+        if status == 'A':
+            # Locação ativa ocupa a peça até ser finalizada, mesmo depois do prazo
+            fim = max(fim, hoje)
+        intervalos[peca_id].append((data_locacao.toordinal(), fim, quantidade))
+    return {
+        peca_id: MapaDisponibilidade(quantidade_total, intervalos[peca_id])
+        for peca_id, quantidade_total in pecas.order_by().values_list('id', 'quantidade_total').iterator(chunk_size=5000)
+    }
+
+
+class MotorDisponibilidade:
+    """
+    Mantém em memória os mapas das peças já consultadas. Os mapas são
+    descartados quando peças, locações ou itens mudam (ver main/versoes.py)
+    ou quando o dia muda, já que as locações ativas vencidas avançam com ele.
+    """
+
+    def __init__(self):
+        self.mapas = {}
+        self.completo = False
+        self.chave = None
+
+    def _validar_cache(self):
+        chave = (timezone.now().date(), *obter_versoes(Peca, Locacao, ItemLocacao))
+        if chave != self.chave:
+            self.mapas = {}
+            self.completo = False
+            self.chave = chave
+
+    def mapas_de(self, peca_ids):
+        self._validar_cache()
+        faltando = [] if self.completo else [peca_id for peca_id in peca_ids if peca_id not in self.mapas]
+        if len(faltando) > LIMITE_CONSULTA_POR_PECA:
+            # Muitas peças de uma vez: já monta os mapas de todas
+            self.mapas = montar_mapas()
+            self.completo = True
+        elif faltando:
+            self.mapas.update(montar_mapas(faltando))
+        return {peca_id: self.mapas[peca_id] for peca_id in peca_ids if peca_id in self.mapas}
+
+    def consultar(self, peca_ids, inicio, fim):
+        """
+        Disponibilidade de cada peça entre as datas inicio e fim (inclusive)
+        """
+        inicio, fim = inicio.toordinal(), fim.toordinal()
+        return {
+            peca_id: {
+                'peca': peca_id,
+                'quantidade_total': mapa.quantidade_total,
+                'quantidade_ocupada': mapa.ocupacao_maxima(inicio, fim),
+                'quantidade_disponivel': mapa.disponivel(inicio, fim),
+            }
+            for peca_id, mapa in self.mapas_de(peca_ids).items()
+        }
+
+
+motor = MotorDisponibilidade()
+
+
+def verificar_reserva(quantidades, inicio, fim):
+    """
+    Confere, com dados lidos agora do banco (sem o cache do motor), se as
+    quantidades ({peca_id: quantidade}) cabem entre inicio e fim. Deve ser
+    chamada dentro da transação que grava a reserva, pois bloqueia as peças.
+    Retorna a lista de (peca_id, disponivel) que não cabem.
+    """
+    assert transaction.get_connection().in_atomic_block
+    list(Peca.objects.select_for_update().filter(pk__in=quantidades).values_list('id'))
+    mapas = montar_mapas(quantidades)
+    inicio, fim = inicio.toordinal(), fim.toordinal()
+    faltas = []
+    for peca_id, quantidade in quantidades.items():
+        disponivel = mapas[peca_id].disponivel(inicio, fim) if peca_id in mapas else 0
+        if quantidade > disponivel:
+            faltas.append((peca_id, disponivel))
+    return faltas
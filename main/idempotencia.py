@@ -0,0 +1,118 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ChaveIdempotencia
+
+
+CABECALHO_IDEMPOTENCIA = 'Idempotency-Key'
+
+# Tempo durante o qual uma repetição recebe a resposta guardada
+VALIDADE_IDEMPOTENCIA = timedelta(hours=24)
+
+# Uma chave em andamento há mais tempo que isto é considerada abandonada
+# (o processo caiu durante a operação) e pode ser usada de novo
+PROCESSAMENTO_MAXIMO = timedelta(minutes=5)
+
+
+def _escopo(request):
+    return f'usuario:{request.user.pk}' if request.user.is_authenticated else 'anonimo'
+
+
+def _assinatura(request):
+    """
+    Identifica a operação (método, caminho e corpo) para detectar a mesma chave usada em outra requisição
+    """
+    dados = request.data
+    if hasattr(dados, 'lists'):
+        dados = dict(dados.lists())
+    conteudo = json.dumps([request.method, request.path, dados], sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+def _reservar(escopo, chave, requisicao):
+    """
+    Grava a chave como em andamento. Retorna (registro, True) quando a chave é
+    nova e (registro existente, False) quando ela já foi usada.
+    """
+    agora = timezone.now()
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return ChaveIdempotencia.objects.create(
+                    escopo=escopo, chave=chave, requisicao=requisicao, expira_em=agora + VALIDADE_IDEMPOTENCIA
+                ), True
+        except IntegrityError:
+            existente = ChaveIdempotencia.objects.filter(escopo=escopo, chave=chave).first()
+            if existente is None:
+                continue
+            abandonada = existente.status_code is None and existente.criada_em < agora - PROCESSAMENTO_MAXIMO
+            if existente.expira_em > agora and not abandonada:
+                return existente, False
+            # Chave expirada ou abandonada: descartar (se ninguém a renovou) e reservar de novo
+            ChaveIdempotencia.objects.filter(pk=existente.pk, criada_em=existente.criada_em).delete()
+    # Outra requisição reservou a chave ao mesmo tempo
+    return ChaveIdempotencia.objects.filter(escopo=escopo, chave=chave).first(), False
+
+
+def limpar_chaves_expiradas():
+    return ChaveIdempotencia.objects.filter(expira_em__lte=timezone.now()).delete()[0]
+
+
+def idempotente(metodo):
+    """
+    Torna seguras as repetições de uma operação de escrita: com o cabeçalho
+    Idempotency-Key, a primeira requisição executa a operação e guarda a
+    resposta (exceto erros 5xx e exceções), e as repetições com a mesma chave
+    recebem a resposta guardada sem executar nada. A mesma chave com outra
+    requisição resulta em 422 e uma repetição enquanto a original ainda está
+    em andamento, em 409.
+    """
+    @wraps(metodo)
+    def wrapper(self, request, *args, **kwargs):
+        chave = request.headers.get(CABECALHO_IDEMPOTENCIA)
+        if not chave:
+            return metodo(self, request, *args, **kwargs)
+        if len(chave) > ChaveIdempotencia._meta.get_field('chave').max_length:
+            return Response(
+                {'error': f'{CABECALHO_IDEMPOTENCIA} deve ter no máximo 255 caracteres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        requisicao = _assinatura(request)
+        registro, nova = _reservar(_escopo(request), chave, requisicao)
+        if not nova:
+            if registro is not None and registro.requisicao != requisicao:
+                return Response(
+                    {'error': f'{CABECALHO_IDEMPOTENCIA} já utilizada em outra requisição'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if registro is None or registro.status_code is None:
+                return Response(
+                    {'error': f'A requisição com esta {CABECALHO_IDEMPOTENCIA} ainda está em andamento'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            return Response(registro.resposta, status=registro.status_code, headers={'Idempotent-Replayed': 'true'})
+
+        try:
+            # A resposta é gravada na mesma transação da operação: ou as duas ficam, ou nenhuma
+            with transaction.atomic():
+                response = metodo(self, request, *args, **kwargs)
+                if response.status_code < 500:
+                    registro.status_code = response.status_code
+                    registro.resposta = response.data
+                    registro.save(update_fields=['status_code', 'resposta'])
+        except Exception:
+            registro.delete()
+            raise
+        if response.status_code >= 500:
+            registro.delete()
+        return response
+    return wrapper
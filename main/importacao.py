@@ -0,0 +1,231 @@
+import csv
+import io
+from abc import ABC, abstractmethod
+
+from django.db import transaction
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .models import TipoPeca, Peca, Cliente
+from .search import get_backend
+from .serializers import ClienteSerializer
+from .versoes import incrementar_versao
+
+
+# Linhas por INSERT e valores por consulta IN (abaixo do limite de parâmetros do SQLite)
+LOTE_IMPORTACAO = 900
+
+
+def somente_digitos(valor):
+    return ''.join(filter(str.isdigit, valor or ''))
+
+
+def formatar_cpf_cnpj(digitos):
+    """
+    Máscara usual do documento (123.456.789-01 ou 12.345.678/0001-90)
+    """
+    if len(digitos) == 11:
+        return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+    if len(digitos) == 14:
+        return f'{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}'
+    return digitos
+
+
+def ler_csv(arquivo):
+    """
+    Lê um CSV (separado por vírgula ou ponto e vírgula, com ou sem BOM) como uma lista de dicionários
+    """
+    if isinstance(arquivo, bytes):
+        arquivo = arquivo.decode('utf-8-sig')
+    if isinstance(arquivo, str):
+        arquivo = io.StringIO(arquivo)
+    amostra = arquivo.read(4096)
+    arquivo.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.DictReader(arquivo, dialect=dialeto)
+    return [
+        {(chave or '').strip(): (valor.strip() if isinstance(valor, str) else valor) for chave, valor in linha.items()}
+        for linha in leitor
+    ]
+
+
+def valores_existentes(queryset, campo, valores):
+    """
+    Valores de `campo` que já existem no banco, consultados em lotes
+    """
+    valores = list(valores)
+    existentes = set()
+    for inicio in range(0, len(valores), LOTE_IMPORTACAO):
+        existentes.update(
+            queryset.filter(**{f'{campo}__in': valores[inicio:inicio + LOTE_IMPORTACAO]}).values_list(campo, flat=True)
+        )
+    return existentes
+
+
+class PecaImportacaoSerializer(serializers.Serializer):
+    """
+    Linha do CSV de peças (o tipo é informado pelo nome)
+    """
+    codigo = serializers.CharField(max_length=50)
+    tipo_peca = serializers.CharField(max_length=100)
+    quantidade_total = serializers.IntegerField(min_value=0, default=0)
+    observacoes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class ClienteImportacaoSerializer(ClienteSerializer):
+    """
+    Linha do CSV de clientes (a unicidade do CPF/CNPJ é verificada para o lote inteiro)
+    """
+    class Meta(ClienteSerializer.Meta):
+        extra_kwargs = {'cpf_cnpj': {'validators': []}}
+
+
+class Importador(ABC):
+    """
+    Valida todas as linhas de um CSV antes de gravar: cada linha passa pelo
+    serializer, e a unicidade e as referências são conferidas para o lote
+    inteiro com poucas consultas. Nada é gravado se alguma linha tiver erro.
+    """
+    model = None
+    serializer_class = None
+
+    def __init__(self):
+        self.serializer = self.serializer_class()
+
+    def importar(self, linhas, simular=False):
+        validos = []
+        erros = []
+        for numero, linha in enumerate(linhas, start=2):  # a linha 1 é o cabeçalho
+            try:
+                validos.append((numero, self.serializer.run_validation(
+                    {chave: valor for chave, valor in linha.items() if valor not in (None, '')}
+                )))
+            except serializers.ValidationError as e:
+                erros.append({'linha': numero, 'erros': e.detail})
+
+        instancias = self.validar_lote(validos, erros)
+        erros.sort(key=lambda erro: erro['linha'])
+
+        resultado = {'total_linhas': len(linhas), 'criados': 0, 'erros': erros}
+        if erros or simular:
+            return resultado
+
+        with transaction.atomic():
+            for inicio in range(0, len(instancias), LOTE_IMPORTACAO):
+                lote = self.model.objects.bulk_create(instancias[inicio:inicio + LOTE_IMPORTACAO])
+                # bulk_create não dispara os sinais que mantêm o índice de busca
+                get_backend().indexar(self.model.objects.filter(pk__in=[instancia.pk for instancia in lote]))
+            incrementar_versao(self.model)
+        resultado['criados'] = len(instancias)
+        return resultado
+
+    @abstractmethod
+    def validar_lote(self, validos, erros):
+        """
+        Confere as regras que dependem do lote inteiro e retorna as instâncias a criar
+        """
+
+
+class PecaImportador(Importador):
+    model = Peca
+    serializer_class = PecaImportacaoSerializer
+
+    def validar_lote(self, validos, erros):
+        codigos = {}
+        for numero, dados in validos:
+            codigos.setdefault(dados['codigo'], []).append(numero)
+        existentes = valores_existentes(Peca.objects, 'codigo', codigos)
+
+        tipos = {}
+        nomes = {dados['tipo_peca'] for _, dados in validos}
+        for tipo_id, nome in TipoPeca.objects.filter(nome__in=nomes).values_list('id', 'nome'):
+            tipos.setdefault(nome, []).append(tipo_id)
+
+        instancias = []
+        for numero, dados in validos:
+            problemas = {}
+            if dados['codigo'] in existentes:
+                problemas['codigo'] = ['Já existe uma peça com este código.']
+            elif len(codigos[dados['codigo']]) > 1:
+                problemas['codigo'] = [f'Código repetido no arquivo (linhas {codigos[dados["codigo"]]}).']
+            if dados['tipo_peca'] not in tipos:
+                problemas['tipo_peca'] = [f'Tipo de peça "{dados["tipo_peca"]}" não encontrado.']
+            elif len(tipos[dados['tipo_peca']]) > 1:
+                problemas['tipo_peca'] = [f'Há mais de um tipo de peça chamado "{dados["tipo_peca"]}".']
+            if problemas:
+                erros.append({'linha': numero, 'erros': problemas})
+                continue
+            instancias.append(Peca(
+                codigo=dados['codigo'],
+                tipo_peca_id=tipos[dados['tipo_peca']][0],
+                quantidade_total=dados['quantidade_total'],
+                quantidade_disponivel=dados['quantidade_total'],
+                observacoes=dados.get('observacoes'),
+            ))
+        return instancias
+
+
+class ClienteImportador(Importador):
+    model = Cliente
+    serializer_class = ClienteImportacaoSerializer
+
+    def validar_lote(self, validos, erros):
+        # Documentos comparados só pelos dígitos, como em ClienteSerializer.validate_cpf_cnpj
+        documentos = {}
+        for numero, dados in validos:
+            documentos.setdefault(somente_digitos(dados['cpf_cnpj']), []).append(numero)
+        candidatos = set()
+        for numero, dados in validos:
+            digitos = somente_digitos(dados['cpf_cnpj'])
+            candidatos.update((dados['cpf_cnpj'], digitos, formatar_cpf_cnpj(digitos)))
+        existentes = {somente_digitos(valor) for valor in valores_existentes(Cliente.objects, 'cpf_cnpj', candidatos)}
+
+        instancias = []
+        for numero, dados in validos:
+            digitos = somente_digitos(dados['cpf_cnpj'])
+            if digitos in existentes:
+                erros.append({'linha': numero, 'erros': {'cpf_cnpj': ['Já existe um cliente com este CPF/CNPJ.']}})
+            elif len(documentos[digitos]) > 1:
+                erros.append({'linha': numero, 'erros': {
+                    'cpf_cnpj': [f'CPF/CNPJ repetido no arquivo (linhas {documentos[digitos]}).']
+                }})
+            else:
+                instancias.append(Cliente(**dados))
+        return instancias
+
+
+class ImportacaoMixin:
+    """
+    Adiciona a ação `importar` (POST multipart com o CSV no campo `arquivo`).
+    Com ?simular=1 apenas valida o arquivo, sem gravar.
+    """
+    importador_class = None
+
+    @action(detail=False, methods=['post'])
+    def importar(self, request):
+        """
+        Importa registros em lote a partir de um CSV
+        """
+        arquivo = request.FILES.get('arquivo')
+        if arquivo is None:
+            return Response(
+                {'error': 'Envie o arquivo CSV no campo "arquivo"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            linhas = ler_csv(arquivo.read())
+        except (UnicodeDecodeError, csv.Error):
+            return Response(
+                {'error': 'Arquivo inválido. Envie um CSV em UTF-8'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        simular = request.query_params.get('simular') in ('1', 'true')
+        resultado = self.importador_class().importar(linhas, simular=simular)
+        if resultado['erros']:
+            return Response(resultado, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado, status=status.HTTP_200_OK if simular else status.HTTP_201_CREATED)
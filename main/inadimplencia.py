@@ -0,0 +1,97 @@
+"""
+Rotina diária de vencimentos: marca as locações ativas cujo prazo passou
+(Locacao.vencida) e move para inadimplente ('I') os clientes com locações
+vencidas, devolvendo para ativo ('A') os que a própria rotina marcou e já
+não têm pendências. Clientes marcados como inadimplentes manualmente não
+são alterados. Cada alteração fica registrada em RegistroAuditoria.
+
+Deve ser executada logo após a virada do dia (comando
+`atualizar_inadimplencia` no cron ou chamando `atualizar_inadimplencia()`
+de outro agendador); entre uma execução e outra, Locacao.save mantém a
+marcação das locações alteradas.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Cliente, Locacao, RegistroAuditoria
+from .versoes import incrementar_versao
+
+
+ORIGEM = 'atualizar_inadimplencia'
+
+# Registros por UPDATE/INSERT em lote
+LOTE_INADIMPLENCIA = 500
+
+
+def _auditoria(model, campo, alteracoes):
+    """
+    Registros de auditoria das alterações [(objeto_id, valor_anterior, valor_novo)]
+    """
+    return [
+        RegistroAuditoria(
+            origem=ORIGEM,
+            modelo=model._meta.label_lower,
+            objeto_id=objeto_id,
+            campo=campo,
+            valor_anterior=str(anterior),
+            valor_novo=str(novo),
+        )
+        for objeto_id, anterior, novo in alteracoes
+    ]
+
+
+@transaction.atomic
+def atualizar_inadimplencia(hoje=None):
+    """
+    Atualiza as marcações com quatro consultas de leitura e as gravações em
+    lote; retorna a quantidade de registros alterados de cada tipo
+    """
+    hoje = hoje or timezone.now().date()
+    agora = timezone.now()
+    em_atraso = Q(status='A', data_previsao_devolucao__lt=hoje)
+
+    a_vencer = list(Locacao.objects.filter(em_atraso, vencida=False).order_by().values_list('id', flat=True))
+    a_desmarcar = list(Locacao.objects.filter(vencida=True).exclude(em_atraso).order_by().values_list('id', flat=True))
+    Locacao.objects.bulk_update(
+        [Locacao(pk=pk, vencida=True, updated_at=agora) for pk in a_vencer]
+        + [Locacao(pk=pk, vencida=False, updated_at=agora) for pk in a_desmarcar],
+        ['vencida', 'updated_at'],
+        batch_size=LOTE_INADIMPLENCIA
+    )
+
+    # Subconsulta não correlacionada: os clientes com atraso são lidos uma única vez pelo índice de vencimento
+    com_atraso = Q(pk__in=Locacao.objects.filter(em_atraso).values('cliente_id'))
+    a_bloquear = list(Cliente.objects.filter(com_atraso, status='A').order_by().values_list('id', flat=True))
+    a_liberar = list(
+        Cliente.objects.filter(
+            ~com_atraso, status='I', inadimplencia_automatica=True
+        ).order_by().values_list('id', flat=True)
+    )
+    Cliente.objects.bulk_update(
+        [Cliente(pk=pk, status='I', inadimplencia_automatica=True, updated_at=agora) for pk in a_bloquear]
+        + [Cliente(pk=pk, status='A', inadimplencia_automatica=False, updated_at=agora) for pk in a_liberar],
+        ['status', 'inadimplencia_automatica', 'updated_at'],
+        batch_size=LOTE_INADIMPLENCIA
+    )
+
+    RegistroAuditoria.objects.bulk_create(
+        _auditoria(Locacao, 'vencida', [(pk, False, True) for pk in a_vencer])
+        + _auditoria(Locacao, 'vencida', [(pk, True, False) for pk in a_desmarcar])
+        + _auditoria(Cliente, 'status', [(pk, 'A', 'I') for pk in a_bloquear])
+        + _auditoria(Cliente, 'status', [(pk, 'I', 'A') for pk in a_liberar]),
+        batch_size=LOTE_INADIMPLENCIA
+    )
+
+    # bulk_update não dispara os sinais que invalidam as respostas em cache
+    if a_vencer or a_desmarcar:
+        incrementar_versao(Locacao)
+    if a_bloquear or a_liberar:
+        incrementar_versao(Cliente)
+
+    return {
+        'locacoes_vencidas': len(a_vencer),
+        'locacoes_regularizadas': len(a_desmarcar),
+        'clientes_inadimplentes': len(a_bloquear),
+        'clientes_regularizados': len(a_liberar),
+    }
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from main.arquivamento import LOTE_ARQUIVAMENTO, RETENCAO_DIAS, arquivar
+
+
+class Command(BaseCommand):
+    help = (
+        'Move para as tabelas de arquivo as locações encerradas e os ajustes de estoque '
+        'mais antigos que o prazo de retenção (agendar fora do horário de pico)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=RETENCAO_DIAS, help='Prazo de retenção em dias')
+        parser.add_argument('--lote', type=int, default=LOTE_ARQUIVAMENTO, help='Locações movidas por transação')
+
+    def handle(self, *args, **options):
+        totais = arquivar(dias=options['dias'], lote=options['lote'])
+
+        self.stdout.write(f'{totais["locacoes"]} locações arquivadas com {totais["itens"]} itens')
+        self.stdout.write(f'{totais["movimentacoes"]} movimentações arquivadas')
+        self.stdout.write(self.style.SUCCESS('Arquivamento concluído'))
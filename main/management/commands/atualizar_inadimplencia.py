@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from main.inadimplencia import atualizar_inadimplencia
+
+
+class Command(BaseCommand):
+    help = (
+        'Marca as locações vencidas e atualiza o status dos clientes inadimplentes '
+        '(agendar diariamente, logo após a meia-noite)'
+    )
+
+    def handle(self, *args, **options):
+        resultado = atualizar_inadimplencia()
+
+        self.stdout.write(f'{resultado["locacoes_vencidas"]} locações vencidas')
+        self.stdout.write(f'{resultado["locacoes_regularizadas"]} locações regularizadas')
+        self.stdout.write(f'{resultado["clientes_inadimplentes"]} clientes inadimplentes')
+        self.stdout.write(f'{resultado["clientes_regularizados"]} clientes regularizados')
+        self.stdout.write(self.style.SUCCESS('Inadimplência atualizada'))
@@ -0,0 +1,110 @@
+import json
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from backend.urls import router
+
+
+def percentil(valores, p):
+    """
+    Percentil por interpolação linear (valores já ordenados); None sem valores
+    """
+    if not valores:
+        return None
+    if len(valores) == 1:
+        return valores[0]
+    posicao = (len(valores) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(valores) - 1)
+    return valores[inferior] + (valores[superior] - valores[inferior]) * (posicao - inferior)
+
+
+class Command(BaseCommand):
+    help = 'Mede latência (p50/p95/p99) e número de consultas de todas as rotas GET da API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteracoes', type=int, default=20)
+        parser.add_argument('--aquecimento', type=int, default=2, help='Requisições descartadas antes de medir')
+        parser.add_argument('--filtro', default='', help='Mede apenas as rotas que contêm este texto')
+        parser.add_argument('--manter-cache', action='store_true', help='Não limpa o cache entre as requisições')
+        parser.add_argument('--json', action='store_true', help='Emite o resultado em JSON')
+
+    def handle(self, *args, **options):
+        if options['iteracoes'] < 1:
+            raise CommandError('--iteracoes deve ser pelo menos 1')
+        if options['aquecimento'] < 0:
+            raise CommandError('--aquecimento não pode ser negativo')
+
+        client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+        resultados = []
+
+        for url in self._rotas():
+            if options['filtro'] not in url:
+                continue
+
+            tempos = []
+            consultas = 0
+            for i in range(options['aquecimento'] + options['iteracoes']):
+                if not options['manter_cache']:
+                    cache.clear()
+                # O log de consultas da conexão é limitado; limpar evita contagens erradas
+                connection.queries_log.clear()
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    response = client.get(url)
+                    decorrido = (time.perf_counter() - inicio) * 1000
+                if i >= options['aquecimento']:
+                    tempos.append(decorrido)
+                    consultas = max(consultas, len(capturadas))
+
+            tempos.sort()
+            resultados.append({
+                'url': url,
+                'status': response.status_code,
+                'p50': percentil(tempos, 50),
+                'p95': percentil(tempos, 95),
+                'p99': percentil(tempos, 99),
+                'media': statistics.mean(tempos),
+                'consultas': consultas,
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+
+        self.stdout.write(f'{"Rota":<55} {"Status":>6} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"Consultas":>9}')
+        for resultado in resultados:
+            self.stdout.write(
+                f'{resultado["url"]:<55} {resultado["status"]:>6} {resultado["p50"]:>9.2f} '
+                f'{resultado["p95"]:>9.2f} {resultado["p99"]:>9.2f} {resultado["consultas"]:>9}'
+            )
+
+    def _rotas(self):
+        """
+        Lista as rotas GET (list, detail e ações extras) de todos os ViewSets registrados no router
+        """
+        for prefixo, viewset, basename in router.registry:
+            queryset = getattr(viewset, 'queryset', None)
+            pk = queryset.values_list('pk', flat=True).first() if queryset is not None else None
+
+            if hasattr(viewset, 'list'):
+                yield reverse(f'{basename}-list')
+            if hasattr(viewset, 'retrieve') and pk is not None:
+                yield reverse(f'{basename}-detail', kwargs={'pk': pk})
+
+            for acao in viewset.get_extra_actions():
+                if 'get' not in acao.mapping:
+                    continue
+                if acao.detail:
+                    if pk is None:
+                        continue
+                    yield reverse(f'{basename}-{acao.url_name}', kwargs={'pk': pk})
+                else:
+                    yield reverse(f'{basename}-{acao.url_name}')
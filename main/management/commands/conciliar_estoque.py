@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from main.conciliacao import conciliar
+
+
+class Command(BaseCommand):
+    help = (
+        'Confere os contadores de estoque das peças com as movimentações e os itens das '
+        'locações em aberto (processando só as movimentações novas desde a última execução)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corrigir', action='store_true', help='Grava nas peças os valores esperados')
+        parser.add_argument(
+            '--completa', action='store_true', help='Soma novamente todas as movimentações, não só as novas'
+        )
+        parser.add_argument('--limite', type=int, default=20, help='Divergências listadas na saída')
+
+    def handle(self, *args, **options):
+        conciliacao = conciliar(corrigir=options['corrigir'], completa=options['completa'])
+
+        for divergencia in conciliacao.divergencias.select_related('peca')[:options['limite']]:
+            self.stdout.write(
+                f'{divergencia.peca.codigo}: '
+                f'total {divergencia.quantidade_total} (esperado {divergencia.quantidade_total_esperada}), '
+                f'locada {divergencia.quantidade_locada} (esperado {divergencia.quantidade_locada_esperada}), '
+                f'disponível {divergencia.quantidade_disponivel} '
+                f'(esperado {divergencia.quantidade_disponivel_esperada})'
+                + (' - corrigida' if divergencia.corrigida else '')
+            )
+
+        self.stdout.write(
+            f'{conciliacao.pecas_verificadas} peças verificadas até a movimentação '
+            f'{conciliacao.ultima_movimentacao}: {conciliacao.total_divergencias} com divergência, '
+            f'{conciliacao.total_corrigidas} corrigidas'
+        )
+        estilo = self.style.WARNING if conciliacao.total_divergencias > conciliacao.total_corrigidas else self.style.SUCCESS
+        self.stdout.write(estilo('Conciliação concluída'))
@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from main.replicas import ALIAS_REPLICA, replica_configurada
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia o banco principal para a réplica SQLite (simula a replicação em '
+        'desenvolvimento; execute de novo para a réplica receber as gravações)'
+    )
+
+    def handle(self, *args, **options):
+        principal = connections[DEFAULT_DB_ALIAS]
+        if not replica_configurada():
+            raise CommandError('Réplica não configurada (defina DELTAD_DB_REPLICA)')
+        if principal.vendor != 'sqlite' or connections[ALIAS_REPLICA].vendor != 'sqlite':
+            raise CommandError('A cópia só se aplica a uma réplica SQLite local')
+
+        principal.ensure_connection()
+        destino = sqlite3.connect(connections[ALIAS_REPLICA].settings_dict['NAME'])
+        try:
+            # Cópia consistente mesmo com o principal em uso
+            principal.connection.backup(destino)
+        finally:
+            destino.close()
+        self.stdout.write(self.style.SUCCESS('Réplica atualizada'))
@@ -0,0 +1,236 @@
+import random
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from main.models import (
+    TipoPeca, Peca, Cliente, Locacao, ItemLocacao, MovimentacaoEstoque, SequenciaNumeracao, SEQUENCIA_LOCACAO
+)
+from main.search import CAMPOS_INDEXADOS, get_backend
+from main import resumos
+from main.disponibilidade import STATUS_OCUPAM_ESTOQUE
+from main.inadimplencia import atualizar_inadimplencia
+from main.versoes import incrementar_versao
+
+
+NOMES_TIPOS = [
+    'Andaime Tubular', 'Andaime Fachadeiro', 'Escora Metálica', 'Painel de Forma', 'Plataforma',
+    'Guarda-corpo', 'Rodízio', 'Sapata Ajustável', 'Diagonal', 'Travessa', 'Escada', 'Betoneira',
+]
+
+ESTADOS = ['SC', 'PR', 'RS', 'SP', 'RJ', 'MG']
+
+# Distribuição de status das locações (a maior parte do histórico já está finalizada)
+PESOS_STATUS = {'F': 75, 'A': 15, 'P': 5, 'C': 5}
+
+
+@contextmanager
+def sem_auto_now(*campos):
+    """
+    Desliga temporariamente auto_now/auto_now_add para permitir datas retroativas
+    """
+    originais = [(campo, campo.auto_now, campo.auto_now_add) for campo in campos]
+    for campo, _, _ in originais:
+        campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in originais:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Gera uma base sintética de tipos, peças, clientes, locações e movimentações para testes de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipos', type=int, default=50)
+        parser.add_argument('--pecas', type=int, default=5000)
+        parser.add_argument('--clientes', type=int, default=3000)
+        parser.add_argument('--locacoes', type=int, default=30000)
+        parser.add_argument('--itens-por-locacao', type=int, default=5, help='Máximo de itens por locação')
+        parser.add_argument('--movimentacoes', type=int, default=200000)
+        parser.add_argument('--dias', type=int, default=730, help='Janela de histórico em dias')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=2000, help='Tamanho dos lotes de inserção')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.lote = options['lote']
+        self.hoje = timezone.now().date()
+        self.dias = options['dias']
+
+        with transaction.atomic():
+            usuario, _ = User.objects.get_or_create(username='gerador')
+            tipos = self._gerar_tipos(options['tipos'])
+            pecas = self._gerar_pecas(tipos, options['pecas'])
+            clientes = self._gerar_clientes(options['clientes'])
+            itens = self._gerar_locacoes(clientes, pecas, options['locacoes'], options['itens_por_locacao'])
+            self._gerar_movimentacoes(pecas, itens, usuario, options['movimentacoes'])
+
+            # bulk_create não dispara os sinais que mantêm o índice de busca e os resumos diários
+            for model in CAMPOS_INDEXADOS:
+                get_backend().reconstruir(model)
+            resumos.reconstruir()
+            # Nem as marcações de vencimento e inadimplência
+            atualizar_inadimplencia()
+            incrementar_versao(TipoPeca, Peca, Cliente, ItemLocacao)
+
+        self.stdout.write(self.style.SUCCESS('Base sintética gerada com sucesso'))
+
+    def _data_aleatoria(self):
+        return self.hoje - timedelta(days=self.random.randint(0, self.dias))
+
+    def _gerar_tipos(self, total):
+        tipos = TipoPeca.objects.bulk_create([
+            TipoPeca(
+                nome=f'{NOMES_TIPOS[i % len(NOMES_TIPOS)]} {i // len(NOMES_TIPOS) + 1}',
+                valor_locacao=Decimal(self.random.randint(100, 20000)) / 100,
+            )
+            for i in range(total)
+        ], batch_size=self.lote)
+        self.stdout.write(f'{len(tipos)} tipos de peça')
+        return tipos
+
+    def _gerar_pecas(self, tipos, total):
+        inicio = Peca.objects.count()
+        pecas = Peca.objects.bulk_create([
+            Peca(
+                tipo_peca=self.random.choice(tipos),
+                codigo=f'GEN-{inicio + i:07d}',
+                quantidade_total=self.random.randint(50, 1000),
+            )
+            for i in range(total)
+        ], batch_size=self.lote)
+        self.stdout.write(f'{len(pecas)} peças')
+        return pecas
+
+    def _gerar_clientes(self, total):
+        inicio = Cliente.objects.count()
+        clientes = []
+        for i in range(total):
+            pessoa_juridica = self.random.random() < 0.6
+            clientes.append(Cliente(
+                nome=f'{"Construtora" if pessoa_juridica else "Cliente"} {inicio + i}',
+                tipo_pessoa='J' if pessoa_juridica else 'F',
+                cpf_cnpj=f'{inicio + i:014d}' if pessoa_juridica else f'{inicio + i:011d}',
+                telefone='(48) 99999-0000',
+                endereco=f'Rua {self.random.randint(1, 500)}, {self.random.randint(1, 2000)}',
+                cidade='Florianópolis',
+                estado=self.random.choice(ESTADOS),
+                cep='88000-000',
+                status='I' if self.random.random() < 0.05 else 'A',
+            ))
+        clientes = Cliente.objects.bulk_create(clientes, batch_size=self.lote)
+        self.stdout.write(f'{len(clientes)} clientes')
+        return clientes
+
+    def _gerar_locacoes(self, clientes, pecas, total, max_itens):
+        numero_inicial = SequenciaNumeracao.objects.reservar(SEQUENCIA_LOCACAO, total)
+        # Poucas peças concentram a maior parte das locações (distribuição de Pareto)
+        pesos_pecas = [self.random.paretovariate(1.2) for _ in pecas]
+        # Alguns clientes concentram a maior parte dos contratos
+        pesos_clientes = [self.random.paretovariate(1.5) for _ in clientes]
+        status_choices, status_pesos = zip(*PESOS_STATUS.items())
+        locada = defaultdict(int)
+
+        locacoes = []
+        itens_por_locacao = []
+        for i in range(total):
+            data_locacao = self._data_aleatoria()
+            previsao = data_locacao + timedelta(days=self.random.choice([7, 15, 30, 60, 90]))
+            status = self.random.choices(status_choices, status_pesos)[0]
+
+            itens = []
+            for peca in set(self.random.choices(pecas, pesos_pecas, k=self.random.randint(1, max_itens))):
+                quantidade = self.random.randint(1, 20)
+                if status in STATUS_OCUPAM_ESTOQUE:
+                    # Locações ativas e pendentes (todas já iniciadas) só podem reservar o que ainda está disponível
+                    quantidade = min(quantidade, peca.quantidade_total - locada[peca.pk])
+                    if quantidade <= 0:
+                        continue
+                    locada[peca.pk] += quantidade
+                itens.append(ItemLocacao(
+                    peca=peca,
+                    quantidade=quantidade,
+                    valor_total_item=quantidade * peca.tipo_peca.valor_locacao,
+                ))
+            valor_total = sum((item.valor_total_item for item in itens), Decimal('0.00'))
+            desconto = (valor_total * Decimal(self.random.choice([0, 0, 0, 5, 10])) / 100).quantize(Decimal('0.01'))
+
+            locacoes.append(Locacao(
+                numero_locacao=numero_inicial + i,
+                cliente=self.random.choices(clientes, pesos_clientes)[0],
+                data_locacao=data_locacao,
+                data_previsao_devolucao=previsao,
+                data_devolucao=min(previsao + timedelta(days=self.random.randint(-3, 10)), self.hoje)
+                if status == 'F' else None,
+                status=status,
+                # Todas já iniciadas: o estoque das ativas e pendentes está nos contadores
+                estoque_reservado=True,
+                valor_total=valor_total,
+                desconto=desconto,
+                valor_final=valor_total - desconto,
+            ))
+            itens_por_locacao.append(itens)
+
+        locacoes = Locacao.objects.bulk_create(locacoes, batch_size=self.lote)
+        itens = []
+        for locacao, itens_locacao in zip(locacoes, itens_por_locacao):
+            for item in itens_locacao:
+                item.locacao = locacao
+                itens.append(item)
+        ItemLocacao.objects.bulk_create(itens, batch_size=self.lote)
+
+        # Manter os contadores de estoque coerentes com as locações que ocupam o estoque
+        for peca in pecas:
+            peca.quantidade_locada = locada[peca.pk]
+            peca.quantidade_disponivel = peca.quantidade_total - peca.quantidade_locada
+        Peca.objects.bulk_update(pecas, ['quantidade_locada', 'quantidade_disponivel'], batch_size=self.lote)
+
+        self.stdout.write(f'{len(locacoes)} locações com {len(itens)} itens')
+        return itens
+
+    def _gerar_movimentacoes(self, pecas, itens, usuario, total):
+        def momento(data):
+            return timezone.make_aware(
+                datetime.combine(data, time(self.random.randint(7, 18), self.random.randint(0, 59)))
+            )
+
+        movimentacoes = []
+        # Saídas e devoluções geradas pelas próprias locações
+        for item in itens:
+            if len(movimentacoes) >= total:
+                break
+            locacao = item.locacao
+            if locacao.status in ('A', 'F'):
+                movimentacoes.append(MovimentacaoEstoque(
+                    peca=item.peca, tipo_movimentacao='S', quantidade=item.quantidade, locacao=locacao,
+                    motivo='Locação', usuario=usuario, data_movimentacao=momento(locacao.data_locacao),
+                ))
+            if locacao.status == 'F' and len(movimentacoes) < total:
+                movimentacoes.append(MovimentacaoEstoque(
+                    peca=item.peca, tipo_movimentacao='E', quantidade=item.quantidade, locacao=locacao,
+                    motivo='Devolução de locação', usuario=usuario, data_movimentacao=momento(locacao.data_devolucao),
+                ))
+
+        # Ajustes, sinistros e manutenções completam o volume pedido
+        motivos = ['Ajuste manual', 'Sinistro', 'Manutenção', 'Compra']
+        while len(movimentacoes) < total:
+            movimentacoes.append(MovimentacaoEstoque(
+                peca=self.random.choice(pecas),
+                tipo_movimentacao=self.random.choice('ES'),
+                quantidade=self.random.randint(1, 30),
+                motivo=self.random.choice(motivos),
+                usuario=usuario,
+                data_movimentacao=momento(self._data_aleatoria()),
+            ))
+
+        with sem_auto_now(MovimentacaoEstoque._meta.get_field('data_movimentacao')):
+            MovimentacaoEstoque.objects.bulk_create(movimentacoes, batch_size=self.lote)
+        self.stdout.write(f'{len(movimentacoes)} movimentações de estoque')
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.importacao import ler_csv, PecaImportador, ClienteImportador
+
+
+IMPORTADORES = {
+    'pecas': PecaImportador,
+    'clientes': ClienteImportador,
+}
+
+
+class Command(BaseCommand):
+    help = 'Importa peças ou clientes em lote a partir de um arquivo CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=IMPORTADORES)
+        parser.add_argument('arquivo')
+        parser.add_argument('--simular', action='store_true', help='Apenas valida o arquivo, sem gravar')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['arquivo'], encoding='utf-8-sig', newline='') as arquivo:
+                linhas = ler_csv(arquivo)
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f'Não foi possível ler o arquivo: {e}')
+
+        resultado = IMPORTADORES[options['modelo']]().importar(linhas, simular=options['simular'])
+        for erro in resultado['erros']:
+            self.stderr.write(f'Linha {erro["linha"]}: {json.dumps(erro["erros"], ensure_ascii=False)}')
+        if resultado['erros']:
+            raise CommandError(f'{len(resultado["erros"])} linha(s) com erro; nada foi importado')
+
+        if options['simular']:
+            self.stdout.write(self.style.SUCCESS(f'{resultado["total_linhas"]} linhas válidas'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{resultado["criados"]} registros importados'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from main.idempotencia import limpar_chaves_expiradas
+
+
+class Command(BaseCommand):
+    help = 'Remove as respostas guardadas para as chaves de idempotência já expiradas'
+
+    def handle(self, *args, **options):
+        removidas = limpar_chaves_expiradas()
+        self.stdout.write(self.style.SUCCESS(f'{removidas} chaves de idempotência removidas'))
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import resumos
+from main.models import ResumoDiarioLocacao, ResumoDiarioMovimentacao
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os resumos diários de locações e movimentações a partir dos registros de origem'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-inicio', help='Primeiro dia recalculado (YYYY-MM-DD)')
+        parser.add_argument('--data-fim', help='Último dia recalculado (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            inicio, fim = (
+                datetime.strptime(options[opcao], '%Y-%m-%d').date() if options[opcao] else None
+                for opcao in ('data_inicio', 'data_fim')
+            )
+        except ValueError:
+            raise CommandError('Formato de data inválido. Use YYYY-MM-DD')
+
+        resumos.reconstruir(inicio, fim)
+
+        self.stdout.write(f'{ResumoDiarioLocacao.objects.count()} resumos diários de locações')
+        self.stdout.write(f'{ResumoDiarioMovimentacao.objects.count()} resumos diários de movimentações')
+        self.stdout.write(self.style.SUCCESS('Resumos diários reconstruídos'))
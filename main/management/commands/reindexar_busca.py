@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main.search import CAMPOS_INDEXADOS, get_backend
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca textual de clientes, peças e locações'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if not backend.indexado:
+            self.stdout.write('O backend de busca configurado não mantém índice próprio')
+            return
+
+        with transaction.atomic():
+            for model in CAMPOS_INDEXADOS:
+                backend.reconstruir(model)
+                self.stdout.write(f'{model._meta.verbose_name_plural}: {model.objects.count()} registros indexados')
+
+        self.stdout.write(self.style.SUCCESS('Índice de busca reconstruído'))
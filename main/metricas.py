@@ -0,0 +1,291 @@
+"""
+Métricas por requisição (view/ação, tempo total, número e tempo das consultas
+SQL e tempo de serialização), mantidas em histogramas no próprio processo e
+expostas em /api/_metrics no formato texto do Prometheus.
+
+Cada processo tem os próprios histogramas; com vários workers, o Prometheus
+deve coletar cada um deles.
+"""
+import logging
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores dos buckets dos histogramas
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Quadros da pilha mostrados no log de consultas lentas
+QUADROS_CONSULTA_LENTA = 6
+
+# Medição da requisição em andamento (propagada para as threads do sync_to_async)
+_medicao = ContextVar('medicao', default=None)
+# Profundidade de serializers aninhados, para medir só o serializer de fora
+_serializando = ContextVar('serializando', default=False)
+
+
+class Histograma:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.contagens = [0] * len(buckets)
+        self.soma = 0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        self.soma += valor
+        self.total += 1
+
+
+class Registro:
+    """
+    Histogramas por (view, método). Um único lock protege as atualizações,
+    que são poucas somas por requisição.
+    """
+    HISTOGRAMAS = {
+        'deltad_requisicao_segundos': ('Tempo total da requisição', BUCKETS_SEGUNDOS),
+        'deltad_sql_consultas': ('Consultas SQL por requisição', BUCKETS_CONSULTAS),
+        'deltad_sql_segundos': ('Tempo em consultas SQL por requisição', BUCKETS_SEGUNDOS),
+        'deltad_serializacao_segundos': ('Tempo de serialização e renderização da resposta', BUCKETS_SEGUNDOS),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        self.histogramas = {}
+        self.respostas = {}
+
+    def registrar(self, medicao, status):
+        rotulos = (medicao.view, medicao.metodo)
+        valores = {
+            'deltad_requisicao_segundos': medicao.duracao,
+            'deltad_sql_consultas': medicao.consultas,
+            'deltad_sql_segundos': medicao.tempo_sql,
+            'deltad_serializacao_segundos': medicao.tempo_serializacao,
+        }
+        with self.lock:
+            for nome, valor in valores.items():
+                chave = (nome, rotulos)
+                if chave not in self.histogramas:
+                    self.histogramas[chave] = Histograma(self.HISTOGRAMAS[nome][1])
+                self.histogramas[chave].observar(valor)
+            chave = (*rotulos, str(status))
+            self.respostas[chave] = self.respostas.get(chave, 0) + 1
+
+    def exportar(self):
+        """
+        Texto no formato de exposição do Prometheus (text/plain; version=0.0.4)
+        """
+        def rotulos(view, metodo, **extras):
+            pares = {'view': view, 'metodo': metodo, **extras}
+            return ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in pares.items())
+
+        with self.lock:
+            linhas = [
+                '# HELP deltad_requisicoes_total Requisições atendidas',
+                '# TYPE deltad_requisicoes_total counter',
+            ]
+            for (view, metodo, status), total in sorted(self.respostas.items()):
+                linhas.append(f'deltad_requisicoes_total{{{rotulos(view, metodo, status=status)}}} {total}')
+
+            for nome, (descricao, _) in self.HISTOGRAMAS.items():
+                linhas.append(f'# HELP {nome} {descricao}')
+                linhas.append(f'# TYPE {nome} histogram')
+                for (chave_nome, (view, metodo)), histograma in sorted(self.histogramas.items()):
+                    if chave_nome != nome:
+                        continue
+                    acumulado = 0
+                    for limite, contagem in zip(histograma.buckets, histograma.contagens):
+                        acumulado += contagem
+                        linhas.append(f'{nome}_bucket{{{rotulos(view, metodo, le=limite)}}} {acumulado}')
+                    linhas.append(f'{nome}_bucket{{{rotulos(view, metodo, le="+Inf")}}} {histograma.total}')
+                    linhas.append(f'{nome}_sum{{{rotulos(view, metodo)}}} {histograma.soma:.6f}')
+                    linhas.append(f'{nome}_count{{{rotulos(view, metodo)}}} {histograma.total}')
+        return '\n'.join(linhas) + '\n'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registro = Registro()
+
+
+class Medicao:
+    """
+    Números de uma requisição; as consultas podem vir de várias threads (views assíncronas)
+    """
+
+    def __init__(self, metodo):
+        self.metodo = metodo
+        self.view = 'desconhecida'
+        self.inicio = time.perf_counter()
+        self.duracao = 0
+        self.consultas = 0
+        self.tempo_sql = 0
+        self.tempo_serializacao = 0
+        self.lock = threading.Lock()
+
+    def somar(self, **valores):
+        with self.lock:
+            for campo, valor in valores.items():
+                setattr(self, campo, getattr(self, campo) + valor)
+
+
+def nome_da_view(view_func, metodo):
+    """
+    `ViewSet.ação` para as views do DRF (LocacaoViewSet.finalizar) e o nome da função nas demais
+    """
+    classe = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if classe is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    acoes = getattr(view_func, 'actions', None) or {}
+    acao = acoes.get(metodo.lower(), metodo.lower())
+    return f'{classe.__name__}.{acao}'
+
+
+def _limite_consulta_lenta():
+    """
+    Em segundos; None desliga o log (settings.METRICAS_CONSULTA_LENTA_MS)
+    """
+    limite = getattr(settings, 'METRICAS_CONSULTA_LENTA_MS', None)
+    return None if limite is None else limite / 1000
+
+
+def _origem_consulta():
+    """
+    Últimos quadros da pilha que pertencem ao projeto (fora do Django e das bibliotecas)
+    """
+    base = str(settings.BASE_DIR)
+    quadros = [
+        quadro for quadro in traceback.extract_stack()[:-3]
+        if quadro.filename.startswith(base) and 'site-packages' not in quadro.filename
+    ]
+    return ''.join(traceback.format_list(quadros[-QUADROS_CONSULTA_LENTA:]))
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """
+    Execute wrapper instalado em todas as conexões: soma número e tempo das
+    consultas na medição da requisição atual e registra as consultas lentas
+    """
+    medicao = _medicao.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        decorrido = time.perf_counter() - inicio
+        medicao.somar(consultas=1, tempo_sql=decorrido)
+        limite = _limite_consulta_lenta()
+        if limite is not None and decorrido >= limite:
+            logger.warning(
+                'Consulta lenta (%.1f ms) em %s %s:\n%s\nOrigem:\n%s',
+                decorrido * 1000, medicao.metodo, medicao.view, sql, _origem_consulta()
+            )
+
+
+@receiver(connection_created)
+def instalar_medicao(sender, connection, **kwargs):
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+class MedirSerializacaoMixin:
+    """
+    Soma na medição da requisição o tempo gasto em to_representation
+    (apenas no serializer mais externo, os aninhados já estão incluídos)
+    """
+
+    def to_representation(self, instance):
+        medicao = _medicao.get()
+        if medicao is None or _serializando.get():
+            return super().to_representation(instance)
+        token = _serializando.set(True)
+        inicio = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            medicao.somar(tempo_serializacao=time.perf_counter() - inicio)
+            _serializando.reset(token)
+
+
+class MetricasMiddleware:
+    """
+    Mede cada requisição e registra os números nos histogramas. Funciona
+    tanto no WSGI quanto no ASGI sem forçar as views assíncronas a rodarem
+    em uma thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        medicao = Medicao(request.method)
+        token = _medicao.set(medicao)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        return self.registrar(medicao, response)
+
+    async def __acall__(self, request):
+        medicao = Medicao(request.method)
+        token = _medicao.set(medicao)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        return self.registrar(medicao, response)
+
+    def registrar(self, medicao, response):
+        # Respostas transmitidas (exportações) são medidas até o início da transmissão
+        medicao.duracao = time.perf_counter() - medicao.inicio
+        registro.registrar(medicao, response.status_code)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicao = _medicao.get()
+        if medicao is not None:
+            medicao.view = nome_da_view(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        # Chamado logo antes de response.render(); o callback mede a renderização
+        medicao = _medicao.get()
+        if medicao is not None:
+            inicio = time.perf_counter()
+            response.add_post_render_callback(
+                lambda response: medicao.somar(tempo_serializacao=time.perf_counter() - inicio)
+            )
+        return response
+
+
+def metricas(request):
+    """
+    Métricas do processo no formato texto do Prometheus
+    """
+    return HttpResponse(registro.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
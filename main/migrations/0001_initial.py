@@ -0,0 +1,140 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:41
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=200, verbose_name='Nome/Razão Social')),
+                ('tipo_pessoa', models.CharField(choices=[('F', 'Pessoa Física'), ('J', 'Pessoa Jurídica')], default='F', max_length=1, verbose_name='Tipo de Pessoa')),
+                ('cpf_cnpj', models.CharField(max_length=18, unique=True, verbose_name='CPF/CNPJ')),
+                ('email', models.EmailField(blank=True, max_length=254, null=True, verbose_name='E-mail')),
+                ('telefone', models.CharField(max_length=20, verbose_name='Telefone')),
+                ('endereco', models.TextField(verbose_name='Endereço')),
+                ('cidade', models.CharField(max_length=100, verbose_name='Cidade')),
+                ('estado', models.CharField(max_length=2, verbose_name='Estado')),
+                ('cep', models.CharField(max_length=10, verbose_name='CEP')),
+                ('status', models.CharField(choices=[('A', 'Ativo'), ('I', 'Inadimplente')], default='A', max_length=1, verbose_name='Status')),
+                ('observacoes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Cliente',
+                'verbose_name_plural': 'Clientes',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Peca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(max_length=50, unique=True, verbose_name='Código da Peça')),
+                ('quantidade_total', models.PositiveIntegerField(default=0, verbose_name='Quantidade Total')),
+                ('quantidade_disponivel', models.PositiveIntegerField(default=0, verbose_name='Quantidade Disponível')),
+                ('quantidade_locada', models.PositiveIntegerField(default=0, verbose_name='Quantidade Locada')),
+                ('observacoes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Peça',
+                'verbose_name_plural': 'Peças',
+                'ordering': ['tipo_peca__nome', 'codigo'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TipoPeca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome da Peça')),
+                ('descricao', models.TextField(blank=True, null=True, verbose_name='Descrição')),
+                ('valor_locacao', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Valor de Locação')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tipo de Peça',
+                'verbose_name_plural': 'Tipos de Peças',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Locacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero_locacao', models.IntegerField(unique=True, verbose_name='Número da Locação')),
+                ('data_locacao', models.DateField(verbose_name='Data de Locação')),
+                ('data_previsao_devolucao', models.DateField(verbose_name='Data Prevista para Devolução')),
+                ('data_devolucao', models.DateField(blank=True, null=True, verbose_name='Data de Devolução')),
+                ('status', models.CharField(choices=[('P', 'Pendente'), ('A', 'Ativa'), ('F', 'Finalizada'), ('C', 'Cancelada')], default='P', max_length=1, verbose_name='Status')),
+                ('valor_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Valor Total')),
+                ('desconto', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))], verbose_name='Desconto')),
+                ('valor_final', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Valor Final')),
+                ('observacoes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Locação',
+                'verbose_name_plural': 'Locações',
+                'ordering': ['-data_locacao', '-numero_locacao'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimentacaoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_movimentacao', models.CharField(choices=[('E', 'Entrada'), ('S', 'Saída')], max_length=1, verbose_name='Tipo de Movimentação')),
+                ('quantidade', models.IntegerField(verbose_name='Quantidade')),
+                ('data_movimentacao', models.DateTimeField(auto_now_add=True, verbose_name='Data da Movimentação')),
+                ('motivo', models.CharField(max_length=200, verbose_name='Motivo da Movimentação')),
+                ('observacoes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('locacao', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='main.locacao', verbose_name='Locação Relacionada')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+                ('peca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.peca', verbose_name='Peça')),
+            ],
+            options={
+                'verbose_name': 'Movimentação de Estoque',
+                'verbose_name_plural': 'Movimentações de Estoque',
+                'ordering': ['-data_movimentacao'],
+            },
+        ),
+        migrations.AddField(
+            model_name='peca',
+            name='tipo_peca',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.tipopeca', verbose_name='Tipo de Peça'),
+        ),
+        migrations.CreateModel(
+            name='ItemLocacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.PositiveIntegerField(verbose_name='Quantidade')),
+                ('valor_total_item', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Valor Total do Item')),
+                ('observacoes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('locacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='main.locacao', verbose_name='Locação')),
+                ('peca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.peca', verbose_name='Peça')),
+            ],
+            options={
+                'verbose_name': 'Item de Locação',
+                'verbose_name_plural': 'Itens de Locação',
+                'unique_together': {('locacao', 'peca')},
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('status', 'I')), fields=['nome'], name='cliente_inadimplente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locacao',
+            index=models.Index(fields=['-data_locacao', '-numero_locacao'], name='locacao_data_numero_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locacao',
+            index=models.Index(fields=['status', '-data_locacao', '-numero_locacao'], name='locacao_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locacao',
+            index=models.Index(fields=['status', 'data_previsao_devolucao'], name='locacao_status_previsao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locacao',
+            index=models.Index(fields=['cliente', '-data_locacao'], name='locacao_cliente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaoestoque',
+            index=models.Index(fields=['-data_movimentacao', '-id'], name='mov_data_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaoestoque',
+            index=models.Index(fields=['peca', '-data_movimentacao'], name='mov_peca_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaoestoque',
+            index=models.Index(fields=['data_movimentacao', 'tipo_movimentacao', 'quantidade'], name='mov_relatorio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='peca',
+            index=models.Index(fields=['quantidade_disponivel'], name='peca_disponivel_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:50
+
+from django.db import migrations
+
+
+# Cópia congelada de main/search.py neste ponto: tabelas FTS5 (uma por modelo,
+# rowid = pk) e campos indexados de cada modelo
+CAMPOS_INDEXADOS = {
+    'Cliente': ['nome', 'cpf_cnpj', 'email', 'telefone', 'cidade'],
+    'Peca': ['codigo', 'tipo_peca__nome', 'observacoes'],
+    'Locacao': ['numero_locacao', 'cliente__nome', 'observacoes'],
+}
+
+
+def montar_conteudo(valores):
+    partes = []
+    for valor in valores:
+        if valor in (None, ''):
+            continue
+        valor = str(valor)
+        partes.append(valor)
+        digitos = ''.join(filter(str.isdigit, valor))
+        if digitos and digitos != valor:
+            partes.append(digitos)
+    return ' '.join(partes)
+
+
+def criar_indice_busca(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for nome, campos in CAMPOS_INDEXADOS.items():
+            model = apps.get_model('main', nome)
+            tabela = f'{model._meta.db_table}_busca'
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {tabela} '
+                f"USING fts5(conteudo, tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(f'DELETE FROM {tabela}')
+            cursor.executemany(
+                f'INSERT INTO {tabela} (rowid, conteudo) VALUES (%s, %s)',
+                [
+                    (linha[0], montar_conteudo(linha[1:]))
+                    for linha in model.objects.order_by().values_list('pk', *campos).iterator(chunk_size=2000)
+                ]
+            )
+
+
+def remover_indice_busca(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for nome in CAMPOS_INDEXADOS:
+            cursor.execute(f'DROP TABLE IF EXISTS {apps.get_model("main", nome)._meta.db_table}_busca')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
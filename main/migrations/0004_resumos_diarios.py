@@ -0,0 +1,84 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:55
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def popular_resumos(apps, schema_editor):
+    Locacao = apps.get_model('main', 'Locacao')
+    MovimentacaoEstoque = apps.get_model('main', 'MovimentacaoEstoque')
+    ResumoDiarioLocacao = apps.get_model('main', 'ResumoDiarioLocacao')
+    ResumoDiarioMovimentacao = apps.get_model('main', 'ResumoDiarioMovimentacao')
+
+    ResumoDiarioLocacao.objects.bulk_create([
+        ResumoDiarioLocacao(
+            data=grupo['data_locacao'],
+            status=grupo['status'],
+            quantidade=grupo['quantidade'],
+            valor_final=grupo['valor'] or Decimal('0.00')
+        )
+        for grupo in Locacao.objects.order_by().values('data_locacao', 'status').annotate(
+            quantidade=Count('id'),
+            valor=Sum('valor_final')
+        )
+    ], batch_size=2000)
+
+    ResumoDiarioMovimentacao.objects.bulk_create([
+        ResumoDiarioMovimentacao(
+            data=grupo['data'],
+            tipo_movimentacao=grupo['tipo_movimentacao'],
+            movimentacoes=grupo['movimentacoes'],
+            quantidade=grupo['quantidade'] or 0
+        )
+        for grupo in MovimentacaoEstoque.objects.order_by().annotate(
+            data=TruncDate('data_movimentacao')
+        ).values('data', 'tipo_movimentacao').annotate(
+            movimentacoes=Count('id'),
+            quantidade=Sum('quantidade')
+        )
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_indice_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioLocacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('status', models.CharField(choices=[('P', 'Pendente'), ('A', 'Ativa'), ('F', 'Finalizada'), ('C', 'Cancelada')], max_length=1, verbose_name='Status')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='Quantidade de Locações')),
+                ('valor_final', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Valor Final')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Locações',
+                'verbose_name_plural': 'Resumos Diários de Locações',
+                'ordering': ['data', 'status'],
+                'constraints': [models.UniqueConstraint(fields=('data', 'status'), name='resumo_locacao_data_status_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoDiarioMovimentacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('tipo_movimentacao', models.CharField(choices=[('E', 'Entrada'), ('S', 'Saída')], max_length=1, verbose_name='Tipo de Movimentação')),
+                ('movimentacoes', models.IntegerField(default=0, verbose_name='Quantidade de Movimentações')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='Quantidade de Peças')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Movimentações',
+                'verbose_name_plural': 'Resumos Diários de Movimentações',
+                'ordering': ['data', 'tipo_movimentacao'],
+                'constraints': [models.UniqueConstraint(fields=('data', 'tipo_movimentacao'), name='resumo_mov_data_tipo_uniq')],
+            },
+        ),
+        migrations.RunPython(popular_resumos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_resumos_diarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConciliacaoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('executada_em', models.DateTimeField(auto_now_add=True, verbose_name='Executada em')),
+                ('ultima_movimentacao', models.IntegerField(default=0, verbose_name='Última Movimentação Processada')),
+                ('completa', models.BooleanField(default=False, verbose_name='Recalculada desde o início')),
+                ('pecas_verificadas', models.IntegerField(default=0, verbose_name='Peças Verificadas')),
+                ('total_divergencias', models.IntegerField(default=0, verbose_name='Peças com Divergência')),
+                ('total_corrigidas', models.IntegerField(default=0, verbose_name='Peças Corrigidas')),
+            ],
+            options={
+                'verbose_name': 'Conciliação de Estoque',
+                'verbose_name_plural': 'Conciliações de Estoque',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoEstoque',
+            fields=[
+                ('peca', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='saldo', serialize=False, to='main.peca', verbose_name='Peça')),
+                ('abertura', models.IntegerField(default=0, verbose_name='Saldo de Abertura')),
+                ('movimentacoes', models.IntegerField(default=0, verbose_name='Saldo das Movimentações')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Estoque',
+                'verbose_name_plural': 'Saldos de Estoque',
+            },
+        ),
+        migrations.CreateModel(
+            name='DivergenciaEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade_total', models.IntegerField(verbose_name='Quantidade Total')),
+                ('quantidade_total_esperada', models.IntegerField(verbose_name='Quantidade Total Esperada')),
+                ('quantidade_locada', models.IntegerField(verbose_name='Quantidade Locada')),
+                ('quantidade_locada_esperada', models.IntegerField(verbose_name='Quantidade Locada Esperada')),
+                ('quantidade_disponivel', models.IntegerField(verbose_name='Quantidade Disponível')),
+                ('quantidade_disponivel_esperada', models.IntegerField(verbose_name='Quantidade Disponível Esperada')),
+                ('corrigida', models.BooleanField(default=False, verbose_name='Corrigida')),
+                ('conciliacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='divergencias', to='main.conciliacaoestoque', verbose_name='Conciliação')),
+                ('peca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.peca', verbose_name='Peça')),
+            ],
+            options={
+                'verbose_name': 'Divergência de Estoque',
+                'verbose_name_plural': 'Divergências de Estoque',
+                'ordering': ['conciliacao', 'peca'],
+            },
+        ),
+    ]
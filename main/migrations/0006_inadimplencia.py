@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:15
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def marcar_vencidas(apps, schema_editor):
+    Locacao = apps.get_model('main', 'Locacao')
+    Locacao.objects.filter(status='A', data_previsao_devolucao__lt=timezone.now().date()).update(vencida=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_conciliacao_estoque'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateTimeField(auto_now_add=True, verbose_name='Data')),
+                ('origem', models.CharField(max_length=50, verbose_name='Origem')),
+                ('modelo', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('objeto_id', models.IntegerField(verbose_name='Registro')),
+                ('campo', models.CharField(max_length=50, verbose_name='Campo')),
+                ('valor_anterior', models.CharField(blank=True, max_length=200, verbose_name='Valor Anterior')),
+                ('valor_novo', models.CharField(blank=True, max_length=200, verbose_name='Valor Novo')),
+            ],
+            options={
+                'verbose_name': 'Registro de Auditoria',
+                'verbose_name_plural': 'Registros de Auditoria',
+                'ordering': ['-data', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='inadimplencia_automatica',
+            field=models.BooleanField(default=False, verbose_name='Inadimplência Automática'),
+        ),
+        migrations.AddField(
+            model_name='locacao',
+            name='vencida',
+            field=models.BooleanField(default=False, verbose_name='Vencida'),
+        ),
+        migrations.AddIndex(
+            model_name='locacao',
+            index=models.Index(condition=models.Q(('vencida', True)), fields=['-data_locacao', '-numero_locacao'], name='locacao_vencida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroauditoria',
+            index=models.Index(fields=['modelo', 'objeto_id', '-data'], name='auditoria_objeto_idx'),
+        ),
+        migrations.RunPython(marcar_vencidas, migrations.RunPython.noop),
+    ]
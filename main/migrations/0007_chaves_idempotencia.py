@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:17
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_inadimplencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('escopo', models.CharField(max_length=50, verbose_name='Escopo')),
+                ('chave', models.CharField(max_length=255, verbose_name='Chave')),
+                ('requisicao', models.CharField(max_length=64, verbose_name='Assinatura da Requisição')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Status da Resposta')),
+                ('resposta', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Resposta')),
+                ('criada_em', models.DateTimeField(auto_now_add=True, verbose_name='Criada em')),
+                ('expira_em', models.DateTimeField(verbose_name='Expira em')),
+            ],
+            options={
+                'verbose_name': 'Chave de Idempotência',
+                'verbose_name_plural': 'Chaves de Idempotência',
+                'indexes': [models.Index(fields=['expira_em'], name='idempotencia_expira_idx')],
+                'constraints': [models.UniqueConstraint(fields=('escopo', 'chave'), name='idempotencia_escopo_chave_uniq')],
+            },
+        ),
+    ]
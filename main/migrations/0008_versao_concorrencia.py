@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_chaves_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='locacao',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, verbose_name='Versão'),
+        ),
+        migrations.AddField(
+            model_name='peca',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, verbose_name='Versão'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_versao_concorrencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaNumeracao',
+            fields=[
+                ('nome', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Sequência')),
+                ('ultimo', models.BigIntegerField(default=0, verbose_name='Último Número')),
+            ],
+            options={
+                'verbose_name': 'Sequência de Numeração',
+                'verbose_name_plural': 'Sequências de Numeração',
+            },
+        ),
+        migrations.AlterField(
+            model_name='locacao',
+            name='numero_locacao',
+            field=models.IntegerField(blank=True, unique=True, verbose_name='Número da Locação'),
+        ),
+    ]
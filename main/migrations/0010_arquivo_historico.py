@@ -0,0 +1,83 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_sequencia_numeracao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocacaoArquivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero_locacao', models.IntegerField(unique=True, verbose_name='Número da Locação')),
+                ('data_locacao', models.DateField(verbose_name='Data de Locação')),
+                ('data_previsao_devolucao', models.DateField(verbose_name='Data Prevista para Devolução')),
+                ('data_devolucao', models.DateField(blank=True, null=True, verbose_name='Data de Devolução')),
+                ('status', models.CharField(choices=[('P', 'Pendente'), ('A', 'Ativa'), ('F', 'Finalizada'), ('C', 'Cancelada')], max_length=1, verbose_name='Status')),
+                ('valor_total', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Valor Total')),
+                ('desconto', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Desconto')),
+                ('valor_final', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Valor Final')),
+                ('observacoes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('arquivada_em', models.DateTimeField(auto_now_add=True, verbose_name='Arquivada em')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Locação Arquivada',
+                'verbose_name_plural': 'Locações Arquivadas',
+                'ordering': ['-data_locacao', '-numero_locacao'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemLocacaoArquivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.PositiveIntegerField(verbose_name='Quantidade')),
+                ('valor_total_item', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Valor Total do Item')),
+                ('observacoes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('peca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.peca', verbose_name='Peça')),
+                ('locacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='main.locacaoarquivada', verbose_name='Locação')),
+            ],
+            options={
+                'verbose_name': 'Item de Locação Arquivado',
+                'verbose_name_plural': 'Itens de Locação Arquivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimentacaoArquivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_movimentacao', models.CharField(choices=[('E', 'Entrada'), ('S', 'Saída')], max_length=1, verbose_name='Tipo de Movimentação')),
+                ('quantidade', models.IntegerField(verbose_name='Quantidade')),
+                ('data_movimentacao', models.DateTimeField(verbose_name='Data da Movimentação')),
+                ('locacao_id', models.IntegerField(blank=True, null=True, verbose_name='Locação Relacionada')),
+                ('motivo', models.CharField(max_length=200, verbose_name='Motivo da Movimentação')),
+                ('observacoes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('arquivada_em', models.DateTimeField(auto_now_add=True, verbose_name='Arquivada em')),
+                ('peca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.peca', verbose_name='Peça')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Movimentação Arquivada',
+                'verbose_name_plural': 'Movimentações Arquivadas',
+                'ordering': ['-data_movimentacao'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='locacaoarquivada',
+            index=models.Index(fields=['cliente', '-data_locacao'], name='arquivo_locacao_cliente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaoarquivada',
+            index=models.Index(fields=['peca', '-data_movimentacao'], name='arquivo_mov_peca_data_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:33
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_arquivo_historico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DescontoVolume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade_minima', models.PositiveIntegerField(unique=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Quantidade Mínima')),
+                ('percentual', models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(Decimal('0.01')), django.core.validators.MaxValueValidator(Decimal('100.00'))], verbose_name='Percentual de Desconto')),
+            ],
+            options={
+                'verbose_name': 'Desconto por Volume',
+                'verbose_name_plural': 'Descontos por Volume',
+                'ordering': ['quantidade_minima'],
+            },
+        ),
+        migrations.AddField(
+            model_name='tipopeca',
+            name='valor_diaria',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Valor da Diária'),
+        ),
+        migrations.AddField(
+            model_name='tipopeca',
+            name='valor_mensal',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Valor Mensal'),
+        ),
+        migrations.AddField(
+            model_name='tipopeca',
+            name='valor_semanal',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Valor Semanal'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:44
+
+from django.db import migrations, models
+
+
+def marcar_reservadas(apps, schema_editor):
+    """
+    Até aqui toda locação reservava o estoque na criação, inclusive as com data
+    de locação futura: todas as locações existentes já ocupam o estoque
+    """
+    Locacao = apps.get_model('main', 'Locacao')
+    Locacao.objects.update(estoque_reservado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_precos_por_periodo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='locacao',
+            name='estoque_reservado',
+            field=models.BooleanField(default=False, verbose_name='Estoque Reservado'),
+        ),
+        migrations.RunPython(marcar_reservadas, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,51 @@
-from django.db import models
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
-from django.core.validators import MinValueValidator
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 
+from .versoes import incrementar_versao
+
+
+class ConflitoVersao(Exception):
+    """
+    O registro foi alterado por outra gravação depois de ter sido lido
+    """
+
+
+class VersaoOtimistaModel(models.Model):
+    """
+    Controle de concorrência otimista: a gravação de um registro existente é um
+    único UPDATE ... WHERE versao = n que passa a versão para n + 1. Se outra
+    gravação chegou antes, nenhuma linha é alterada e ConflitoVersao é levantada,
+    sem manter o registro bloqueado entre a leitura e a gravação.
+    """
+    versao = models.PositiveIntegerField(default=1, verbose_name="Versão")
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'versao'}
+        super().save(*args, **kwargs)
+
+    def _do_update(self, base_qs, using, pk_val, values, *args, **kwargs):
+        campo_versao = self._meta.get_field('versao')
+        esperada = self.versao
+        values = [
+            (campo, model, esperada + 1 if campo is campo_versao else valor) for campo, model, valor in values
+        ]
+        if super()._do_update(base_qs.filter(versao=esperada), using, pk_val, values, *args, **kwargs):
+            self.versao = esperada + 1
+            return True
+        if base_qs.filter(pk=pk_val).exists():
+            raise ConflitoVersao(f'{self._meta.verbose_name} {pk_val} foi alterado(a) por outra gravação')
+        return False
+
 
 class TipoPeca(models.Model):
     """
@@ -16,6 +59,32 @@ class TipoPeca(models.Model):
         validators=[MinValueValidator(Decimal('0.01'))],
         verbose_name="Valor de Locação"
     )
+    # Faixas por período (opcionais): sem nenhuma delas, o valor de locação é
+    # cobrado uma vez por unidade (ver main/precos.py)
+    valor_diaria = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        verbose_name="Valor da Diária"
+    )
+    valor_semanal = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        verbose_name="Valor Semanal"
+    )
+    valor_mensal = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        verbose_name="Valor Mensal"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -28,7 +97,74 @@ class TipoPeca(models.Model):
         return f"{self.nome} - R$ {self.valor_locacao}"
 
 
-class Peca(models.Model):
+class DescontoVolume(models.Model):
+    """
+    Faixa de desconto por volume: percentual aplicado ao valor dos carrinhos
+    com pelo menos `quantidade_minima` unidades
+    """
+    quantidade_minima = models.PositiveIntegerField(
+        unique=True, validators=[MinValueValidator(1)], verbose_name="Quantidade Mínima"
+    )
+    percentual = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01')), MaxValueValidator(Decimal('100.00'))],
+        verbose_name="Percentual de Desconto"
+    )
+
+    class Meta:
+        verbose_name = "Desconto por Volume"
+        verbose_name_plural = "Descontos por Volume"
+        ordering = ['quantidade_minima']
+
+    def __str__(self):
+        return f"A partir de {self.quantidade_minima} unidades: {self.percentual}%"
+
+
+class PecaQuerySet(models.QuerySet):
+    """
+    Operações de estoque em lote, executadas como um único UPDATE no banco
+    """
+
+    @staticmethod
+    def _por_peca(quantidades):
+        return models.Case(
+            *[models.When(pk=peca_id, then=quantidade) for peca_id, quantidade in quantidades.items()],
+            default=0
+        )
+
+    def reservar(self, quantidades):
+        """
+        Move as quantidades ({peca_id: quantidade}) de disponível para locada.
+        Só altera peças que ainda têm quantidade disponível suficiente e
+        retorna o número de peças reservadas.
+        """
+        # update() não dispara os sinais que invalidam as respostas em cache
+        incrementar_versao(Peca)
+        return self.filter(
+            models.Q.create([models.Q(pk=peca_id, quantidade_disponivel__gte=quantidade)
+                             for peca_id, quantidade in quantidades.items()], connector=models.Q.OR)
+        ).update(
+            quantidade_disponivel=models.F('quantidade_disponivel') - self._por_peca(quantidades),
+            quantidade_locada=models.F('quantidade_locada') + self._por_peca(quantidades),
+            versao=models.F('versao') + 1,
+            updated_at=timezone.now(),
+        )
+
+    def devolver(self, quantidades):
+        """
+        Move as quantidades ({peca_id: quantidade}) de locada para disponível
+        """
+        incrementar_versao(Peca)
+        return self.filter(pk__in=quantidades).update(
+            quantidade_locada=models.F('quantidade_locada') - self._por_peca(quantidades),
+            quantidade_disponivel=models.F('quantidade_disponivel') + self._por_peca(quantidades),
+            versao=models.F('versao') + 1,
+            updated_at=timezone.now(),
+        )
+
+
+class Peca(VersaoOtimistaModel):
     """
     Modelo para controle individual de peças em estoque
     """
@@ -41,10 +177,16 @@ class Peca(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PecaQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Peça"
         verbose_name_plural = "Peças"
         ordering = ['tipo_peca__nome', 'codigo']
+        indexes = [
+            # estoque_baixo e peças sem estoque
+            models.Index(fields=['quantidade_disponivel'], name='peca_disponivel_idx'),
+        ]
 
     def __str__(self):
         return f"{self.codigo} - {self.tipo_peca.nome} (Disp: {self.quantidade_disponivel})"
@@ -80,6 +222,8 @@ class Cliente(models.Model):
     estado = models.CharField(max_length=2, verbose_name="Estado")
     cep = models.CharField(max_length=10, verbose_name="CEP")
     status = models.CharField(max_length=1, choices=STATUS_CHOICES, default='A', verbose_name="Status")
+    # Marcado como inadimplente pela rotina de inadimplência (e não manualmente)
+    inadimplencia_automatica = models.BooleanField(default=False, verbose_name="Inadimplência Automática")
     observacoes = models.TextField(blank=True, null=True, verbose_name="Observações")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -88,12 +232,39 @@ class Cliente(models.Model):
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ['nome']
+        indexes = [
+            # inadimplentes (filtra por status e ordena por nome)
+            models.Index(fields=['nome'], condition=models.Q(status='I'), name='cliente_inadimplente_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nome} - {self.cpf_cnpj}"
 
 
-class Locacao(models.Model):
+class LocacaoQuerySet(models.QuerySet):
+
+    def com_totais(self):
+        """
+        Anota a quantidade de itens e a soma dos valores dos itens de cada locação
+        """
+        # Subconsultas correlacionadas (em vez de JOIN + GROUP BY) para que a
+        # ordenação e o LIMIT da paginação possam usar os índices da locação.
+        # Serve também às locações arquivadas, que têm os itens no arquivo.
+        model_itens = self.model._meta.get_field('itens').related_model
+        itens = model_itens.objects.filter(locacao=models.OuterRef('pk')).order_by().values('locacao')
+        return self.annotate(
+            total_itens=Coalesce(
+                models.Subquery(itens.annotate(total=models.Count('id')).values('total')), 0
+            ),
+            valor_itens=Coalesce(
+                models.Subquery(itens.annotate(total=models.Sum('valor_total_item')).values('total')),
+                Decimal('0.00'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
+
+
+class Locacao(VersaoOtimistaModel):
     """
     Modelo principal para controle de locações
     """
@@ -104,12 +275,18 @@ class Locacao(models.Model):
         ('C', 'Cancelada'),
     ]
 
-    numero_locacao = models.IntegerField(unique=True, verbose_name="Número da Locação")
+    # Atribuído ao criar, pela sequência de numeração (SequenciaNumeracao)
+    numero_locacao = models.IntegerField(unique=True, blank=True, verbose_name="Número da Locação")
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, verbose_name="Cliente")
     data_locacao = models.DateField(verbose_name="Data de Locação")
     data_previsao_devolucao = models.DateField(verbose_name="Data Prevista para Devolução")
     data_devolucao = models.DateField(blank=True, null=True, verbose_name="Data de Devolução")
     status = models.CharField(max_length=1, choices=STATUS_CHOICES, default='P', verbose_name="Status")
+    # Ativa com a data prevista de devolução já passada (ver main/inadimplencia.py)
+    vencida = models.BooleanField(default=False, verbose_name="Vencida")
+    # As peças já passaram de disponível para locada (as reservas futuras só
+    # ocupam o estoque atual quando são ativadas)
+    estoque_reservado = models.BooleanField(default=False, verbose_name="Estoque Reservado")
     valor_total = models.DecimalField(
         max_digits=12, 
         decimal_places=2, 
@@ -133,20 +310,114 @@ class Locacao(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LocacaoQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Locação"
         verbose_name_plural = "Locações"
         ordering = ['-data_locacao', '-numero_locacao']
+        indexes = [
+            # Ordenação padrão da listagem e relatório financeiro por período
+            models.Index(fields=['-data_locacao', '-numero_locacao'], name='locacao_data_numero_idx'),
+            # ativas e locações por status na ordenação padrão
+            models.Index(fields=['status', '-data_locacao', '-numero_locacao'], name='locacao_status_data_idx'),
+            # vencidas (status + data prevista de devolução)
+            models.Index(fields=['status', 'data_previsao_devolucao'], name='locacao_status_previsao_idx'),
+            # historico_locacoes do cliente
+            models.Index(fields=['cliente', '-data_locacao'], name='locacao_cliente_data_idx'),
+            # vencidas (apenas as locações marcadas)
+            models.Index(
+                fields=['-data_locacao', '-numero_locacao'], condition=models.Q(vencida=True), name='locacao_vencida_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Locação {self.numero_locacao} - {self.cliente.nome}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores lidos do banco, usados para manter o resumo diário ao salvar
+        instance._resumo_original = instance.chave_resumo()
+        return instance
+
+    def chave_resumo(self):
+        return (self.__dict__.get('data_locacao'), self.__dict__.get('status'), self.__dict__.get('valor_final'))
+
     def save(self, *args, **kwargs):
+        if self._state.adding and self.numero_locacao is None:
+            # Reservado na mesma transação da criação, sem MAX() e sem colisões
+            self.numero_locacao = SequenciaNumeracao.objects.reservar(SEQUENCIA_LOCACAO)
         # Calcular valor final
         self.valor_final = self.valor_total - self.desconto
+        # A marcação de vencida acompanha as alterações de status e de prazo;
+        # a virada do dia é tratada pela rotina de inadimplência
+        previsao = self._meta.get_field('data_previsao_devolucao').to_python(self.data_previsao_devolucao)
+        self.vencida = self.status == 'A' and previsao is not None and previsao < timezone.now().date()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'vencida'}
         super().save(*args, **kwargs)
 
 
+SEQUENCIA_LOCACAO = 'locacao'
+
+
+class SequenciaNumeracaoQuerySet(models.QuerySet):
+    """
+    Reserva de números sequenciais com um UPDATE atômico no contador
+    """
+
+    def reservar(self, nome, quantidade=1):
+        """
+        Reserva `quantidade` números consecutivos da sequência e retorna o
+        primeiro. O contador fica bloqueado até o fim da transação que o chamou
+        (a que grava os registros numerados); se ela for desfeita, os números
+        voltam para a sequência, que assim não tem buracos.
+        """
+        with transaction.atomic(savepoint=False):
+            contador = self.filter(nome=nome)
+            if not contador.update(ultimo=models.F('ultimo') + quantidade):
+                self._iniciar(nome)
+                contador.update(ultimo=models.F('ultimo') + quantidade)
+            return contador.values_list('ultimo', flat=True).get() - quantidade + 1
+
+    def _iniciar(self, nome):
+        """
+        Cria o contador a partir do maior número já usado (só na primeira reserva)
+        """
+        ultimo = max(
+            apps.get_model(model).objects.aggregate(maximo=models.Max(campo))['maximo'] or 0
+            for model, campo in SequenciaNumeracao.NUMERADOS[nome]
+        )
+        try:
+            with transaction.atomic():
+                self.create(nome=nome, ultimo=ultimo)
+        except IntegrityError:
+            pass  # Criado ao mesmo tempo por outra requisição
+
+
+class SequenciaNumeracao(models.Model):
+    """
+    Último número atribuído em cada sequência (ex.: números das locações)
+    """
+    # Tabelas (e campos) cujos números a sequência continua
+    NUMERADOS = {
+        SEQUENCIA_LOCACAO: (('main.Locacao', 'numero_locacao'), ('main.LocacaoArquivada', 'numero_locacao')),
+    }
+
+    nome = models.CharField(max_length=50, primary_key=True, verbose_name="Sequência")
+    ultimo = models.BigIntegerField(default=0, verbose_name="Último Número")
+
+    objects = SequenciaNumeracaoQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Sequência de Numeração"
+        verbose_name_plural = "Sequências de Numeração"
+
+    def __str__(self):
+        return f"{self.nome}: {self.ultimo}"
+
+
 class ItemLocacao(models.Model):
     """
     Modelo para itens específicos de cada locação (relacionamento Many-to-Many personalizado)
@@ -169,14 +440,32 @@ class ItemLocacao(models.Model):
     def __str__(self):
         return f"{self.locacao.numero_locacao} - {self.peca.tipo_peca.nome} (Qtd: {self.quantidade})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Quantidade lida do banco: o item só é precificado de novo se ela mudar
+        instance._quantidade_original = instance.__dict__.get('quantidade')
+        return instance
+
     @property
     def valor_unitario(self):
-        return self.peca.tipo_peca.valor_locacao
+        # Valor cobrado por unidade no período da locação
+        return self.valor_total_item / self.quantidade if self.quantidade else None
 
     def save(self, *args, **kwargs):
-        # Calcular valor total do item
-        self.valor_total_item = self.quantidade * self.valor_unitario
+        # Calcular valor total do item pelas faixas de preço do período da locação (na criação
+        # ou quando a quantidade muda; salvar outros campos mantém o preço acordado)
+        if (
+            self._state.adding or self.valor_total_item is None
+            or self.quantidade != getattr(self, '_quantidade_original', None)
+        ):
+            from .precos import cotar  # precos depende dos modelos
+            cotacao = cotar(
+                {self.peca_id: self.quantidade}, self.locacao.data_locacao, self.locacao.data_previsao_devolucao
+            )
+            self.valor_total_item = cotacao['itens'][0]['valor_total_item']
         super().save(*args, **kwargs)
+        self._quantidade_original = self.quantidade
 
 
 class MovimentacaoEstoque(models.Model):
@@ -208,6 +497,295 @@ class MovimentacaoEstoque(models.Model):
         verbose_name = "Movimentação de Estoque"
         verbose_name_plural = "Movimentações de Estoque"
         ordering = ['-data_movimentacao']
+        indexes = [
+            # Listagem e paginação por cursor (data_movimentacao, id)
+            models.Index(fields=['-data_movimentacao', '-id'], name='mov_data_id_idx'),
+            # Extrato de uma peça
+            models.Index(fields=['peca', '-data_movimentacao'], name='mov_peca_data_idx'),
+            # relatorio_movimentacoes: cobre o filtro por período e as somas por tipo
+            models.Index(fields=['data_movimentacao', 'tipo_movimentacao', 'quantidade'], name='mov_relatorio_idx'),
+        ]
 
     def __str__(self):
         return f"{self.peca.codigo} - {self.tipo_movimentacao} ({self.quantidade})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores lidos do banco, usados para manter o resumo diário ao salvar
+        instance._resumo_original = instance.chave_resumo()
+        return instance
+
+    def chave_resumo(self):
+        data_movimentacao = self.__dict__.get('data_movimentacao')
+        return (
+            timezone.localdate(data_movimentacao) if data_movimentacao else None,
+            self.__dict__.get('tipo_movimentacao'),
+            self.__dict__.get('quantidade'),
+        )
+
+
+class ResumoDiarioLocacao(models.Model):
+    """
+    Totais diários de locações por status (pela data de locação), mantidos
+    incrementalmente para os relatórios financeiros
+    """
+    data = models.DateField(verbose_name="Data")
+    status = models.CharField(max_length=1, choices=Locacao.STATUS_CHOICES, verbose_name="Status")
+    quantidade = models.IntegerField(default=0, verbose_name="Quantidade de Locações")
+    valor_final = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Valor Final"
+    )
+
+    class Meta:
+        verbose_name = "Resumo Diário de Locações"
+        verbose_name_plural = "Resumos Diários de Locações"
+        ordering = ['data', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['data', 'status'], name='resumo_locacao_data_status_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.data} - {self.get_status_display()} ({self.quantidade})"
+
+
+class ResumoDiarioMovimentacao(models.Model):
+    """
+    Totais diários de movimentações de estoque por tipo, mantidos
+    incrementalmente para o relatório de movimentações
+    """
+    data = models.DateField(verbose_name="Data")
+    tipo_movimentacao = models.CharField(
+        max_length=1,
+        choices=MovimentacaoEstoque.TIPO_MOVIMENTACAO_CHOICES,
+        verbose_name="Tipo de Movimentação"
+    )
+    movimentacoes = models.IntegerField(default=0, verbose_name="Quantidade de Movimentações")
+    quantidade = models.IntegerField(default=0, verbose_name="Quantidade de Peças")
+
+    class Meta:
+        verbose_name = "Resumo Diário de Movimentações"
+        verbose_name_plural = "Resumos Diários de Movimentações"
+        ordering = ['data', 'tipo_movimentacao']
+        constraints = [
+            models.UniqueConstraint(fields=['data', 'tipo_movimentacao'], name='resumo_mov_data_tipo_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.data} - {self.get_tipo_movimentacao_display()} ({self.quantidade})"
+
+
+class SaldoEstoque(models.Model):
+    """
+    Quantidade total esperada de cada peça segundo o livro razão: saldo de
+    abertura (quantidade adotada na primeira conciliação) mais entradas menos
+    saídas das movimentações sem locação processadas até a última conciliação
+    """
+    peca = models.OneToOneField(
+        Peca, on_delete=models.CASCADE, primary_key=True, related_name='saldo', verbose_name="Peça"
+    )
+    abertura = models.IntegerField(default=0, verbose_name="Saldo de Abertura")
+    movimentacoes = models.IntegerField(default=0, verbose_name="Saldo das Movimentações")
+
+    class Meta:
+        verbose_name = "Saldo de Estoque"
+        verbose_name_plural = "Saldos de Estoque"
+
+    def __str__(self):
+        return f"{self.peca_id} - {self.quantidade_total}"
+
+    @property
+    def quantidade_total(self):
+        return self.abertura + self.movimentacoes
+
+
+class ConciliacaoEstoque(models.Model):
+    """
+    Execução da conciliação do estoque; guarda a última movimentação
+    processada, a partir da qual a próxima execução continua
+    """
+    executada_em = models.DateTimeField(auto_now_add=True, verbose_name="Executada em")
+    ultima_movimentacao = models.IntegerField(default=0, verbose_name="Última Movimentação Processada")
+    completa = models.BooleanField(default=False, verbose_name="Recalculada desde o início")
+    pecas_verificadas = models.IntegerField(default=0, verbose_name="Peças Verificadas")
+    total_divergencias = models.IntegerField(default=0, verbose_name="Peças com Divergência")
+    total_corrigidas = models.IntegerField(default=0, verbose_name="Peças Corrigidas")
+
+    class Meta:
+        verbose_name = "Conciliação de Estoque"
+        verbose_name_plural = "Conciliações de Estoque"
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"Conciliação {self.executada_em:%d/%m/%Y %H:%M} ({self.total_divergencias} divergências)"
+
+
+class DivergenciaEstoque(models.Model):
+    """
+    Peça cujos contadores não batiam com o livro razão e os itens em aberto em uma conciliação
+    """
+    conciliacao = models.ForeignKey(
+        ConciliacaoEstoque, on_delete=models.CASCADE, related_name='divergencias', verbose_name="Conciliação"
+    )
+    peca = models.ForeignKey(Peca, on_delete=models.CASCADE, verbose_name="Peça")
+    quantidade_total = models.IntegerField(verbose_name="Quantidade Total")
+    quantidade_total_esperada = models.IntegerField(verbose_name="Quantidade Total Esperada")
+    quantidade_locada = models.IntegerField(verbose_name="Quantidade Locada")
+    quantidade_locada_esperada = models.IntegerField(verbose_name="Quantidade Locada Esperada")
+    quantidade_disponivel = models.IntegerField(verbose_name="Quantidade Disponível")
+    quantidade_disponivel_esperada = models.IntegerField(verbose_name="Quantidade Disponível Esperada")
+    corrigida = models.BooleanField(default=False, verbose_name="Corrigida")
+
+    class Meta:
+        verbose_name = "Divergência de Estoque"
+        verbose_name_plural = "Divergências de Estoque"
+        ordering = ['conciliacao', 'peca']
+
+    def __str__(self):
+        return f"{self.peca_id} - total {self.quantidade_total}/{self.quantidade_total_esperada}"
+
+
+class RegistroAuditoria(models.Model):
+    """
+    Alteração de um campo feita por uma rotina automática
+    """
+    data = models.DateTimeField(auto_now_add=True, verbose_name="Data")
+    origem = models.CharField(max_length=50, verbose_name="Origem")
+    modelo = models.CharField(max_length=100, verbose_name="Modelo")
+    objeto_id = models.IntegerField(verbose_name="Registro")
+    campo = models.CharField(max_length=50, verbose_name="Campo")
+    valor_anterior = models.CharField(max_length=200, blank=True, verbose_name="Valor Anterior")
+    valor_novo = models.CharField(max_length=200, blank=True, verbose_name="Valor Novo")
+
+    class Meta:
+        verbose_name = "Registro de Auditoria"
+        verbose_name_plural = "Registros de Auditoria"
+        ordering = ['-data', '-id']
+        indexes = [
+            # Histórico de um registro
+            models.Index(fields=['modelo', 'objeto_id', '-data'], name='auditoria_objeto_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id}: {self.campo} {self.valor_anterior} -> {self.valor_novo}"
+
+
+class ChaveIdempotencia(models.Model):
+    """
+    Resposta de uma operação enviada com o cabeçalho Idempotency-Key,
+    devolvida sem executar a operação novamente quando a requisição é repetida
+    """
+    escopo = models.CharField(max_length=50, verbose_name="Escopo")  # usuário que enviou a chave
+    chave = models.CharField(max_length=255, verbose_name="Chave")
+    requisicao = models.CharField(max_length=64, verbose_name="Assinatura da Requisição")
+    # Nulo enquanto a operação está em andamento
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True, verbose_name="Status da Resposta")
+    resposta = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder, verbose_name="Resposta")
+    criada_em = models.DateTimeField(auto_now_add=True, verbose_name="Criada em")
+    expira_em = models.DateTimeField(verbose_name="Expira em")
+
+    class Meta:
+        verbose_name = "Chave de Idempotência"
+        verbose_name_plural = "Chaves de Idempotência"
+        constraints = [
+            models.UniqueConstraint(fields=['escopo', 'chave'], name='idempotencia_escopo_chave_uniq'),
+        ]
+        indexes = [
+            # Limpeza das chaves expiradas
+            models.Index(fields=['expira_em'], name='idempotencia_expira_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.escopo} - {self.chave}"
+
+
+class LocacaoArquivada(models.Model):
+    """
+    Locação finalizada ou cancelada movida para o arquivo (main/arquivamento.py),
+    com o mesmo id e número que tinha na tabela de locações
+    """
+    numero_locacao = models.IntegerField(unique=True, verbose_name="Número da Locação")
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, verbose_name="Cliente")
+    data_locacao = models.DateField(verbose_name="Data de Locação")
+    data_previsao_devolucao = models.DateField(verbose_name="Data Prevista para Devolução")
+    data_devolucao = models.DateField(blank=True, null=True, verbose_name="Data de Devolução")
+    status = models.CharField(max_length=1, choices=Locacao.STATUS_CHOICES, verbose_name="Status")
+    valor_total = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Valor Total")
+    desconto = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Desconto")
+    valor_final = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Valor Final")
+    observacoes = models.TextField(blank=True, null=True, verbose_name="Observações")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    arquivada_em = models.DateTimeField(auto_now_add=True, verbose_name="Arquivada em")
+
+    objects = LocacaoQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Locação Arquivada"
+        verbose_name_plural = "Locações Arquivadas"
+        ordering = ['-data_locacao', '-numero_locacao']
+        indexes = [
+            # historico_locacoes do cliente
+            models.Index(fields=['cliente', '-data_locacao'], name='arquivo_locacao_cliente_idx'),
+        ]
+
+    def __str__(self):
+        return f"Locação {self.numero_locacao} (arquivada)"
+
+
+class ItemLocacaoArquivado(models.Model):
+    """
+    Item de uma locação arquivada
+    """
+    locacao = models.ForeignKey(
+        LocacaoArquivada, on_delete=models.CASCADE, related_name='itens', verbose_name="Locação"
+    )
+    peca = models.ForeignKey(Peca, on_delete=models.CASCADE, verbose_name="Peça")
+    quantidade = models.PositiveIntegerField(verbose_name="Quantidade")
+    valor_total_item = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Valor Total do Item")
+    observacoes = models.TextField(blank=True, null=True, verbose_name="Observações")
+
+    class Meta:
+        verbose_name = "Item de Locação Arquivado"
+        verbose_name_plural = "Itens de Locação Arquivados"
+
+    def __str__(self):
+        return f"{self.locacao.numero_locacao} - {self.peca.codigo} (Qtd: {self.quantidade})"
+
+    @property
+    def valor_unitario(self):
+        return self.valor_total_item / self.quantidade if self.quantidade else None
+
+
+class MovimentacaoArquivada(models.Model):
+    """
+    Movimentação de estoque movida para o arquivo: as das locações arquivadas
+    e os ajustes mais antigos que o prazo de retenção
+    """
+    peca = models.ForeignKey(Peca, on_delete=models.CASCADE, verbose_name="Peça")
+    tipo_movimentacao = models.CharField(
+        max_length=1, choices=MovimentacaoEstoque.TIPO_MOVIMENTACAO_CHOICES, verbose_name="Tipo de Movimentação"
+    )
+    quantidade = models.IntegerField(verbose_name="Quantidade")
+    data_movimentacao = models.DateTimeField(verbose_name="Data da Movimentação")
+    # Sem chave estrangeira: a locação pode estar arquivada ou, nos ajustes, não existir
+    locacao_id = models.IntegerField(blank=True, null=True, verbose_name="Locação Relacionada")
+    motivo = models.CharField(max_length=200, verbose_name="Motivo da Movimentação")
+    observacoes = models.TextField(blank=True, null=True, verbose_name="Observações")
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Usuário")
+    arquivada_em = models.DateTimeField(auto_now_add=True, verbose_name="Arquivada em")
+
+    class Meta:
+        verbose_name = "Movimentação Arquivada"
+        verbose_name_plural = "Movimentações Arquivadas"
+        ordering = ['-data_movimentacao']
+        indexes = [
+            # Extrato de uma peça
+            models.Index(fields=['peca', '-data_movimentacao'], name='arquivo_mov_peca_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.peca.codigo} - {self.tipo_movimentacao} ({self.quantidade}, arquivada)"
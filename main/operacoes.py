@@ -0,0 +1,119 @@
+"""
+Operações de estoque em lote, usadas pela API e pelas ações do admin: cada
+uma executa um número fixo de consultas, independente da quantidade de
+registros selecionados.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Peca, Locacao, ItemLocacao, MovimentacaoEstoque
+from .versoes import incrementar_versao
+from . import resumos
+
+
+@transaction.atomic
+def finalizar_locacoes(ids, data_devolucao, usuario):
+    """
+    Devolve ao estoque as peças das locações ativas informadas com um número
+    fixo de consultas, independente da quantidade de locações e itens.
+    Retorna os ids das locações finalizadas.
+    """
+    ids = list(
+        Locacao.objects.select_for_update().filter(pk__in=ids, status='A').values_list('id', flat=True)
+    )
+    if not ids:
+        return []
+
+    # Atualizar status das locações (update() não dispara os sinais do resumo diário)
+    resumos.mudar_status_locacoes(Locacao.objects.filter(pk__in=ids, status='A'), 'F')
+    Locacao.objects.filter(pk__in=ids, status='A').update(
+        status='F',
+        vencida=False,
+        versao=F('versao') + 1,
+        data_devolucao=data_devolucao,
+        updated_at=timezone.now()
+    )
+    incrementar_versao(Locacao)
+
+    # Só voltam ao estoque as peças que saíram dele (uma reserva futura nunca ativada não as retirou)
+    itens = list(ItemLocacao.objects.filter(locacao_id__in=ids, locacao__estoque_reservado=True).values_list(
+        'locacao_id', 'peca_id', 'quantidade'
+    ))
+
+    # Devolver peças ao estoque
+    quantidades = defaultdict(int)
+    for _, peca_id, quantidade in itens:
+        quantidades[peca_id] += quantidade
+    if quantidades:
+        Peca.objects.devolver(quantidades)
+
+    # Registrar movimentações
+    movimentacoes = MovimentacaoEstoque.objects.bulk_create([
+        MovimentacaoEstoque(
+            peca_id=peca_id,
+            tipo_movimentacao='E',
+            quantidade=quantidade,
+            locacao_id=locacao_id,
+            motivo='Devolução de locação',
+            usuario=usuario
+        )
+        for locacao_id, peca_id, quantidade in itens
+    ])
+    resumos.registrar_novas_movimentacoes(movimentacoes)
+
+    return ids
+
+
+@transaction.atomic
+def reservar_estoque(locacao):
+    """
+    Move as peças de uma reserva antecipada que começou de disponível para
+    locada. Retorna False, sem alterar nada, se faltar estoque para algum item.
+    """
+    quantidades = dict(locacao.itens.values_list('peca_id', 'quantidade'))
+    if quantidades and Peca.objects.reservar(quantidades) != len(quantidades):
+        transaction.set_rollback(True)
+        return False
+    Locacao.objects.filter(pk=locacao.pk).update(estoque_reservado=True)
+    locacao.estoque_reservado = True
+    return True
+
+
+@transaction.atomic
+def ajustar_estoque(ids, diferenca, usuario, motivo='Ajuste manual'):
+    """
+    Soma `diferenca` (negativa para retirar) à quantidade total e à disponível
+    das peças informadas em um único UPDATE. As peças sem quantidade disponível
+    para a retirada não são alteradas. Retorna os ids das peças ajustadas.
+    """
+    pecas = Peca.objects.select_for_update().filter(pk__in=ids)
+    if diferenca < 0:
+        pecas = pecas.filter(quantidade_disponivel__gte=-diferenca)
+    ids = list(pecas.values_list('id', flat=True))
+    if not ids or not diferenca:
+        return []
+
+    Peca.objects.filter(pk__in=ids).update(
+        quantidade_total=F('quantidade_total') + diferenca,
+        quantidade_disponivel=F('quantidade_disponivel') + diferenca,
+        versao=F('versao') + 1,
+        updated_at=timezone.now()
+    )
+    incrementar_versao(Peca)
+
+    movimentacoes = MovimentacaoEstoque.objects.bulk_create([
+        MovimentacaoEstoque(
+            peca_id=peca_id,
+            tipo_movimentacao='E' if diferenca > 0 else 'S',
+            quantidade=abs(diferenca),
+            motivo=motivo,
+            usuario=usuario
+        )
+        for peca_id in ids
+    ])
+    resumos.registrar_novas_movimentacoes(movimentacoes)
+
+    return ids
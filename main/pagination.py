@@ -0,0 +1,157 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.encoding import force_str
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por chave (keyset) sobre uma ordenação única, sem COUNT(*) nem OFFSET.
+    O cursor guarda os valores dos campos de ordenação do último registro
+    visto, então continua válido mesmo com a inserção de novos registros.
+    """
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    # Os campos devem identificar unicamente cada registro (termine com o id)
+    ordering = ('-id',)
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverso = cursor is not None and cursor['r']
+
+        ordering = [self._inverter(campo) for campo in self.ordering] if reverso else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self._posterior_a(ordering, cursor['v'], queryset.model))
+
+        resultados = list(queryset[:self.page_size + 1])
+        mais = len(resultados) > self.page_size
+        resultados = resultados[:self.page_size]
+        if reverso:
+            resultados.reverse()
+
+        self.page = resultados
+        self.has_next = mais if not reverso else cursor is not None
+        self.has_previous = cursor is not None if not reverso else mais
+        return resultados
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverso=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverso=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if not isinstance(cursor['v'], list) or len(cursor['v']) != len(self.ordering):
+                raise ValueError
+            cursor['r'] = bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, instancia, reverso):
+        valores = [force_str(getattr(instancia, campo.lstrip('-'))) for campo in self.ordering]
+        encoded = base64.urlsafe_b64encode(
+            json.dumps({'v': valores, 'r': int(reverso)}).encode('utf-8')
+        ).decode('ascii')
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def _inverter(campo):
+        return campo[1:] if campo.startswith('-') else f'-{campo}'
+
+    def _posterior_a(self, ordering, valores, model):
+        """
+        Monta o predicado lexicográfico "vem depois de (v1, v2, ...)" para a ordenação informada
+        """
+        try:
+            valores = [
+                model._meta.get_field(campo.lstrip('-')).to_python(valor)
+                for campo, valor in zip(ordering, valores)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        predicado = Q()
+        iguais = Q()
+        for campo, valor in zip(ordering, valores):
+            nome = campo.lstrip('-')
+            lookup = 'lt' if campo.startswith('-') else 'gt'
+            predicado |= iguais & Q(**{f'{nome}__{lookup}': valor})
+            iguais &= Q(**{nome: valor})
+        return predicado
+
+
+class MovimentacaoKeysetPagination(KeysetPagination):
+    ordering = ('-data_movimentacao', '-id')
+
+
+class ItemLocacaoKeysetPagination(KeysetPagination):
+    ordering = ('-id',)
+
+
+class PaginacaoSelecionavelMixin:
+    """
+    Permite ao cliente escolher a paginação por cursor com ?paginacao=cursor
+    (ou ao seguir um link com ?cursor=), mantendo a paginação padrão por página
+    """
+    cursor_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('paginacao') == 'cursor' or 'cursor' in params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
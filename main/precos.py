@@ -0,0 +1,128 @@
+"""
+Motor de preços: calcula de uma vez o valor de um carrinho (as peças e
+quantidades de uma locação ou de uma cotação), com uma única leitura do
+catálogo.
+
+Sem faixas por período, o valor de locação do tipo é cobrado uma vez por
+unidade. Com faixas (diária, semanal e/ou mensal), cada unidade paga a
+combinação mais barata de dias, semanas e meses que cobre o período; o valor
+é calculado uma vez por tarifa, não por item. Sobre o total do carrinho vale
+o desconto por volume (DescontoVolume) da quantidade total de unidades.
+"""
+from bisect import bisect_right
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Peca, DescontoVolume
+from .versoes import CACHE_RESPOSTAS_TIMEOUT, obter_versoes
+
+
+DIAS_SEMANA = 7
+DIAS_MES = 30
+
+CENTAVOS = Decimal('0.01')
+
+# Preços do tipo lidos junto com cada peça
+CAMPOS_PRECO = {
+    'valor_locacao': F('tipo_peca__valor_locacao'),
+    'valor_diaria': F('tipo_peca__valor_diaria'),
+    'valor_semanal': F('tipo_peca__valor_semanal'),
+    'valor_mensal': F('tipo_peca__valor_mensal'),
+}
+
+
+def catalogo(peca_ids, *campos):
+    """
+    Peças (com os campos pedidos) e os preços do tipo de cada uma, em uma consulta
+    """
+    return {
+        peca['id']: peca
+        for peca in Peca.objects.filter(pk__in=peca_ids).values('id', 'codigo', *campos, **CAMPOS_PRECO)
+    }
+
+
+def dias_cobrados(data_locacao, data_previsao_devolucao):
+    """
+    Dias cobrados do período (no mínimo um)
+    """
+    return max((data_previsao_devolucao - data_locacao).days, 1)
+
+
+def valor_unitario(dias, valor_locacao, valor_diaria=None, valor_semanal=None, valor_mensal=None):
+    """
+    Valor de uma unidade pelo período. Com faixas, é o menor custo que cobre
+    os dias (uma semana pode sair mais barata que seis diárias, por exemplo).
+    """
+    faixas = [
+        (duracao, valor)
+        for duracao, valor in ((1, valor_diaria), (DIAS_SEMANA, valor_semanal), (DIAS_MES, valor_mensal))
+        if valor is not None
+    ]
+    if not faixas:
+        return valor_locacao
+    custos = [Decimal('0.00')]
+    for dia in range(1, dias + 1):
+        custos.append(min(custos[max(dia - duracao, 0)] + valor for duracao, valor in faixas))
+    return custos[dias]
+
+
+def faixas_desconto():
+    """
+    Faixas de desconto por volume [(quantidade_minima, percentual)], em cache
+    enquanto a tabela não muda
+    """
+    chave = f'descontos_volume:{obter_versoes(DescontoVolume)[0]}'
+    faixas = cache.get(chave)
+    if faixas is None:
+        faixas = list(DescontoVolume.objects.order_by('quantidade_minima').values_list('quantidade_minima', 'percentual'))
+        cache.set(chave, faixas, CACHE_RESPOSTAS_TIMEOUT)
+    return faixas
+
+
+def percentual_desconto(unidades):
+    faixas = faixas_desconto()
+    posicao = bisect_right([quantidade_minima for quantidade_minima, _ in faixas], unidades)
+    return faixas[posicao - 1][1] if posicao else Decimal('0.00')
+
+
+def cotar(quantidades, data_locacao, data_previsao_devolucao, pecas=None):
+    """
+    Cotação de um carrinho ({peca_id: quantidade}) no período. `pecas` é o
+    catálogo já lido (catalogo()); sem ele, as peças são lidas aqui. Não grava nada.
+    """
+    if pecas is None:
+        pecas = catalogo(quantidades)
+    dias = dias_cobrados(data_locacao, data_previsao_devolucao)
+
+    unitarios = {}
+    itens = []
+    for peca_id, quantidade in quantidades.items():
+        peca = pecas[peca_id]
+        tarifa = tuple(peca[campo] for campo in CAMPOS_PRECO)
+        if tarifa not in unitarios:
+            unitarios[tarifa] = valor_unitario(dias, *tarifa)
+        itens.append({
+            'peca': peca_id,
+            'codigo': peca['codigo'],
+            'quantidade': quantidade,
+            'valor_unitario': unitarios[tarifa],
+            'valor_total_item': quantidade * unitarios[tarifa],
+        })
+
+    valor_total = sum((item['valor_total_item'] for item in itens), Decimal('0.00'))
+    unidades = sum(quantidades.values())
+    percentual = percentual_desconto(unidades)
+    desconto = (valor_total * percentual / 100).quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+    return {
+        'data_locacao': data_locacao,
+        'data_previsao_devolucao': data_previsao_devolucao,
+        'dias': dias,
+        'quantidade_total': unidades,
+        'itens': itens,
+        'valor_total': valor_total,
+        'percentual_desconto': percentual,
+        'desconto': desconto,
+        'valor_final': valor_total - desconto,
+    }
@@ -0,0 +1,326 @@
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Sum, Count, Q, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, TruncDay, TruncWeek, TruncMonth
+from django.utils import timezone
+
+from .models import (
+    TipoPeca, Peca, Cliente, Locacao, ItemLocacaoArquivado, ResumoDiarioLocacao, ResumoDiarioMovimentacao
+)
+from .serializers import TipoPecaSerializer
+
+
+# Quantidade disponível a partir da qual uma peça é considerada com estoque baixo
+LIMITE_ESTOQUE_BAIXO = 5
+
+# Granularidades aceitas pelos relatórios (?agrupamento=)
+AGRUPAMENTOS = {'dia': TruncDay, 'semana': TruncWeek, 'mes': TruncMonth}
+
+
+def intervalo_relatorio(params):
+    """
+    Lê ?data_inicio=/?data_fim= (YYYY-MM-DD) ou, na falta de data_inicio, os últimos
+    ?periodo= dias (30 por padrão), além de ?agrupamento=dia|semana|mes.
+    Levanta ValueError com a mensagem de erro quando algum parâmetro é inválido.
+    """
+    try:
+        data_inicio = params.get('data_inicio')
+        data_fim = params.get('data_fim')
+        data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d').date() if data_inicio else None
+        data_fim = datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else None
+    except ValueError:
+        raise ValueError('Formato de data inválido. Use YYYY-MM-DD')
+
+    periodo = None
+    if data_inicio is None:
+        try:
+            periodo = int(params.get('periodo', '30'))  # dias
+        except ValueError:
+            raise ValueError('Período deve ser um número inteiro de dias')
+        data_inicio = timezone.now().date() - timedelta(days=periodo)
+
+    if data_fim is not None and data_fim < data_inicio:
+        raise ValueError('data_fim deve ser posterior a data_inicio')
+
+    agrupamento = params.get('agrupamento', 'dia')
+    if agrupamento not in AGRUPAMENTOS:
+        raise ValueError(f'Agrupamento inválido. Use {", ".join(AGRUPAMENTOS)}')
+
+    return periodo, data_inicio, data_fim, agrupamento
+
+
+def total_itens_locados():
+    """
+    Quantidade de itens de locação das peças de cada tipo, somando os arquivados
+    """
+    arquivados = ItemLocacaoArquivado.objects.filter(
+        peca__tipo_peca=OuterRef('pk')
+    ).order_by().values('peca__tipo_peca').annotate(total=Count('id')).values('total')
+    return Count('peca__itemlocacao') + Coalesce(Subquery(arquivados), 0)
+
+
+def resumos_no_intervalo(model, data_inicio, data_fim, agrupamento):
+    """
+    Linhas do resumo diário no intervalo, anotadas com o início do período de agrupamento
+    """
+    queryset = model.objects.filter(data__gte=data_inicio)
+    if data_fim is not None:
+        queryset = queryset.filter(data__lte=data_fim)
+    return queryset.order_by().annotate(periodo=AGRUPAMENTOS[agrupamento]('data'))
+
+
+def _em_conexao_propria(consulta):
+    """
+    Executa a consulta em uma thread do pool, com a conexão daquela thread
+    """
+    def executar():
+        # As conexões ficam abertas para reaproveitamento (o pool tem tamanho limitado);
+        # só são descartadas quando a verificação de saúde (CONN_HEALTH_CHECKS) falha
+        for conexao in connections.all(initialized_only=True):
+            conexao.close_if_health_check_failed()
+        return consulta()
+    return sync_to_async(executar, thread_sensitive=False)
+
+
+class Relatorio(ABC):
+    """
+    Relatório composto por consultas independentes entre si (`consultas`, cada
+    uma já avaliada, sem querysets preguiçosos) e pela montagem do resultado
+    (`montar`). `executar` roda as consultas em sequência; `aexecutar` roda
+    todas ao mesmo tempo, cada uma em uma thread com conexão própria, sem
+    ocupar a thread compartilhada pelas views síncronas no ASGI.
+    """
+
+    @abstractmethod
+    def consultas(self):
+        """
+        {nome: função sem argumentos que executa e avalia uma consulta}
+        """
+
+    @abstractmethod
+    def montar(self, resultados):
+        """
+        Resultado do relatório a partir de {nome: resultado de cada consulta}
+        """
+
+    def executar(self):
+        return self.montar({nome: consulta() for nome, consulta in self.consultas().items()})
+
+    async def aexecutar(self):
+        consultas = self.consultas()
+        resultados = await asyncio.gather(*(_em_conexao_propria(consulta)() for consulta in consultas.values()))
+        return self.montar(dict(zip(consultas, resultados)))
+
+
+class EstatisticasTipos(Relatorio):
+
+    def consultas(self):
+        return {
+            'total_tipos': lambda: TipoPeca.objects.count(),
+            'valor_medio': lambda: TipoPeca.objects.aggregate(valor_medio=Sum('valor_locacao'))['valor_medio'] or 0,
+            # Tipos mais utilizados
+            'tipos_populares': lambda: TipoPecaSerializer(
+                TipoPeca.objects.annotate(
+                    total_pecas=Count('peca'),
+                    total_locacoes=total_itens_locados()
+                ).order_by('-total_locacoes')[:5],
+                many=True
+            ).data,
+        }
+
+    def montar(self, resultados):
+        total_tipos = resultados['total_tipos']
+        return {
+            'total_tipos': total_tipos,
+            'valor_medio': resultados['valor_medio'] / total_tipos if total_tipos > 0 else 0,
+            'tipos_populares': resultados['tipos_populares'],
+        }
+
+
+class RelatorioEstoque(Relatorio):
+
+    def consultas(self):
+        return {
+            'total_pecas': lambda: Peca.objects.count(),
+            'quantidades': lambda: Peca.objects.aggregate(
+                total=Sum('quantidade_total'),
+                disponivel=Sum('quantidade_disponivel'),
+                locado=Sum('quantidade_locada')
+            ),
+            'pecas_zeradas': lambda: Peca.objects.filter(quantidade_disponivel=0).count(),
+        }
+
+    def montar(self, resultados):
+        return {
+            'total_pecas': resultados['total_pecas'],
+            'quantidade_total': resultados['quantidades']['total'] or 0,
+            'quantidade_disponivel': resultados['quantidades']['disponivel'] or 0,
+            'quantidade_locada': resultados['quantidades']['locado'] or 0,
+            'pecas_sem_estoque': resultados['pecas_zeradas'],
+        }
+
+
+class RelatorioFinanceiro(Relatorio):
+    """
+    Receita e quantidade de locações por status, lidas do resumo diário
+    """
+
+    def __init__(self, periodo, data_inicio, data_fim, agrupamento):
+        self.periodo = periodo
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.agrupamento = agrupamento
+
+    def consultas(self):
+        return {
+            'grupos': lambda: list(resumos_no_intervalo(
+                ResumoDiarioLocacao, self.data_inicio, self.data_fim, self.agrupamento
+            ).values('periodo', 'status').annotate(
+                count=Sum('quantidade'),
+                valor=Sum('valor_final')
+            ).order_by('periodo', 'status')),
+        }
+
+    def montar(self, resultados):
+        por_status = {}
+        serie = {}
+        for grupo in resultados['grupos']:
+            if not grupo['count']:
+                continue
+            item = por_status.setdefault(grupo['status'], {'status': grupo['status'], 'count': 0, 'valor': 0})
+            item['count'] += grupo['count']
+            item['valor'] += grupo['valor']
+            ponto = serie.setdefault(grupo['periodo'], {'periodo': grupo['periodo'], 'total_locacoes': 0, 'receita_total': 0})
+            ponto['total_locacoes'] += grupo['count']
+            ponto['receita_total'] += grupo['valor']
+        por_status = list(por_status.values())
+
+        return {
+            'periodo_dias': self.periodo,
+            'data_inicio': self.data_inicio,
+            'data_fim': self.data_fim,
+            'agrupamento': self.agrupamento,
+            'receita_total': sum((item['valor'] for item in por_status), 0),
+            'total_locacoes': sum(item['count'] for item in por_status),
+            'por_status': por_status,
+            'serie': list(serie.values()),
+        }
+
+
+class RelatorioMovimentacoes(Relatorio):
+    """
+    Entradas e saídas de estoque no período, lidas do resumo diário
+    """
+
+    def __init__(self, periodo, data_inicio, data_fim, agrupamento):
+        self.periodo = periodo
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.agrupamento = agrupamento
+
+    def consultas(self):
+        return {
+            'serie': lambda: list(resumos_no_intervalo(
+                ResumoDiarioMovimentacao, self.data_inicio, self.data_fim, self.agrupamento
+            ).values('periodo').annotate(
+                entradas=Sum('quantidade', filter=Q(tipo_movimentacao='E'), default=0),
+                saidas=Sum('quantidade', filter=Q(tipo_movimentacao='S'), default=0),
+                total_movimentacoes=Sum('movimentacoes')
+            ).filter(total_movimentacoes__gt=0).order_by('periodo')),
+        }
+
+    def montar(self, resultados):
+        serie = resultados['serie']
+        for ponto in serie:
+            ponto['saldo'] = ponto['entradas'] - ponto['saidas']
+
+        entradas = sum(ponto['entradas'] for ponto in serie)
+        saidas = sum(ponto['saidas'] for ponto in serie)
+        return {
+            'periodo_dias': self.periodo,
+            'data_inicio': self.data_inicio,
+            'data_fim': self.data_fim,
+            'agrupamento': self.agrupamento,
+            'total_entradas': entradas,
+            'total_saidas': saidas,
+            'saldo': entradas - saidas,
+            'total_movimentacoes': sum(ponto['total_movimentacoes'] for ponto in serie),
+            'serie': serie,
+        }
+
+
+class Dashboard(Relatorio):
+    """
+    Números consolidados exibidos nos cards do dashboard
+    """
+
+    def __init__(self, periodo):
+        self.periodo = periodo
+        self.hoje = timezone.now().date()
+        self.data_inicio = self.hoje - timedelta(days=periodo)
+
+    def consultas(self):
+        return {
+            'estoque': lambda: Peca.objects.aggregate(
+                total_pecas=Count('id'),
+                total=Sum('quantidade_total'),
+                disponivel=Sum('quantidade_disponivel'),
+                locado=Sum('quantidade_locada'),
+                sem_estoque=Count('id', filter=Q(quantidade_disponivel=0)),
+                estoque_baixo=Count('id', filter=Q(quantidade_disponivel__lte=LIMITE_ESTOQUE_BAIXO)),
+            ),
+            'locacoes': lambda: Locacao.objects.aggregate(
+                ativas=Count('id', filter=Q(status='A')),
+                vencidas=Count('id', filter=Q(vencida=True)),
+            ),
+            'por_status': lambda: list(ResumoDiarioLocacao.objects.filter(
+                data__gte=self.data_inicio
+            ).order_by().values('status').annotate(
+                count=Sum('quantidade'),
+                valor=Sum('valor_final')
+            ).filter(count__gt=0)),
+            'estoque_baixo': lambda: list(Peca.objects.filter(
+                quantidade_disponivel__lte=LIMITE_ESTOQUE_BAIXO
+            ).order_by('quantidade_disponivel', 'codigo').values(
+                'id', 'codigo', 'quantidade_disponivel', tipo_peca_nome=F('tipo_peca__nome')
+            )[:5]),
+            'vencidas': lambda: list(Locacao.objects.filter(
+                vencida=True
+            ).order_by('data_previsao_devolucao').values(
+                'id', 'numero_locacao', 'status', 'data_previsao_devolucao', cliente_nome=F('cliente__nome')
+            )[:5]),
+            'tipos_populares': lambda: list(TipoPeca.objects.annotate(
+                total_locacoes=total_itens_locados()
+            ).order_by('-total_locacoes').values('id', 'nome', 'valor_locacao', 'total_locacoes')[:5]),
+            'total_clientes': lambda: Cliente.objects.count(),
+        }
+
+    def montar(self, resultados):
+        estoque = resultados['estoque']
+        por_status = resultados['por_status']
+        return {
+            'estoque': {
+                'total_pecas': estoque['total_pecas'],
+                'quantidade_total': estoque['total'] or 0,
+                'quantidade_disponivel': estoque['disponivel'] or 0,
+                'quantidade_locada': estoque['locado'] or 0,
+                'pecas_sem_estoque': estoque['sem_estoque'],
+                'pecas_estoque_baixo': estoque['estoque_baixo'],
+            },
+            'total_clientes': resultados['total_clientes'],
+            'locacoes_ativas': resultados['locacoes']['ativas'],
+            'locacoes_vencidas': resultados['locacoes']['vencidas'],
+            'financeiro': {
+                'periodo_dias': self.periodo,
+                'receita_total': sum((item['valor'] for item in por_status), 0),
+                'total_locacoes': sum(item['count'] for item in por_status),
+                'por_status': por_status,
+            },
+            'estoque_baixo': resultados['estoque_baixo'],
+            'vencidas': resultados['vencidas'],
+            'tipos_populares': resultados['tipos_populares'],
+        }
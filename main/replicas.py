@@ -0,0 +1,138 @@
+"""
+Leitura em réplica: as ações marcadas com @leitura_replica (relatórios e
+listagens) leem do banco 'replica', quando ele está configurado, e todo o
+resto (gravações, transações e ações não marcadas) fica no 'default'.
+
+Quem acabou de gravar continua lendo do principal por alguns segundos
+(REPLICA_FIXACAO_SEGUNDOS, pelo cookie que FixacaoPrimarioMiddleware envia
+após cada requisição de escrita), para não ver dados anteriores à própria
+gravação enquanto a réplica ainda não a recebeu.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+
+
+ALIAS_REPLICA = 'replica'
+
+COOKIE_PRIMARIO = 'ler_do_primario'
+
+_usar_replica = ContextVar('usar_replica', default=False)
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in connections.settings
+
+
+def lendo_da_replica():
+    """
+    Indica se as leituras do contexto atual vão para a réplica
+    """
+    return _usar_replica.get() and replica_configurada()
+
+
+@contextmanager
+def usar_replica():
+    """
+    Envia para a réplica as leituras feitas dentro do bloco
+    """
+    token = _usar_replica.set(True)
+    try:
+        yield
+    finally:
+        _usar_replica.reset(token)
+
+
+def _pode_usar_replica(args):
+    request = next(arg for arg in args if isinstance(arg, (HttpRequest, Request)))
+    return request.method in SAFE_METHODS and COOKIE_PRIMARIO not in request.COOKIES
+
+
+def leitura_replica(metodo):
+    """
+    Marca uma view ou ação somente leitura para ler da réplica (exceto logo
+    após uma gravação do mesmo cliente). Aceita views síncronas e assíncronas.
+    """
+    if iscoroutinefunction(metodo):
+        @wraps(metodo)
+        async def wrapper_assincrono(*args, **kwargs):
+            if not _pode_usar_replica(args):
+                return await metodo(*args, **kwargs)
+            # As threads das consultas (sync_to_async) herdam o contexto
+            with usar_replica():
+                return await metodo(*args, **kwargs)
+        return wrapper_assincrono
+
+    @wraps(metodo)
+    def wrapper(*args, **kwargs):
+        if not _pode_usar_replica(args):
+            return metodo(*args, **kwargs)
+        with usar_replica():
+            return metodo(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Leituras dentro de usar_replica() vão para a réplica; as gravações e as
+    leituras dentro de uma transação no principal ficam no principal
+    """
+
+    def db_for_read(self, model, **hints):
+        if lendo_da_replica() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return ALIAS_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e principal têm os mesmos dados
+        return True
+
+
+class FixacaoPrimarioMiddleware:
+    """
+    Após uma requisição de escrita, envia o cookie que mantém as leituras do
+    cliente no principal durante REPLICA_FIXACAO_SEGUNDOS
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        return self.fixar(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.fixar(request, await self.get_response(request))
+
+    def fixar(self, request, response):
+        if request.method not in SAFE_METHODS and replica_configurada():
+            response.set_cookie(
+                COOKIE_PRIMARIO, '1', max_age=settings.REPLICA_FIXACAO_SEGUNDOS, httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class ListagemReplicaMixin:
+    """
+    ViewSet cuja listagem lê da réplica
+    """
+
+    @leitura_replica
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
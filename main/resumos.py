@@ -0,0 +1,164 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+
+from .models import (
+    Locacao, MovimentacaoEstoque, LocacaoArquivada, MovimentacaoArquivada, ResumoDiarioLocacao,
+    ResumoDiarioMovimentacao
+)
+
+
+def _aplicar(model, chaves, campos, deltas):
+    """
+    Soma os deltas ({(chave, ...): (valor, ...)}) às linhas de resumo, criando as que faltarem
+    """
+    deltas = {chave: valores for chave, valores in deltas.items() if any(valores)}
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**dict(zip(chaves, chave))) for chave in deltas],
+        ignore_conflicts=True
+    )
+    # Um único UPDATE para todas as linhas, com o delta de cada uma em um CASE
+    filtros = {chave: Q(**dict(zip(chaves, chave))) for chave in deltas}
+    model.objects.filter(Q.create(list(filtros.values()), connector=Q.OR)).update(**{
+        campo: F(campo) + Case(
+            *[When(filtros[chave], then=Value(valores[posicao])) for chave, valores in deltas.items()],
+            default=Value(0),
+            output_field=model._meta.get_field(campo)
+        )
+        for posicao, campo in enumerate(campos)
+    })
+
+
+def registrar_locacoes(deltas):
+    """
+    deltas: {(data_locacao, status): (quantidade, valor_final)}
+    """
+    _aplicar(ResumoDiarioLocacao, ('data', 'status'), ('quantidade', 'valor_final'), deltas)
+
+
+def registrar_movimentacoes(deltas):
+    """
+    deltas: {(data, tipo_movimentacao): (movimentacoes, quantidade)}
+    """
+    _aplicar(ResumoDiarioMovimentacao, ('data', 'tipo_movimentacao'), ('movimentacoes', 'quantidade'), deltas)
+
+
+def atualizar_locacao(original, atual):
+    """
+    Move uma locação do resumo (data, status, valor_final) original para o atual
+    """
+    deltas = defaultdict(lambda: [0, Decimal('0.00')])
+    if original is not None and None not in original:
+        data, status, valor = original
+        deltas[(data, status)][0] -= 1
+        deltas[(data, status)][1] -= valor
+    if atual is not None:
+        data, status, valor = atual
+        deltas[(data, status)][0] += 1
+        deltas[(data, status)][1] += Decimal(valor)
+    registrar_locacoes(deltas)
+
+
+def atualizar_movimentacao(original, atual):
+    """
+    Move uma movimentação do resumo (data, tipo, quantidade) original para o atual
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    if original is not None and None not in original:
+        data, tipo, quantidade = original
+        deltas[(data, tipo)][0] -= 1
+        deltas[(data, tipo)][1] -= quantidade
+    if atual is not None:
+        data, tipo, quantidade = atual
+        deltas[(data, tipo)][0] += 1
+        deltas[(data, tipo)][1] += quantidade
+    registrar_movimentacoes(deltas)
+
+
+def registrar_novas_movimentacoes(movimentacoes):
+    """
+    Contabiliza movimentações criadas em lote (bulk_create não dispara sinais)
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for movimentacao in movimentacoes:
+        data, tipo, quantidade = movimentacao.chave_resumo()
+        deltas[(data, tipo)][0] += 1
+        deltas[(data, tipo)][1] += quantidade
+    registrar_movimentacoes(deltas)
+
+
+def mudar_status_locacoes(queryset, novo_status):
+    """
+    Ajusta o resumo antes de um queryset.update(status=...), que não dispara sinais
+    """
+    deltas = defaultdict(lambda: [0, Decimal('0.00')])
+    grupos = queryset.exclude(status=novo_status).order_by().values('data_locacao', 'status').annotate(
+        quantidade=Count('id'),
+        valor=Sum('valor_final')
+    )
+    for grupo in grupos:
+        deltas[(grupo['data_locacao'], grupo['status'])][0] -= grupo['quantidade']
+        deltas[(grupo['data_locacao'], grupo['status'])][1] -= grupo['valor']
+        deltas[(grupo['data_locacao'], novo_status)][0] += grupo['quantidade']
+        deltas[(grupo['data_locacao'], novo_status)][1] += grupo['valor']
+    registrar_locacoes(deltas)
+
+
+def _somar_grupos(querysets, chaves, somas):
+    """
+    {(chave, ...): [soma, ...]} dos grupos de cada queryset, somados entre as tabelas
+    """
+    totais = defaultdict(lambda: [0] * len(somas))
+    for queryset in querysets:
+        for grupo in queryset.values(*chaves).annotate(**somas).iterator():
+            valores = totais[tuple(grupo[chave] for chave in chaves)]
+            for i, campo in enumerate(somas):
+                valores[i] += grupo[campo] or 0
+    return totais
+
+
+@transaction.atomic
+def reconstruir(inicio=None, fim=None):
+    """
+    Recalcula os resumos diários a partir das tabelas de origem e das tabelas
+    de arquivo (opcionalmente só em [inicio, fim])
+    """
+    resumos_locacao = ResumoDiarioLocacao.objects.all()
+    resumos_movimentacao = ResumoDiarioMovimentacao.objects.all()
+    locacoes = [Locacao.objects.order_by(), LocacaoArquivada.objects.order_by()]
+    movimentacoes = [
+        queryset.order_by().annotate(data=TruncDate('data_movimentacao'))
+        for queryset in (MovimentacaoEstoque.objects, MovimentacaoArquivada.objects)
+    ]
+    if inicio:
+        resumos_locacao = resumos_locacao.filter(data__gte=inicio)
+        locacoes = [queryset.filter(data_locacao__gte=inicio) for queryset in locacoes]
+        resumos_movimentacao = resumos_movimentacao.filter(data__gte=inicio)
+        movimentacoes = [queryset.filter(data__gte=inicio) for queryset in movimentacoes]
+    if fim:
+        resumos_locacao = resumos_locacao.filter(data__lte=fim)
+        locacoes = [queryset.filter(data_locacao__lte=fim) for queryset in locacoes]
+        resumos_movimentacao = resumos_movimentacao.filter(data__lte=fim)
+        movimentacoes = [queryset.filter(data__lte=fim) for queryset in movimentacoes]
+
+    resumos_locacao.delete()
+    ResumoDiarioLocacao.objects.bulk_create([
+        ResumoDiarioLocacao(data=data, status=status, quantidade=quantidade, valor_final=valor)
+        for (data, status), (quantidade, valor) in _somar_grupos(
+            locacoes, ('data_locacao', 'status'), {'quantidade': Count('id'), 'valor': Sum('valor_final')}
+        ).items()
+    ], batch_size=2000)
+
+    resumos_movimentacao.delete()
+    ResumoDiarioMovimentacao.objects.bulk_create([
+        ResumoDiarioMovimentacao(data=data, tipo_movimentacao=tipo, movimentacoes=total, quantidade=quantidade)
+        for (data, tipo), (total, quantidade) in _somar_grupos(
+            movimentacoes, ('data', 'tipo_movimentacao'),
+            {'movimentacoes': Count('id'), 'quantidade': Sum('quantidade')}
+        ).items()
+    ], batch_size=2000)
@@ -0,0 +1,165 @@
+import re
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.models import Case, When, IntegerField
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+from .models import Peca, Cliente, Locacao
+
+
+# Campos indexados por modelo (caminhos aceitos por values_list)
+CAMPOS_INDEXADOS = {
+    Cliente: ['nome', 'cpf_cnpj', 'email', 'telefone', 'cidade'],
+    Peca: ['codigo', 'tipo_peca__nome', 'observacoes'],
+    Locacao: ['numero_locacao', 'cliente__nome', 'observacoes'],
+}
+
+# Quantidade máxima de resultados (os mais relevantes) retornados por uma busca
+LIMITE_RESULTADOS = 1000
+
+# Enviado quando a busca encontrou mais que LIMITE_RESULTADOS registros (valor: o limite)
+CABECALHO_TRUNCADA = 'X-Busca-Truncada'
+
+
+def montar_conteudo(valores):
+    """
+    Junta os valores indexados, acrescentando a versão só com dígitos de
+    documentos e telefones (123.456.789-01 também é encontrado por 12345678901)
+    """
+    partes = []
+    for valor in valores:
+        if valor in (None, ''):
+            continue
+        valor = str(valor)
+        partes.append(valor)
+        digitos = ''.join(filter(str.isdigit, valor))
+        if digitos and digitos != valor:
+            partes.append(digitos)
+    return ' '.join(partes)
+
+
+class BuscaBackend:
+    """
+    Backend padrão: não mantém índice próprio e delega ao SearchFilter (icontains).
+    Backends com indexado = True mantêm um índice e implementam
+    buscar(model, termo, limite), que retorna os pks mais relevantes em ordem
+    (ou None quando o termo não tem palavras a buscar).
+    """
+    indexado = False
+
+    def criar_indices(self, conexao):
+        pass
+
+    def indexar(self, queryset):
+        pass
+
+    def remover(self, model, pks):
+        pass
+
+    def reconstruir(self, model):
+        pass
+
+
+class SQLiteFTS5Backend(BuscaBackend):
+    """
+    Índice de busca textual em tabelas virtuais FTS5 (uma por modelo, rowid = pk).
+    O tokenizador unicode61 com remove_diacritics ignora acentos e as buscas
+    usam prefixo em cada termo ("andaim" encontra "andaimes"), ordenadas por bm25.
+    """
+    indexado = True
+
+    def tabela(self, model):
+        return f'{model._meta.db_table}_busca'
+
+    def conexao_escrita(self, model):
+        return connections[router.db_for_write(model)]
+
+    def conexao_leitura(self, model):
+        # Segue o roteador, como o queryset filtrado pelos resultados (réplica nas listagens)
+        return connections[router.db_for_read(model)]
+
+    def criar_indices(self, conexao):
+        with conexao.cursor() as cursor:
+            for model in CAMPOS_INDEXADOS:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.tabela(model)} '
+                    f"USING fts5(conteudo, tokenize='unicode61 remove_diacritics 2')"
+                )
+
+    def indexar(self, queryset):
+        campos = CAMPOS_INDEXADOS[queryset.model]
+        linhas = (
+            (linha[0], montar_conteudo(linha[1:]))
+            for linha in queryset.order_by().values_list('pk', *campos).iterator(chunk_size=2000)
+        )
+        with self.conexao_escrita(queryset.model).cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {self.tabela(queryset.model)} (rowid, conteudo) VALUES (%s, %s)',
+                linhas
+            )
+
+    def remover(self, model, pks):
+        with self.conexao_escrita(model).cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.tabela(model)} WHERE rowid = %s', [(pk,) for pk in pks])
+
+    def reconstruir(self, model):
+        with self.conexao_escrita(model).cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabela(model)}')
+        self.indexar(model.objects.all())
+
+    def buscar(self, model, termo, limite=LIMITE_RESULTADOS):
+        termos = re.findall(r'\w+', termo)
+        if not termos:
+            return None
+        consulta = ' AND '.join(f'"{termo}"*' for termo in termos)
+        with self.conexao_leitura(model).cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.tabela(model)} WHERE {self.tabela(model)} MATCH %s ORDER BY rank LIMIT %s',
+                [consulta, limite]
+            )
+            return [linha[0] for linha in cursor.fetchall()]
+
+
+def get_backend():
+    """
+    Backend configurado em settings.BUSCA_BACKEND ou, por padrão, FTS5 no SQLite
+    """
+    caminho = getattr(settings, 'BUSCA_BACKEND', None)
+    if caminho:
+        return import_string(caminho)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTS5Backend()
+    return BuscaBackend()
+
+
+class BuscaIndexadaFilter(filters.SearchFilter):
+    """
+    SearchFilter que usa o índice de busca quando o backend mantém um,
+    ordenando os resultados por relevância (a menos que ?ordering= seja informado).
+    Só os LIMITE_RESULTADOS mais relevantes são retornados; quando há mais, a
+    resposta leva o cabeçalho CABECALHO_TRUNCADA para o cliente refinar a busca.
+    Deve ser o último dos filter_backends para que a relevância prevaleça.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_backend()
+        termo = request.query_params.get(self.search_param, '')
+        if not backend.indexado or queryset.model not in CAMPOS_INDEXADOS or not termo.strip():
+            return super().filter_queryset(request, queryset, view)
+
+        pks = backend.buscar(queryset.model, termo, LIMITE_RESULTADOS + 1)
+        if pks is None:
+            return queryset
+        if len(pks) > LIMITE_RESULTADOS:
+            pks = pks[:LIMITE_RESULTADOS]
+            view.headers[CABECALHO_TRUNCADA] = str(LIMITE_RESULTADOS)
+        if not pks:
+            return queryset.none()
+        queryset = queryset.filter(pk__in=pks)
+        if request.query_params.get(filters.OrderingFilter.ordering_param):
+            return queryset
+        return queryset.order_by(
+            Case(*[When(pk=pk, then=posicao) for posicao, pk in enumerate(pks)], output_field=IntegerField())
+        )
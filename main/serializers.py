@@ -1,23 +1,34 @@
 from rest_framework import serializers
-from .models import TipoPeca, Peca, Cliente, Locacao, ItemLocacao, MovimentacaoEstoque
+from django.db import transaction
+from django.utils import timezone
+from .models import (
+    TipoPeca, Peca, Cliente, Locacao, ItemLocacao, MovimentacaoEstoque, LocacaoArquivada, ItemLocacaoArquivado
+)
+from .versoes import incrementar_versao
+from .metricas import MedirSerializacaoMixin
+from .campos import CamposDinamicosMixin
+from .disponibilidade import motor, verificar_reserva
+from .operacoes import reservar_estoque
+from .precos import catalogo, cotar
 from django.contrib.auth.models import User
+from decimal import Decimal
 
 
-class TipoPecaSerializer(serializers.ModelSerializer):
+class TipoPecaSerializer(MedirSerializacaoMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = TipoPeca
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at')
 
 
-class PecaSerializer(serializers.ModelSerializer):
+class PecaSerializer(MedirSerializacaoMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     tipo_peca_nome = serializers.CharField(source='tipo_peca.nome', read_only=True)
     tipo_peca_valor = serializers.DecimalField(source='tipo_peca.valor_locacao', max_digits=10, decimal_places=2, read_only=True)
     
     class Meta:
         model = Peca
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
+        read_only_fields = ('created_at', 'updated_at', 'versao')
 
     def validate(self, data):
         """
@@ -33,7 +44,7 @@ class PecaSerializer(serializers.ModelSerializer):
         return data
 
 
-class ClienteSerializer(serializers.ModelSerializer):
+class ClienteSerializer(MedirSerializacaoMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = '__all__'
@@ -52,10 +63,10 @@ class ClienteSerializer(serializers.ModelSerializer):
         return value
 
 
-class ItemLocacaoSerializer(serializers.ModelSerializer):
+class ItemLocacaoSerializer(MedirSerializacaoMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     peca_codigo = serializers.CharField(source='peca.codigo', read_only=True)
     peca_nome = serializers.CharField(source='peca.tipo_peca.nome', read_only=True)
-    valor_unitario = serializers.DecimalField(source='peca.tipo_peca.valor_locacao', max_digits=10, decimal_places=2, read_only=True)
+    valor_unitario = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     
     class Meta:
         model = ItemLocacao
@@ -76,19 +87,24 @@ class ItemLocacaoSerializer(serializers.ModelSerializer):
         return data
 
 
-class LocacaoSerializer(serializers.ModelSerializer):
+ERRO_ATIVACAO_FUTURA = "Uma locação só pode ser ativada a partir da data de locação."
+
+
+class LocacaoSerializer(MedirSerializacaoMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     cliente_nome = serializers.CharField(source='cliente.nome', read_only=True)
     cliente_cpf_cnpj = serializers.CharField(source='cliente.cpf_cnpj', read_only=True)
     itens = ItemLocacaoSerializer(many=True, read_only=True)
-    total_itens = serializers.SerializerMethodField()
+    total_itens = serializers.IntegerField(read_only=True)
+    valor_itens = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     
     class Meta:
         model = Locacao
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at', 'valor_final')
-
-    def get_total_itens(self, obj):
-        return obj.itens.count()
+        read_only_fields = ('created_at', 'updated_at', 'numero_locacao', 'valor_final', 'versao', 'estoque_reservado')
+        # Incluídos nas listagens apenas com ?expand=itens (ver main/campos.py)
+        expansiveis = ('itens',)
+        # Campos calculados no banco pelo método do queryset
+        anotacoes = {'total_itens': 'com_totais', 'valor_itens': 'com_totais'}
 
     def validate(self, data):
         """
@@ -102,54 +118,224 @@ class LocacaoSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     "Data de previsão de devolução não pode ser anterior à data de locação."
                 )
+
+        status = data.get('status', getattr(self.instance, 'status', None))
+        data_locacao = data_locacao or getattr(self.instance, 'data_locacao', None)
+        if status == 'A' and data_locacao and data_locacao > timezone.now().date():
+            raise serializers.ValidationError({'status': ERRO_ATIVACAO_FUTURA})
         
         return data
 
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        locacao = super().update(instance, validated_data)
+        if locacao.status == 'A' and not locacao.estoque_reservado and not reservar_estoque(locacao):
+            raise serializers.ValidationError({'status': 'Estoque disponível insuficiente para ativar a locação.'})
+        return locacao
+
+
+class ItemLocacaoArquivadoSerializer(serializers.ModelSerializer):
+    peca_codigo = serializers.CharField(source='peca.codigo', read_only=True)
+    peca_nome = serializers.CharField(source='peca.tipo_peca.nome', read_only=True)
+    valor_unitario = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = ItemLocacaoArquivado
+        fields = '__all__'
+
+
+class LocacaoArquivadaSerializer(serializers.ModelSerializer):
+    """
+    Locação do arquivo, com os mesmos campos de LocacaoSerializer (somente leitura)
+    """
+    cliente_nome = serializers.CharField(source='cliente.nome', read_only=True)
+    cliente_cpf_cnpj = serializers.CharField(source='cliente.cpf_cnpj', read_only=True)
+    itens = ItemLocacaoArquivadoSerializer(many=True, read_only=True)
+    total_itens = serializers.IntegerField(read_only=True)
+    valor_itens = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = LocacaoArquivada
+        fields = '__all__'
+        read_only_fields = [campo.name for campo in LocacaoArquivada._meta.concrete_fields]
+
+
+class ItemLocacaoCreateSerializer(serializers.Serializer):
+    """
+    Item enviado na criação de uma locação (a peça é resolvida em lote pelo serializer pai)
+    """
+    peca = serializers.IntegerField()
+    quantidade = serializers.IntegerField(min_value=1)
+    observacoes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+def validar_carrinho(itens, *campos):
+    """
+    Validar as peças de todos os itens com uma única consulta; retorna o
+    catálogo das peças (ver precos.catalogo)
+    """
+    if not itens:
+        raise serializers.ValidationError("A locação deve ter ao menos um item.")
+
+    peca_ids = [item['peca'] for item in itens]
+    if len(set(peca_ids)) != len(peca_ids):
+        raise serializers.ValidationError("Cada peça deve aparecer apenas uma vez na locação.")
+
+    pecas = catalogo(peca_ids, *campos)
+    erros = [f"Peça {item['peca']} não encontrada." for item in itens if item['peca'] not in pecas]
+    if erros:
+        raise serializers.ValidationError(erros)
+    return pecas
+
+
+def validar_periodo(data):
+    if data['data_previsao_devolucao'] < data['data_locacao']:
+        raise serializers.ValidationError(
+            "Data de previsão de devolução não pode ser anterior à data de locação."
+        )
+
+
+class CotacaoSerializer(serializers.Serializer):
+    """
+    Carrinho de uma cotação: as mesmas datas e itens da criação de uma locação
+    """
+    data_locacao = serializers.DateField()
+    data_previsao_devolucao = serializers.DateField()
+    itens = ItemLocacaoCreateSerializer(many=True)
+
+    def validate_itens(self, itens):
+        self._pecas = validar_carrinho(itens)
+        return itens
+
+    def validate(self, data):
+        validar_periodo(data)
+        return data
+
+    def cotar(self):
+        dados = self.validated_data
+        return cotar(
+            {item['peca']: item['quantidade'] for item in dados['itens']},
+            dados['data_locacao'], dados['data_previsao_devolucao'], pecas=self._pecas
+        )
+
 
 class LocacaoCreateSerializer(serializers.ModelSerializer):
     """
     Serializer específico para criação de locações com itens
     """
-    itens = ItemLocacaoSerializer(many=True, write_only=True)
+    itens = ItemLocacaoCreateSerializer(many=True, write_only=True)
     
     class Meta:
         model = Locacao
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at', 'valor_final', 'valor_total')
+        read_only_fields = (
+            'created_at', 'updated_at', 'numero_locacao', 'valor_final', 'valor_total', 'versao', 'estoque_reservado'
+        )
 
+    def validate_itens(self, itens):
+        self._pecas = validar_carrinho(itens, 'quantidade_disponivel')
+        return itens
+
+    def validate(self, data):
+        """
+        Validar as datas e a disponibilidade dos itens no período, considerando
+        as reservas futuras; as locações que começam hoje também precisam caber
+        no estoque disponível atual
+        """
+        validar_periodo(data)
+        data_locacao = data['data_locacao']
+        data_previsao_devolucao = data['data_previsao_devolucao']
+        if data.get('status') == 'A' and self.reserva_futura(data):
+            raise serializers.ValidationError({'status': ERRO_ATIVACAO_FUTURA})
+
+        itens = data['itens']
+        disponiveis = motor.consultar([item['peca'] for item in itens], data_locacao, data_previsao_devolucao)
+        disponiveis = {peca_id: item['quantidade_disponivel'] for peca_id, item in disponiveis.items()}
+        if not self.reserva_futura(data):
+            disponiveis = {
+                peca_id: min(disponivel, self._pecas[peca_id]['quantidade_disponivel'])
+                for peca_id, disponivel in disponiveis.items()
+            }
+        erros = [
+            self.erro_quantidade(item['quantidade'], disponiveis.get(item['peca'], 0), self._pecas[item['peca']]['codigo'])
+            for item in itens
+            if item['quantidade'] > disponiveis.get(item['peca'], 0)
+        ]
+        if erros:
+            raise serializers.ValidationError({'itens': erros})
+
+        return data
+
+    @staticmethod
+    def reserva_futura(data):
+        return data['data_locacao'] > timezone.now().date()
+
+    @staticmethod
+    def erro_quantidade(quantidade, disponivel, codigo):
+        return f"Quantidade solicitada ({quantidade}) excede a disponível ({disponivel}) para a peça {codigo}."
+
+    @transaction.atomic
     def create(self, validated_data):
         itens_data = validated_data.pop('itens', [])
-        locacao = Locacao.objects.create(**validated_data)
-        
-        valor_total = 0
-        for item_data in itens_data:
-            peca = item_data['peca']
-            quantidade = item_data['quantidade']
-            valor_total_item = quantidade * peca.tipo_peca.valor_locacao
-            
-            ItemLocacao.objects.create(
-                locacao=locacao,
-                peca=peca,
-                quantidade=quantidade,
-                valor_total_item=valor_total_item,
-                observacoes=item_data.get('observacoes', '')
+        quantidades = {item['peca']: item['quantidade'] for item in itens_data}
+
+        # O período não pode ultrapassar a quantidade total considerando as outras
+        # locações e reservas (conferido com as peças bloqueadas até o fim da transação)
+        faltas = verificar_reserva(
+            quantidades, validated_data['data_locacao'], validated_data['data_previsao_devolucao']
+        )
+        if faltas:
+            raise serializers.ValidationError({'itens': [
+                self.erro_quantidade(quantidades[peca_id], disponivel, self._pecas[peca_id]['codigo'])
+                for peca_id, disponivel in faltas
+            ]})
+
+        # Reserva antecipada: o estoque atual só muda quando a locação for ativada
+        validated_data['estoque_reservado'] = not self.reserva_futura(validated_data)
+        if validated_data['estoque_reservado']:
+            # Reservar o estoque de todas as peças em um único UPDATE condicional:
+            # só são afetadas as linhas que ainda têm quantidade disponível suficiente
+            reservadas = Peca.objects.reservar(quantidades)
+            if reservadas != len(quantidades):
+                # Outra locação reservou as peças entre a validação e a gravação
+                raise serializers.ValidationError({'itens': [
+                    self.erro_quantidade(quantidades[peca_id], disponivel, codigo)
+                    for peca_id, codigo, disponivel in Peca.objects.filter(pk__in=quantidades).values_list(
+                        'id', 'codigo', 'quantidade_disponivel'
+                    )
+                    if disponivel < quantidades[peca_id]
+                ]})
+
+        # Preços do carrinho inteiro com o catálogo lido na validação
+        cotacao = cotar(
+            quantidades, validated_data['data_locacao'], validated_data['data_previsao_devolucao'], pecas=self._pecas
+        )
+        observacoes = {item['peca']: item.get('observacoes', '') for item in itens_data}
+        itens = [
+            ItemLocacao(
+                peca_id=item['peca'],
+                quantidade=item['quantidade'],
+                valor_total_item=item['valor_total_item'],
+                observacoes=observacoes[item['peca']]
             )
-            
-            # Atualizar estoque
-            peca.quantidade_locada += quantidade
-            peca.quantidade_disponivel -= quantidade
-            peca.save()
-            
-            valor_total += valor_total_item
-        
-        # Atualizar valor total da locação
-        locacao.valor_total = valor_total
-        locacao.save()
+            for item in cotacao['itens']
+        ]
+
+        # O desconto por volume soma-se ao desconto informado
+        locacao = Locacao.objects.create(
+            valor_total=cotacao['valor_total'],
+            desconto=validated_data.pop('desconto', Decimal('0.00')) + cotacao['desconto'],
+            **validated_data
+        )
+        for item in itens:
+            item.locacao = locacao
+        ItemLocacao.objects.bulk_create(itens)
+        incrementar_versao(ItemLocacao)
         
         return locacao
 
 
-class MovimentacaoEstoqueSerializer(serializers.ModelSerializer):
+class MovimentacaoEstoqueSerializer(MedirSerializacaoMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     peca_codigo = serializers.CharField(source='peca.codigo', read_only=True)
     peca_nome = serializers.CharField(source='peca.tipo_peca.nome', read_only=True)
     usuario_nome = serializers.CharField(source='usuario.username', read_only=True)
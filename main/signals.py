@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import TipoPeca, Peca, Cliente, Locacao, ItemLocacao, MovimentacaoEstoque, DescontoVolume
+from .search import get_backend
+from .versoes import incrementar_versao
+from . import resumos
+
+
+_exclusao_em_lote = ContextVar('exclusao_em_lote', default=False)
+
+
+@contextmanager
+def exclusao_em_lote():
+    """
+    Exclusões feitas no bloco não passam pelos receptores de post_delete: quem
+    exclui em lote (o arquivamento) atualiza o índice de busca e as versões uma
+    vez por lote e não retira os registros dos resumos diários
+    """
+    token = _exclusao_em_lote.set(True)
+    try:
+        yield
+    finally:
+        _exclusao_em_lote.reset(token)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Peca)
+@receiver(post_save, sender=Locacao)
+def indexar_busca(sender, instance, **kwargs):
+    """
+    Mantém o índice de busca sincronizado com o registro salvo
+    """
+    get_backend().indexar(sender.objects.filter(pk=instance.pk))
+    if sender is Cliente:
+        # O nome do cliente também é indexado nas locações
+        get_backend().indexar(Locacao.objects.filter(cliente=instance))
+
+
+@receiver(post_save, sender=TipoPeca)
+def indexar_pecas_do_tipo(sender, instance, created, **kwargs):
+    """
+    O nome do tipo é indexado junto com as peças
+    """
+    if not created:
+        get_backend().indexar(Peca.objects.filter(tipo_peca=instance))
+
+
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Peca)
+@receiver(post_delete, sender=Locacao)
+def remover_busca(sender, instance, **kwargs):
+    if _exclusao_em_lote.get():
+        return
+    get_backend().remover(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Locacao)
+@receiver(post_save, sender=MovimentacaoEstoque)
+def atualizar_resumo(sender, instance, **kwargs):
+    """
+    Move o registro salvo do resumo diário em que estava para o atual
+    """
+    atual = instance.chave_resumo()
+    if None in atual:
+        # Instância carregada com campos adiados: não há como saber o valor anterior
+        return
+    original = getattr(instance, '_resumo_original', None)
+    if original != atual:
+        if sender is Locacao:
+            resumos.atualizar_locacao(original, atual)
+        else:
+            resumos.atualizar_movimentacao(original, atual)
+    instance._resumo_original = atual
+
+
+@receiver(post_delete, sender=Locacao)
+@receiver(post_delete, sender=MovimentacaoEstoque)
+def remover_resumo(sender, instance, **kwargs):
+    if _exclusao_em_lote.get():
+        return
+    original = getattr(instance, '_resumo_original', None) or instance.chave_resumo()
+    if sender is Locacao:
+        resumos.atualizar_locacao(original, None)
+    else:
+        resumos.atualizar_movimentacao(original, None)
+
+
+@receiver(post_save, sender=TipoPeca)
+@receiver(post_save, sender=Peca)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Locacao)
+@receiver(post_save, sender=ItemLocacao)
+@receiver(post_save, sender=DescontoVolume)
+@receiver(post_delete, sender=TipoPeca)
+@receiver(post_delete, sender=Peca)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Locacao)
+@receiver(post_delete, sender=ItemLocacao)
+@receiver(post_delete, sender=DescontoVolume)
+def invalidar_respostas(sender, **kwargs):
+    """
+    Invalida as respostas em cache, os mapas de disponibilidade e as faixas de desconto que dependem do modelo alterado
+    """
+    if kwargs['signal'] is post_delete and _exclusao_em_lote.get():
+        return
+    incrementar_versao(sender)
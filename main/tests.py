@@ -1,3 +1,1473 @@
-from django.test import TestCase
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import F, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APITestCase
+
+from .models import (
+    TipoPeca, Peca, Cliente, Locacao, ItemLocacao, MovimentacaoEstoque,
+    ResumoDiarioLocacao, ResumoDiarioMovimentacao, ConciliacaoEstoque, RegistroAuditoria, ChaveIdempotencia,
+    ConflitoVersao, SequenciaNumeracao, SEQUENCIA_LOCACAO, LocacaoArquivada, MovimentacaoArquivada, DescontoVolume
+)
+from . import resumos, search
+from .arquivamento import arquivar
+from .conciliacao import conciliar, saldo_razao
+from .importacao import Importador
+from .inadimplencia import atualizar_inadimplencia
+from .management.commands.benchmark import percentil
+from .metricas import registro
+from .operacoes import finalizar_locacoes
+from .precos import valor_unitario
+from .relatorios import Relatorio
+from .replicas import ALIAS_REPLICA, COOKIE_PRIMARIO, ReplicaRouter, lendo_da_replica, usar_replica
+from .serializers import LocacaoCreateSerializer, TipoPecaSerializer
+
+
+TOTAL_REGISTROS = 100
+
+
+def criar_dados(total=TOTAL_REGISTROS):
+    """
+    Cria uma base com `total` registros de cada modelo (locações com dois itens cada)
+    """
+    usuario = User.objects.create_user('estoque', 'estoque@example.com', 'senha')
+    tipos = TipoPeca.objects.bulk_create([
+        TipoPeca(nome=f'Tipo {i}', valor_locacao=Decimal('10.00') + i) for i in range(3)
+    ])
+    pecas = Peca.objects.bulk_create([
+        Peca(
+            tipo_peca=tipos[i % len(tipos)],
+            codigo=f'PC{i:04d}',
+            quantidade_total=100,
+            quantidade_disponivel=90,
+            quantidade_locada=10,
+        )
+        for i in range(total)
+    ])
+    clientes = Cliente.objects.bulk_create([
+        Cliente(
+            nome=f'Cliente {i}',
+            cpf_cnpj=f'{i:011d}',
+            telefone='4899999999',
+            endereco='Rua A, 1',
+            cidade='Florianópolis',
+            estado='SC',
+            cep='88000-000',
+            status='I' if i % 10 == 0 else 'A',
+        )
+        for i in range(total)
+    ])
+    hoje = date.today()
+    locacoes = Locacao.objects.bulk_create([
+        Locacao(
+            numero_locacao=i + 1,
+            cliente=clientes[0],
+            data_locacao=hoje - timedelta(days=i % 60),
+            data_previsao_devolucao=hoje - timedelta(days=i % 60) + timedelta(days=15),
+            status='A',
+            estoque_reservado=True,
+            valor_total=Decimal('100.00'),
+            valor_final=Decimal('100.00'),
+        )
+        for i in range(total)
+    ])
+    ItemLocacao.objects.bulk_create([
+        ItemLocacao(locacao=locacao, peca=pecas[(i + j) % total], quantidade=1, valor_total_item=Decimal('50.00'))
+        for i, locacao in enumerate(locacoes)
+        for j in range(2)
+    ])
+    MovimentacaoEstoque.objects.bulk_create([
+        MovimentacaoEstoque(
+            peca=pecas[i],
+            tipo_movimentacao='S',
+            quantidade=1,
+            locacao=locacoes[i],
+            motivo='Locação',
+            usuario=usuario,
+        )
+        for i in range(total)
+    ])
+    # bulk_create não dispara os sinais que mantêm os resumos diários
+    resumos.reconstruir()
+    return usuario
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Garante que as ações de leitura executam um número fixo de consultas,
+    independente do tamanho da página (evita regressões de N+1)
+    """
+
+    # (nome da rota, usa pk, número máximo de consultas)
+    BUDGETS = [
+        ('tipopeca-list', False, 2),
+        ('tipopeca-detail', True, 1),
+        ('tipopeca-estatisticas', False, 3),
+        ('peca-list', False, 2),
+        ('peca-detail', True, 1),
+        ('peca-estoque-baixo', False, 1),
+        ('peca-relatorio-estoque', False, 3),
+        ('cliente-list', False, 2),
+        ('cliente-detail', True, 1),
+        ('cliente-inadimplentes', False, 1),
+        ('cliente-historico-locacoes', True, 8),
+        ('locacao-list', False, 5),
+        ('locacao-detail', True, 4),
+        ('locacao-ativas', False, 4),
+        ('locacao-vencidas', False, 4),
+        ('locacao-relatorio-financeiro', False, 1),
+        ('itemlocacao-list', False, 2),
+        ('itemlocacao-detail', True, 1),
+        ('movimentacaoestoque-list', False, 2),
+        ('movimentacaoestoque-detail', True, 1),
+        ('movimentacaoestoque-relatorio-movimentacoes', False, 1),
+        ('dashboard-list', False, 7),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados()
+        cls.pks = {
+            'tipopeca': TipoPeca.objects.values_list('pk', flat=True).first(),
+            'peca': Peca.objects.values_list('pk', flat=True).first(),
+            'cliente': Cliente.objects.values_list('pk', flat=True).first(),
+            'locacao': Locacao.objects.values_list('pk', flat=True).first(),
+            'itemlocacao': ItemLocacao.objects.values_list('pk', flat=True).first(),
+            'movimentacaoestoque': MovimentacaoEstoque.objects.values_list('pk', flat=True).first(),
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def test_query_budget(self):
+        for rota, detalhe, limite in self.BUDGETS:
+            kwargs = {'pk': self.pks[rota.split('-')[0]]} if detalhe else {}
+            url = reverse(rota, kwargs=kwargs)
+            for page_size in (1, 100):
+                with self.subTest(rota=rota, page_size=page_size):
+                    cache.clear()
+                    with mock.patch.object(PageNumberPagination, 'page_size', page_size):
+                        with CaptureQueriesContext(connection) as consultas:
+                            response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertLessEqual(
+                        len(consultas), limite,
+                        f'{url} executou {len(consultas)} consultas (limite {limite}):\n'
+                        + '\n'.join(consulta['sql'] for consulta in consultas.captured_queries)
+                    )
+
+    def test_relatorio_financeiro_nao_multiplica_pelos_itens(self):
+        response = self.client.get(reverse('locacao-relatorio-financeiro') + '?periodo=365')
+        self.assertEqual(response.data['total_locacoes'], TOTAL_REGISTROS)
+        self.assertEqual(
+            [(item['status'], item['count']) for item in response.data['por_status']],
+            [('A', TOTAL_REGISTROS)]
+        )
+
+    def test_dashboard(self):
+        vencidas = list(Locacao.objects.order_by('numero_locacao').values_list('pk', flat=True)[:3])
+        Locacao.objects.filter(pk__in=vencidas).update(vencida=True)
+        Peca.objects.filter(codigo='PC0000').update(quantidade_disponivel=0, quantidade_locada=100)
+        response = self.client.get(reverse('dashboard-list'))
+        self.assertEqual(response.status_code, 200)
+        dados = response.data
+        self.assertEqual(dados['estoque'], {
+            'total_pecas': TOTAL_REGISTROS,
+            'quantidade_total': 100 * TOTAL_REGISTROS,
+            'quantidade_disponivel': 90 * TOTAL_REGISTROS - 90,
+            'quantidade_locada': 10 * TOTAL_REGISTROS + 90,
+            'pecas_sem_estoque': 1,
+            'pecas_estoque_baixo': 1,
+        })
+        self.assertEqual(
+            (dados['total_clientes'], dados['locacoes_ativas'], dados['locacoes_vencidas']),
+            (TOTAL_REGISTROS, TOTAL_REGISTROS, 3)
+        )
+        # Nos últimos 30 dias: as locações com data de hoje até 30 dias atrás (i % 60 <= 30)
+        no_periodo = sum(1 for i in range(TOTAL_REGISTROS) if i % 60 <= 30)
+        self.assertEqual(dados['financeiro']['total_locacoes'], no_periodo)
+        self.assertEqual(dados['financeiro']['receita_total'], Decimal('100.00') * no_periodo)
+        self.assertEqual(
+            [(item['status'], item['count']) for item in dados['financeiro']['por_status']], [('A', no_periodo)]
+        )
+        self.assertEqual([item['codigo'] for item in dados['estoque_baixo']], ['PC0000'])
+        self.assertEqual(sorted(item['id'] for item in dados['vencidas']), sorted(vencidas))
+
+    def test_locacao_totais_anotados(self):
+        response = self.client.get(reverse('locacao-detail', kwargs={'pk': self.pks['locacao']}))
+        self.assertEqual(response.data['total_itens'], 2)
+        self.assertEqual(Decimal(response.data['valor_itens']), Decimal('100.00'))
+
+
+class ReservaEstoqueTests(APITestCase):
+    """
+    A reserva do estoque na criação da locação é um único UPDATE condicional
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados(total=60)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.usuario)
+
+    def carrinho(self, quantidades):
+        ids = dict(Peca.objects.filter(codigo__in=quantidades).values_list('codigo', 'id'))
+        return {
+            'cliente': Cliente.objects.values_list('pk', flat=True).first(),
+            'data_locacao': str(date.today()),
+            'data_previsao_devolucao': str(date.today() + timedelta(days=5)),
+            'itens': [{'peca': ids[codigo], 'quantidade': quantidade} for codigo, quantidade in quantidades.items()],
+        }
+
+    def locar(self, quantidades):
+        return self.client.post(reverse('locacao-list'), self.carrinho(quantidades), format='json')
+
+    def contadores(self, *codigos):
+        return list(Peca.objects.filter(codigo__in=codigos).order_by('codigo').values_list(
+            'quantidade_disponivel', 'quantidade_locada'
+        ))
+
+    def test_nao_reserva_alem_do_disponivel(self):
+        # O período comporta a locação, mas outra gravação deixou só uma unidade disponível de PC0000
+        Peca.objects.filter(codigo='PC0000').update(quantidade_disponivel=1)
+        antes = self.contadores('PC0000', 'PC0001')
+        # Sem a validação, como se a outra locação tivesse gravado entre a validação e a reserva
+        with mock.patch.object(LocacaoCreateSerializer, 'validate', lambda serializer, data: data):
+            response = self.locar({'PC0000': 2, 'PC0001': 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('PC0000', response.data['itens'][0])
+        # A peça que tinha estoque também não foi reservada: a criação inteira foi desfeita
+        self.assertEqual(self.contadores('PC0000', 'PC0001'), antes)
+        self.assertEqual(Locacao.objects.count(), 60)
+
+    def test_consultas_independem_do_numero_de_itens(self):
+        # A primeira locação inicia a sequência de numeração
+        self.assertEqual(self.locar({'PC0059': 1}).status_code, 201)
+        consultas = []
+        for codigos in (['PC0000'], [f'PC{i:04d}' for i in range(1, 51)]):
+            carrinho = self.carrinho({codigo: 1 for codigo in codigos})
+            cache.clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                response = self.client.post(reverse('locacao-list'), carrinho, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+        self.assertEqual(self.contadores('PC0000', 'PC0050'), [(89, 11), (89, 11)])
+
+
+class FinalizacaoLoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados(total=30)
+        cls.ids = list(Locacao.objects.order_by('numero_locacao').values_list('id', flat=True))
+
+    def contadores(self, ids):
+        return dict(Peca.objects.filter(itemlocacao__locacao_id__in=ids).annotate(
+            devolvidas=Sum('itemlocacao__quantidade')
+        ).values_list('id', 'devolvidas'))
+
+    def test_finaliza_so_as_ativas(self):
+        ativas, finalizada = self.ids[:3], self.ids[3]
+        Locacao.objects.filter(pk=finalizada).update(status='F')
+        resumos.reconstruir()
+        inexistente = max(self.ids) + 1000
+        devolvidas = self.contadores(ativas)
+        antes = dict(Peca.objects.filter(pk__in=devolvidas).values_list('id', 'quantidade_disponivel'))
+
+        finalizadas = finalizar_locacoes([*ativas, finalizada, inexistente], date.today(), self.usuario)
+
+        self.assertEqual(sorted(finalizadas), sorted(ativas))
+        self.assertEqual(
+            set(Locacao.objects.filter(pk__in=ativas).values_list('status', 'data_devolucao')), {('F', date.today())}
+        )
+        for peca in Peca.objects.filter(pk__in=devolvidas):
+            self.assertEqual(peca.quantidade_disponivel, antes[peca.pk] + devolvidas[peca.pk])
+            self.assertEqual(peca.quantidade_disponivel + peca.quantidade_locada, peca.quantidade_total)
+        # Uma entrada por item das locações finalizadas; nada para a já finalizada
+        entradas = MovimentacaoEstoque.objects.filter(tipo_movimentacao='E')
+        self.assertEqual(
+            sorted(entradas.values_list('locacao_id', 'peca_id', 'quantidade')),
+            sorted(ItemLocacao.objects.filter(locacao_id__in=ativas).values_list('locacao_id', 'peca_id', 'quantidade'))
+        )
+        # Os resumos diários, atualizados em lote, batem com os reconstruídos do zero
+        incrementais = list(ResumoDiarioLocacao.objects.filter(quantidade__gt=0).values_list(
+            'data', 'status', 'quantidade', 'valor_final'
+        ).order_by('data', 'status'))
+        resumos.reconstruir()
+        self.assertEqual(incrementais, list(ResumoDiarioLocacao.objects.values_list(
+            'data', 'status', 'quantidade', 'valor_final'
+        ).order_by('data', 'status')))
+
+    def test_consultas_independem_do_numero_de_locacoes(self):
+        consultas = []
+        for ids in (self.ids[:2], self.ids[2:22]):
+            with CaptureQueriesContext(connection) as capturadas:
+                self.assertEqual(len(finalizar_locacoes(ids, date.today(), self.usuario)), len(ids))
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+
+
+class ResumoDiarioTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados(20)
+
+    def resumos(self):
+        return (
+            list(ResumoDiarioLocacao.objects.filter(quantidade__gt=0).values_list('data', 'status', 'quantidade', 'valor_final')),
+            list(ResumoDiarioMovimentacao.objects.filter(movimentacoes__gt=0).values_list(
+                'data', 'tipo_movimentacao', 'movimentacoes', 'quantidade'
+            )),
+        )
+
+    def test_manutencao_incremental_igual_a_reconstrucao(self):
+        self.client.force_authenticate(self.usuario)
+        locacao = Locacao.objects.first()
+        locacao.desconto = Decimal('10.00')
+        locacao.data_locacao -= timedelta(days=3)
+        locacao.save()
+        Locacao.objects.last().delete()
+        response = self.client.post(
+            reverse('locacao-finalizar-lote'),
+            {'locacoes': list(Locacao.objects.values_list('pk', flat=True)[:5])},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        MovimentacaoEstoque.objects.create(
+            peca=Peca.objects.first(), tipo_movimentacao='E', quantidade=7, motivo='Compra', usuario=self.usuario
+        )
+
+        incremental = self.resumos()
+        resumos.reconstruir()
+        self.assertEqual(incremental, self.resumos())
+
+    def test_intervalo_e_agrupamento(self):
+        hoje = date.today()
+        url = reverse('locacao-relatorio-financeiro')
+        response = self.client.get(url, {'data_inicio': str(hoje - timedelta(days=9)), 'data_fim': str(hoje)})
+        self.assertEqual(response.data['total_locacoes'], 10)
+        self.assertEqual(len(response.data['serie']), 10)
+
+        response = self.client.get(url, {'periodo': 365, 'agrupamento': 'mes'})
+        self.assertEqual(sum(ponto['total_locacoes'] for ponto in response.data['serie']), 20)
+        self.assertTrue(all(ponto['periodo'].day == 1 for ponto in response.data['serie']))
+
+        response = self.client.get(reverse('movimentacaoestoque-relatorio-movimentacoes'), {'agrupamento': 'semana'})
+        self.assertEqual(response.data['total_saidas'], 20)
+        self.assertEqual(response.data['saldo'], -20)
+
+        for parametros in ({'agrupamento': 'ano'}, {'data_inicio': '17/10/2026'}, {'periodo': 'x'}):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(url, parametros).status_code, 400)
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def test_gerar_dados_e_benchmark(self):
+        call_command(
+            'gerar_dados', tipos=3, pecas=20, clientes=10, locacoes=50, movimentacoes=200, stdout=StringIO()
+        )
+        self.assertEqual(Locacao.objects.count(), 50)
+        self.assertEqual(MovimentacaoEstoque.objects.count(), 200)
+        # Estoque locado coerente com os itens das locações ativas e pendentes (todas já iniciadas)
+        locado = ItemLocacao.objects.filter(
+            locacao__status__in=('A', 'P')
+        ).aggregate(total=Sum('quantidade'))['total'] or 0
+        self.assertEqual(Peca.objects.aggregate(total=Sum('quantidade_locada'))['total'], locado)
+        self.assertFalse(Peca.objects.exclude(quantidade_total=F('quantidade_disponivel') + F('quantidade_locada')).exists())
+        self.assertEqual(conciliar().total_divergencias, 0)
+
+        saida = StringIO()
+        call_command('benchmark', iteracoes=2, aquecimento=0, json=True, stdout=saida)
+        resultados = json.loads(saida.getvalue())
+        self.assertIn('/api/dashboard/', [resultado['url'] for resultado in resultados])
+        for resultado in resultados:
+            self.assertEqual(resultado['status'], 200, resultado['url'])
+            self.assertLessEqual(resultado['p50'], resultado['p99'])
+
+    def test_benchmark_exige_iteracoes(self):
+        with self.assertRaisesMessage(CommandError, '--iteracoes'):
+            call_command('benchmark', iteracoes=0, stdout=StringIO())
+        self.assertIsNone(percentil([], 50))
+        self.assertEqual(percentil([1.0, 3.0], 50), 2.0)
+
+
+class KeysetPaginationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        criar_dados(total=25)
+
+    def test_percorre_movimentacoes_sem_repetir(self):
+        vistos = []
+        url = reverse('movimentacaoestoque-list') + '?paginacao=cursor&page_size=10'
+        while url:
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            self.assertLessEqual(len(consultas), 1)
+            vistos.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        esperados = list(
+            MovimentacaoEstoque.objects.order_by('-data_movimentacao', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(vistos, esperados)
+
+    def test_cursor_estavel_com_novos_registros(self):
+        primeira = self.client.get(reverse('movimentacaoestoque-list') + '?paginacao=cursor&page_size=10').data
+        movimentacao = MovimentacaoEstoque.objects.first()
+        movimentacao.pk = None
+        movimentacao.save()
+        segunda = self.client.get(primeira['next']).data
+        ids_primeira = {item['id'] for item in primeira['results']}
+        self.assertFalse(ids_primeira & {item['id'] for item in segunda['results']})
+        self.assertEqual(len(segunda['results']), 10)
+
+        anterior = self.client.get(segunda['previous']).data
+        self.assertEqual([item['id'] for item in anterior['results']], [item['id'] for item in primeira['results']])
+
+    def test_itens_por_cursor_e_cursor_invalido(self):
+        response = self.client.get(reverse('itemlocacao-list') + '?paginacao=cursor&page_size=5')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+        response = self.client.get(reverse('itemlocacao-list') + '?cursor=invalido')
+        self.assertEqual(response.status_code, 404)
+
+
+class BuscaIndexadaTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        dados = {'telefone': '4899999999', 'endereco': 'Rua A, 1', 'estado': 'SC', 'cep': '88000-000'}
+        cls.joao = Cliente.objects.create(nome='João Conceição', cpf_cnpj='123.456.789-01', cidade='São José', **dados)
+        cls.maria = Cliente.objects.create(nome='Maria Souza', cpf_cnpj='98765432100', cidade='Palhoça', **dados)
+        cls.construtora = Cliente.objects.create(
+            nome='Construtora Joao Andaimes', cpf_cnpj='12345678000199', cidade='Joinville', **dados
+        )
+
+    def buscar(self, termo, rota='cliente-list'):
+        response = self.client.get(reverse(rota), {'search': termo})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_ignora_acentos_e_usa_prefixo(self):
+        self.assertEqual(set(self.buscar('joao')), {self.joao.pk, self.construtora.pk})
+        self.assertEqual(self.buscar('conceicao'), [self.joao.pk])
+        self.assertEqual(self.buscar('andaim'), [self.construtora.pk])
+        self.assertEqual(self.buscar('sao jose'), [self.joao.pk])
+
+    def test_documento_com_ou_sem_pontuacao(self):
+        self.assertEqual(self.buscar('12345678901'), [self.joao.pk])
+        self.assertEqual(self.buscar('987.654'), [])
+
+    def test_sincroniza_ao_salvar_e_excluir(self):
+        self.maria.nome = 'Maria Andaimes'
+        self.maria.save()
+        self.assertEqual(set(self.buscar('andaimes')), {self.maria.pk, self.construtora.pk})
+        self.maria.delete()
+        self.assertEqual(self.buscar('andaimes'), [self.construtora.pk])
+
+    def test_locacao_acompanha_nome_do_cliente(self):
+        locacao = Locacao.objects.create(
+            numero_locacao=77, cliente=self.maria, data_locacao=date.today(), data_previsao_devolucao=date.today()
+        )
+        self.assertEqual(self.buscar('souza', 'locacao-list'), [locacao.pk])
+        self.maria.nome = 'Maria Pereira'
+        self.maria.save()
+        self.assertEqual(self.buscar('souza', 'locacao-list'), [])
+        self.assertEqual(self.buscar('pereira', 'locacao-list'), [locacao.pk])
+
+    def test_ordering_explicito_prevalece_sobre_relevancia(self):
+        response = self.client.get(reverse('cliente-list'), {'search': 'joao', 'ordering': '-nome'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.joao.pk, self.construtora.pk])
+        response = self.client.get(reverse('cliente-list'), {'search': 'joao', 'ordering': 'nome'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.construtora.pk, self.joao.pk])
+
+    def test_sinaliza_busca_truncada(self):
+        response = self.client.get(reverse('cliente-list'), {'search': 'joao'})
+        self.assertNotIn(search.CABECALHO_TRUNCADA, response)
+        with mock.patch.object(search, 'LIMITE_RESULTADOS', 1):
+            response = self.client.get(reverse('cliente-list'), {'search': 'joao'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response[search.CABECALHO_TRUNCADA], '1')
+
+
+class ExportacaoTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        criar_dados(total=30)
+
+    def conteudo(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_exporta_locacoes_csv_com_filtros(self):
+        Locacao.objects.filter(numero_locacao__lte=10).update(status='F')
+        response = self.client.get(reverse('locacao-exportar'), {'status': 'F'})
+        self.assertTrue(response['Content-Disposition'].startswith('attachment; filename="locacoes_'))
+        linhas = self.conteudo(response).splitlines()
+        self.assertEqual(linhas[0].split(',')[:3], ['id', 'numero_locacao', 'cliente_id'])
+        self.assertIn('cliente_nome', linhas[0])
+        self.assertEqual(len(linhas), 11)
+
+    def test_exporta_movimentacoes_ndjson(self):
+        with CaptureQueriesContext(connection) as consultas:
+            registros = [
+                json.loads(linha)
+                for linha in self.conteudo(
+                    self.client.get(reverse('movimentacaoestoque-exportar'), {'formato': 'ndjson'})
+                ).splitlines()
+            ]
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(len(registros), 30)
+        self.assertEqual(registros[0]['usuario_nome'], 'estoque')
+        self.assertTrue(registros[0]['peca_codigo'].startswith('PC'))
+
+    def test_formato_invalido(self):
+        response = self.client.get(reverse('locacao-exportar'), {'formato': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportacaoTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tipo = TipoPeca.objects.create(nome='Escora Metálica', valor_locacao=Decimal('5.00'))
+        Peca.objects.create(tipo_peca=cls.tipo, codigo='ESC-0001', quantidade_total=10)
+        Cliente.objects.create(
+            nome='Construtora Alfa', tipo_pessoa='J', cpf_cnpj='12.345.678/0001-90', telefone='(48) 3333-0000',
+            endereco='Rua A, 1', cidade='Florianópolis', estado='SC', cep='88000-000'
+        )
+
+    def importar(self, rota, conteudo, **params):
+        arquivo = SimpleUploadedFile('importacao.csv', conteudo.encode('utf-8-sig'), content_type='text/csv')
+        return self.client.post(reverse(rota) + ('?simular=1' if params.get('simular') else ''), {'arquivo': arquivo})
+
+    def test_importa_pecas_em_lote(self):
+        linhas = ['codigo;tipo_peca;quantidade_total'] + [f'ESC-{i:04d};Escora Metálica;{i}' for i in range(2, 502)]
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.importar('peca-importar', '\n'.join(linhas))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['criados'], 500)
+        self.assertLess(len(consultas), 15)
+        peca = Peca.objects.get(codigo='ESC-0300')
+        self.assertEqual((peca.tipo_peca, peca.quantidade_disponivel), (self.tipo, 300))
+        self.assertEqual(self.client.get(reverse('peca-list'), {'search': 'ESC-0300'}).data['count'], 1)
+
+    def test_erros_por_linha_nao_gravam_nada(self):
+        conteudo = '\n'.join([
+            'codigo,tipo_peca,quantidade_total',
+            'ESC-0001,Escora Metálica,5',
+            'ESC-0002,Escora Metálica,5',
+            'ESC-0002,Escora Metálica,5',
+            'ESC-0003,Andaime,5',
+            'ESC-0004,Escora Metálica,-1',
+            'ESC-0005,Escora Metálica,5',
+        ])
+        response = self.importar('peca-importar', conteudo)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(erro['linha'], list(erro['erros'])) for erro in response.data['erros']],
+            [(2, ['codigo']), (3, ['codigo']), (4, ['codigo']), (5, ['tipo_peca']), (6, ['quantidade_total'])]
+        )
+        self.assertEqual(Peca.objects.count(), 1)
+
+    def test_clientes_comparam_documento_pelos_digitos(self):
+        cabecalho = 'nome,tipo_pessoa,cpf_cnpj,telefone,endereco,cidade,estado,cep'
+        response = self.importar('cliente-importar', '\n'.join([
+            cabecalho,
+            'Alfa Filial,J,12345678000190,(48) 3333-0001,Rua B,Joinville,SC,89200-000',
+            'Cliente Sem Documento,F,123,(48) 3333-0002,Rua C,Joinville,SC,89200-000',
+        ]))
+        self.assertEqual(
+            [(erro['linha'], list(erro['erros'])) for erro in response.data['erros']],
+            [(2, ['cpf_cnpj']), (3, ['cpf_cnpj'])]
+        )
+
+        response = self.importar('cliente-importar', '\n'.join([
+            cabecalho, 'Beta,F,123.456.789-01,(48) 3333-0003,Rua D,Joinville,SC,89200-000',
+        ]), simular=True)
+        self.assertEqual((response.status_code, response.data['criados']), (200, 0))
+        self.assertFalse(Cliente.objects.filter(nome='Beta').exists())
+
+    def test_importador_sem_validacao_do_lote(self):
+        class SemValidacao(Importador):
+            model = TipoPeca
+            serializer_class = TipoPecaSerializer
+
+        with self.assertRaises(TypeError):
+            SemValidacao()
+
+
+class RespostaVersionadaTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        criar_dados(total=10)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_etag_e_304_enquanto_nada_muda(self):
+        url = reverse('tipopeca-estatisticas')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url).data, response.data)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(len(consultas), 0)
+
+    def test_escritas_invalidam(self):
+        estoque = reverse('peca-relatorio-estoque')
+        tipos = reverse('tipopeca-list')
+        etags = {url: self.client.get(url)['ETag'] for url in (estoque, tipos)}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(tipos, {'nome': 'Novo Tipo', 'valor_locacao': '12.00'})
+        self.assertEqual(self.client.get(estoque, HTTP_IF_NONE_MATCH=etags[estoque]).status_code, 304)
+        response = self.client.get(tipos, HTTP_IF_NONE_MATCH=etags[tipos])
+        self.assertEqual((response.status_code, response.data['count']), (200, 4))
+
+        # Reservas em lote (UPDATE sem sinais) também invalidam
+        with self.captureOnCommitCallbacks(execute=True):
+            Peca.objects.reservar({Peca.objects.first().pk: 1})
+        response = self.client.get(estoque, HTTP_IF_NONE_MATCH=etags[estoque])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['quantidade_locada'], Peca.objects.aggregate(total=Sum('quantidade_locada'))['total'])
+
+    @override_settings(
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'respostas'},
+            'versoes': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'versoes'},
+        },
+        VERSOES_CACHE='versoes',
+    )
+    def test_versoes_em_cache_proprio(self):
+        versoes = caches['versoes']
+        versoes.clear()
+        url = reverse('tipopeca-estatisticas')
+        etag = self.client.get(url)['ETag']
+        self.assertIn('versao:main.tipopeca', versoes.get_many(['versao:main.tipopeca']))
+        self.assertIsNone(cache.get('versao:main.tipopeca'))
+
+        # Outro processo grava (a versão muda só no cache compartilhado): a resposta deixa de valer
+        anterior = versoes.get('versao:main.tipopeca')
+        versoes.set('versao:main.tipopeca', anterior + 1, None)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class DisponibilidadeTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        criar_dados(total=10)
+        cls.peca = Peca.objects.get(codigo='PC0000')
+        cls.peca.quantidade_total = 10
+        cls.peca.save()
+        cls.hoje = date.today()
+
+    def setUp(self):
+        cache.clear()
+
+    def reservar(self, inicio, fim, quantidade, numero):
+        return self.client.post(reverse('locacao-list'), {
+            'numero_locacao': numero,
+            'cliente': Cliente.objects.first().pk,
+            'data_locacao': str(self.hoje + timedelta(days=inicio)),
+            'data_previsao_devolucao': str(self.hoje + timedelta(days=fim)),
+            'itens': [{'peca': self.peca.pk, 'quantidade': quantidade}],
+        }, format='json')
+
+    def disponivel(self, inicio, fim):
+        response = self.client.get(reverse('disponibilidade-list'), {
+            'pecas': self.peca.pk,
+            'data_inicio': str(self.hoje + timedelta(days=inicio)),
+            'data_fim': str(self.hoje + timedelta(days=fim)),
+        })
+        return response.data['results'][0]['quantidade_disponivel']
+
+    def test_mapa_por_varredura(self):
+        from .disponibilidade import MapaDisponibilidade
+        mapa = MapaDisponibilidade(10, [(1, 5, 3), (4, 8, 4), (10, 10, 10)])
+        self.assertEqual([mapa.ocupacao_maxima(a, b) for a, b in [(0, 0), (1, 3), (4, 5), (6, 9), (9, 12), (11, 20)]],
+                         [0, 3, 7, 4, 10, 0])
+        self.assertEqual(mapa.disponivel(4, 4), 3)
+
+    def test_reserva_futura_sem_overbooking(self):
+        # As locações de criar_dados ocupam 1 unidade da peça até daqui a 6 e a 15 dias
+        self.assertEqual(self.disponivel(0, 6), 8)
+        self.assertEqual(self.disponivel(20, 30), 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.reservar(20, 30, 8, 500)
+        self.assertEqual(response.status_code, 201, response.data)
+        # O estoque atual não é reservado por uma locação futura
+        self.assertEqual(Peca.objects.get(pk=self.peca.pk).quantidade_locada, self.peca.quantidade_locada)
+
+        self.assertEqual(self.disponivel(10, 19), 9)
+        self.assertEqual(self.disponivel(10, 25), 2)
+        self.assertEqual(self.reservar(14, 22, 3, 501).status_code, 400)
+        self.assertEqual(self.reservar(31, 40, 10, 502).status_code, 201)
+
+    def test_locacao_imediata_respeita_reservas_futuras(self):
+        # Contadores coerentes com as duas locações ativas de criar_dados que usam a peça
+        Peca.objects.filter(pk=self.peca.pk).update(quantidade_disponivel=8, quantidade_locada=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.reservar(20, 30, 8, 500).status_code, 201)
+        # Cabe no estoque disponível de hoje, mas não nos dias 20 a 25, já reservados
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.reservar(0, 25, 5, 501)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Peca.objects.get(pk=self.peca.pk).quantidade_locada, 2)
+        self.assertEqual(self.disponivel(20, 25), 2)
+
+        # Sem o cache do motor, a conferência na gravação também recusa a locação
+        with mock.patch.object(LocacaoCreateSerializer, 'validate', lambda serializer, data: data):
+            self.assertEqual(self.reservar(0, 25, 5, 502).status_code, 400)
+
+    def test_reserva_futura_so_ocupa_o_estoque_ao_ser_ativada(self):
+        self.client.force_authenticate(User.objects.get(username='estoque'))
+        Peca.objects.filter(pk=self.peca.pk).update(quantidade_disponivel=8, quantidade_locada=2)
+        response = self.client.post(reverse('locacao-list'), {
+            'cliente': Cliente.objects.first().pk, 'status': 'A',
+            'data_locacao': str(self.hoje + timedelta(days=20)),
+            'data_previsao_devolucao': str(self.hoje + timedelta(days=30)),
+            'itens': [{'peca': self.peca.pk, 'quantidade': 5}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        reserva = self.reservar(20, 30, 5, 500).data
+        self.assertFalse(reserva['estoque_reservado'])
+        url = reverse('locacao-detail', kwargs={'pk': reserva['id']})
+        self.assertEqual(self.client.patch(url, {'status': 'A'}, format='json').status_code, 400)
+
+        # No dia da locação a ativação passa as peças de disponível para locada
+        Locacao.objects.filter(pk=reserva['id']).update(
+            data_locacao=self.hoje, data_previsao_devolucao=self.hoje + timedelta(days=10)
+        )
+        response = self.client.patch(url, {'status': 'A'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTrue(response.data['estoque_reservado'])
+        peca = Peca.objects.get(pk=self.peca.pk)
+        self.assertEqual((peca.quantidade_disponivel, peca.quantidade_locada), (3, 7))
+
+        self.client.post(reverse('locacao-finalizar', kwargs={'pk': reserva['id']}))
+        peca = Peca.objects.get(pk=self.peca.pk)
+        self.assertEqual((peca.quantidade_disponivel, peca.quantidade_locada), (8, 2))
+
+        # Uma locação ativa que nunca retirou as peças não as devolve
+        nao_reservada = Locacao.objects.create(
+            cliente=Cliente.objects.first(), data_locacao=self.hoje, data_previsao_devolucao=self.hoje, status='A'
+        )
+        ItemLocacao.objects.create(locacao=nao_reservada, peca=self.peca, quantidade=5)
+        response = self.client.post(reverse('locacao-finalizar', kwargs={'pk': nao_reservada.pk}))
+        self.assertEqual(response.status_code, 200)
+        peca = Peca.objects.get(pk=self.peca.pk)
+        self.assertEqual((peca.quantidade_disponivel, peca.quantidade_locada), (8, 2))
+
+    def test_consultas_em_cache_e_verificacao_em_lote(self):
+        url = reverse('disponibilidade-verificar')
+        pecas = list(Peca.objects.values_list('pk', flat=True)[:3])
+        corpo = {
+            'data_inicio': str(self.hoje), 'data_fim': str(self.hoje + timedelta(days=7)),
+            'itens': [{'peca': pk, 'quantidade': 50} for pk in pecas],
+        }
+        self.assertEqual(self.client.post(url, corpo, format='json').status_code, 200)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(url, corpo, format='json')
+        self.assertEqual(len(consultas), 0)
+        self.assertEqual([item['disponivel'] for item in response.data['itens']], [False, True, True])
+        self.assertEqual(self.client.post(url, {'itens': []}, format='json').status_code, 400)
+
+
+class RelatoriosAsyncTests(TransactionTestCase):
+    """
+    As views assíncronas consultam em outras threads (com conexões próprias),
+    por isso os dados precisam estar gravados fora da transação do teste
+    """
+
+    def setUp(self):
+        criar_dados(total=20)
+        cache.clear()
+
+    def test_mesmo_resultado_das_views_sincronas(self):
+        rotas = [
+            ('async-tipopeca-estatisticas', 'tipopeca-estatisticas', {}),
+            ('async-peca-relatorio-estoque', 'peca-relatorio-estoque', {}),
+            ('async-locacao-relatorio-financeiro', 'locacao-relatorio-financeiro', {'agrupamento': 'semana'}),
+            ('async-movimentacaoestoque-relatorio-movimentacoes', 'movimentacaoestoque-relatorio-movimentacoes',
+             {'periodo': 7}),
+            ('async-dashboard', 'dashboard-list', {}),
+        ]
+        for rota_async, rota, parametros in rotas:
+            with self.subTest(rota=rota_async):
+                cache.clear()
+                esperado = self.client.get(reverse(rota), parametros, HTTP_ACCEPT='application/json').json()
+                cache.clear()
+                response = self.client.get(reverse(rota_async), parametros)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), esperado)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(reverse('async-dashboard'), {'periodo': 'x'}).status_code, 400)
+        self.assertEqual(
+            self.client.get(reverse('async-locacao-relatorio-financeiro'), {'agrupamento': 'ano'}).status_code, 400
+        )
+        self.assertEqual(self.client.post(reverse('async-dashboard')).status_code, 405)
+
+    def test_relatorio_incompleto(self):
+        class SemMontagem(Relatorio):
+            def consultas(self):
+                return {}
+
+        with self.assertRaises(TypeError):
+            SemMontagem()
+
+    async def test_exportacao_em_asgi(self):
+        response = await self.async_client.get(reverse('locacao-exportar'), {'formato': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        # Conteúdo assíncrono: o Django não precisa consumir o gerador síncrono em outra thread
+        self.assertTrue(response.is_async)
+        conteudo = b''.join([bloco async for bloco in response.streaming_content]).decode('utf-8')
+        self.assertEqual(len(conteudo.splitlines()), 20)
+
+
+class MetricasTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        criar_dados(total=5)
+
+    def setUp(self):
+        registro.limpar()
+
+    def test_histogramas_por_view_e_acao(self):
+        self.client.get(reverse('locacao-list') + '?expand=itens')
+        self.client.get(reverse('locacao-list') + '?expand=itens')
+        self.client.get(reverse('locacao-relatorio-financeiro'))
+        texto = self.client.get(reverse('metricas')).content.decode()
+
+        self.assertIn('deltad_requisicoes_total{view="LocacaoViewSet.list",metodo="GET",status="200"} 2', texto)
+        self.assertIn('deltad_requisicao_segundos_count{view="LocacaoViewSet.list",metodo="GET"} 2', texto)
+        self.assertIn('deltad_sql_consultas_count{view="LocacaoViewSet.relatorio_financeiro",metodo="GET"} 1', texto)
+        # Listagem: contagem + página + prefetch dos itens e peças, medidos em cada requisição
+        self.assertIn('deltad_sql_consultas_bucket{view="LocacaoViewSet.list",metodo="GET",le="2"} 0', texto)
+        self.assertIn('deltad_sql_consultas_bucket{view="LocacaoViewSet.list",metodo="GET",le="5"} 2', texto)
+        serializacao = [
+            linha for linha in texto.splitlines()
+            if linha.startswith('deltad_serializacao_segundos_sum{view="LocacaoViewSet.list"')
+        ]
+        self.assertGreater(float(serializacao[0].split()[-1]), 0)
+
+    @override_settings(METRICAS_CONSULTA_LENTA_MS=0)
+    def test_log_de_consultas_lentas_com_origem(self):
+        with self.assertLogs('main.metricas', 'WARNING') as logs:
+            self.client.get(reverse('peca-relatorio-estoque'))
+        self.assertIn('PecaViewSet.relatorio_estoque', logs.output[0])
+        self.assertIn('main/relatorios.py', logs.output[0])
+
+
+class CamposDinamicosTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        criar_dados(total=5)
+        cls.locacao = Locacao.objects.order_by('numero_locacao').first()
+
+    def test_itens_apenas_com_expand_na_listagem(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('locacao-list'))
+        self.assertNotIn('itens', response.data['results'][0])
+        self.assertEqual(response.data['results'][0]['total_itens'], 2)
+        # Contagem + página, sem o prefetch dos itens
+        self.assertEqual(len(consultas), 2)
+
+        response = self.client.get(reverse('locacao-list') + '?expand=itens')
+        self.assertEqual(len(response.data['results'][0]['itens']), 2)
+        # No detalhe os itens continuam incluídos por padrão
+        response = self.client.get(reverse('locacao-detail', kwargs={'pk': self.locacao.pk}))
+        self.assertEqual(len(response.data['itens']), 2)
+
+    def test_fields_limita_campos_e_colunas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('locacao-list') + '?fields=numero_locacao,cliente_nome,status')
+        self.assertEqual(set(response.data['results'][0]), {'numero_locacao', 'cliente_nome', 'status'})
+        self.assertEqual(response.data['results'][0]['cliente_nome'], 'Cliente 0')
+        pagina = consultas.captured_queries[-1]['sql']
+        self.assertNotIn('observacoes', pagina)
+        self.assertNotIn('main_itemlocacao', pagina)
+
+    def test_fields_aninhados(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(
+                reverse('locacao-detail', kwargs={'pk': self.locacao.pk}) + '?fields=numero_locacao,itens.peca_codigo'
+            )
+        self.assertEqual(set(response.data), {'numero_locacao', 'itens'})
+        self.assertEqual(set(response.data['itens'][0]), {'peca_codigo'})
+        self.assertEqual(len(consultas), 2)
+        self.assertNotIn('valor_total_item', consultas.captured_queries[1]['sql'])
+
+    def test_fields_na_paginacao_por_cursor(self):
+        url = reverse('movimentacaoestoque-list') + '?paginacao=cursor&page_size=2&fields=quantidade,peca_codigo'
+        response = self.client.get(url)
+        self.assertEqual(set(response.data['results'][0]), {'quantidade', 'peca_codigo'})
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(len(consultas), 1)
+
+
+class ConciliacaoEstoqueTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados(total=5)
+
+    def test_divergencias_e_correcao(self):
+        # criar_dados marca 10 peças locadas, mas cada peça está em duas locações de uma peça
+        conciliacao = conciliar()
+        self.assertEqual((conciliacao.pecas_verificadas, conciliacao.total_divergencias), (5, 5))
+        divergencia = conciliacao.divergencias.first()
+        self.assertEqual((divergencia.quantidade_locada, divergencia.quantidade_locada_esperada), (10, 2))
+        self.assertEqual(divergencia.quantidade_disponivel_esperada, 98)
+        self.assertFalse(Peca.objects.filter(quantidade_locada=2).exists())
+
+        conciliacao = conciliar(corrigir=True)
+        self.assertEqual(conciliacao.total_corrigidas, 5)
+        self.assertEqual(Peca.objects.filter(quantidade_locada=2, quantidade_disponivel=98).count(), 5)
+        self.assertEqual(conciliar().total_divergencias, 0)
+
+    def test_processa_apenas_movimentacoes_novas(self):
+        conciliar(corrigir=True)
+        peca = Peca.objects.first()
+        self.client.force_authenticate(self.usuario)
+        self.client.post(reverse('peca-ajustar-estoque', kwargs={'pk': peca.pk}), {'quantidade_total': 120})
+        # Alteração direta do contador, sem movimentação
+        Peca.objects.filter(pk=peca.pk).update(quantidade_total=130, quantidade_disponivel=128)
+
+        with CaptureQueriesContext(connection) as consultas:
+            conciliacao = conciliar()
+        razao = next(consulta['sql'] for consulta in consultas.captured_queries if 'SUM(CASE' in consulta['sql'])
+        self.assertIn('"main_movimentacaoestoque"."id" >', razao)
+        self.assertEqual(conciliacao.ultima_movimentacao, MovimentacaoEstoque.objects.latest('id').pk)
+        self.assertEqual(
+            list(conciliacao.divergencias.values_list('peca_id', 'quantidade_total', 'quantidade_total_esperada')),
+            [(peca.pk, 130, 120)]
+        )
+        self.assertEqual(conciliar(completa=True).total_divergencias, 1)
+
+    def test_reserva_antecipada_nao_ativada_nao_ocupa_estoque(self):
+        conciliar(corrigir=True)
+        peca = Peca.objects.first()
+        antes = Peca.objects.values_list('quantidade_disponivel', 'quantidade_locada').get(pk=peca.pk)
+        self.client.force_authenticate(self.usuario)
+        response = self.client.post(reverse('locacao-list'), {
+            'cliente': Cliente.objects.first().pk,
+            'data_locacao': str(date.today() + timedelta(days=3)),
+            'data_previsao_devolucao': str(date.today() + timedelta(days=10)),
+            'itens': [{'peca': peca.pk, 'quantidade': 4}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        # Três dias depois a data de locação chegou, mas a reserva ainda não foi ativada
+        Locacao.objects.filter(pk=response.data['id']).update(
+            data_locacao=date.today() - timedelta(days=1), data_previsao_devolucao=date.today() + timedelta(days=6)
+        )
+        conciliacao = conciliar(corrigir=True)
+        self.assertEqual(conciliacao.total_divergencias, 0)
+        self.assertEqual(
+            Peca.objects.values_list('quantidade_disponivel', 'quantidade_locada').get(pk=peca.pk), antes
+        )
+
+    def test_comando(self):
+        saida = StringIO()
+        call_command('conciliar_estoque', '--corrigir', stdout=saida)
+        self.assertIn('5 com divergência, 5 corrigidas', saida.getvalue())
+        self.assertEqual(ConciliacaoEstoque.objects.count(), 1)
+
+
+class InadimplenciaTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        criar_dados(total=5)
+        cls.cliente = Cliente.objects.get(nome='Cliente 1')
+        hoje = date.today()
+        cls.vencida = Locacao.objects.create(
+            numero_locacao=100, cliente=cls.cliente, data_locacao=hoje - timedelta(days=20),
+            data_previsao_devolucao=hoje + timedelta(days=5), status='A',
+        )
+
+    def test_marca_vencidas_e_inadimplentes(self):
+        self.assertFalse(Locacao.objects.get(pk=self.vencida.pk).vencida)
+        Locacao.objects.filter(pk=self.vencida.pk).update(data_previsao_devolucao=date.today() - timedelta(days=1))
+
+        # Quatro leituras, duas atualizações em lote e a auditoria (mais o savepoint)
+        with self.assertNumQueries(9):
+            resultado = atualizar_inadimplencia()
+        self.assertEqual(resultado, {
+            'locacoes_vencidas': 1, 'locacoes_regularizadas': 0,
+            'clientes_inadimplentes': 1, 'clientes_regularizados': 0,
+        })
+        self.assertEqual(Cliente.objects.get(pk=self.cliente.pk).status, 'I')
+        self.assertEqual(
+            [locacao['id'] for locacao in self.client.get(reverse('locacao-vencidas')).data],
+            [self.vencida.pk]
+        )
+        self.assertEqual(
+            RegistroAuditoria.objects.filter(modelo='main.cliente', objeto_id=self.cliente.pk).get().valor_novo, 'I'
+        )
+
+        # Devolução: a locação deixa de estar vencida e o cliente volta a ficar ativo
+        self.client.post(reverse('locacao-finalizar', kwargs={'pk': self.vencida.pk}))
+        self.assertFalse(Locacao.objects.get(pk=self.vencida.pk).vencida)
+        resultado = atualizar_inadimplencia()
+        self.assertEqual(resultado['clientes_regularizados'], 1)
+        self.assertEqual(Cliente.objects.get(pk=self.cliente.pk).status, 'A')
+        # Clientes marcados manualmente continuam inadimplentes
+        self.assertEqual(Cliente.objects.get(nome='Cliente 0').status, 'I')
+
+    def test_save_acompanha_o_prazo(self):
+        self.vencida.data_previsao_devolucao = date.today() - timedelta(days=1)
+        self.vencida.save()
+        self.assertTrue(Locacao.objects.get(pk=self.vencida.pk).vencida)
+        self.vencida.status = 'C'
+        self.vencida.save()
+        self.assertFalse(Locacao.objects.get(pk=self.vencida.pk).vencida)
+
+
+class IdempotenciaTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados(total=5)
+        cls.peca = Peca.objects.get(codigo='PC0000')
+
+    def setUp(self):
+        self.client.force_authenticate(self.usuario)
+
+    def criar(self, chave, quantidade=5):
+        return self.client.post(reverse('locacao-list'), {
+            'cliente': Cliente.objects.first().pk,
+            'data_locacao': str(date.today()),
+            'data_previsao_devolucao': str(date.today() + timedelta(days=7)),
+            'itens': [{'peca': self.peca.pk, 'quantidade': quantidade}],
+        }, format='json', HTTP_IDEMPOTENCY_KEY=chave)
+
+    def test_repeticao_devolve_a_resposta_original(self):
+        primeira = self.criar('chave-1')
+        self.assertEqual(primeira.status_code, 201)
+        with CaptureQueriesContext(connection) as consultas:
+            repeticao = self.criar('chave-1')
+        self.assertEqual(repeticao.status_code, 201)
+        self.assertEqual(repeticao['Idempotent-Replayed'], 'true')
+        self.assertEqual(repeticao.json(), primeira.json())
+        # A repetição só tenta reservar a chave e lê a resposta guardada
+        self.assertFalse([q for q in consultas.captured_queries if 'main_locacao' in q['sql']])
+        self.assertEqual(Locacao.objects.filter(numero_locacao=primeira.data['numero_locacao']).count(), 1)
+        self.assertEqual(Locacao.objects.count(), 6)
+        self.assertEqual(Peca.objects.get(pk=self.peca.pk).quantidade_disponivel, self.peca.quantidade_disponivel - 5)
+
+        # A mesma chave com outra requisição é recusada
+        self.assertEqual(self.criar('chave-1', quantidade=4).status_code, 422)
+
+    def test_finalizar_e_ajustar_estoque(self):
+        locacao = Locacao.objects.order_by('numero_locacao').first()
+        url = reverse('locacao-finalizar', kwargs={'pk': locacao.pk})
+        for _ in range(2):
+            response = self.client.post(url, HTTP_IDEMPOTENCY_KEY='devolucao')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(MovimentacaoEstoque.objects.filter(locacao=locacao, tipo_movimentacao='E').count(), 2)
+
+        url = reverse('peca-ajustar-estoque', kwargs={'pk': self.peca.pk})
+        for _ in range(2):
+            self.client.post(url, {'quantidade_total': 150}, HTTP_IDEMPOTENCY_KEY='ajuste')
+        self.assertEqual(MovimentacaoEstoque.objects.filter(peca=self.peca, locacao__isnull=True).count(), 1)
+
+    def test_erros_nao_sao_guardados_e_chaves_expiram(self):
+        response = self.client.post(reverse('peca-ajustar-estoque', kwargs={'pk': self.peca.pk}), {}, HTTP_IDEMPOTENCY_KEY='x')
+        self.assertEqual(response.status_code, 400)
+        # 4xx retornado pela view fica guardado; exceções (validação do serializer) não
+        self.assertEqual(ChaveIdempotencia.objects.get(chave='x').status_code, 400)
+        self.criar('y', quantidade=10 ** 6)  # acima do disponível
+        self.assertFalse(ChaveIdempotencia.objects.filter(chave='y').exists())
+
+        ChaveIdempotencia.objects.update(expira_em=timezone.now())
+        call_command('limpar_chaves_idempotencia', stdout=StringIO())
+        self.assertFalse(ChaveIdempotencia.objects.exists())
+
+
+class ConcorrenciaOtimistaTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados(total=5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.usuario)
+        self.peca = Peca.objects.get(codigo='PC0000')
+        self.url = reverse('peca-detail', kwargs={'pk': self.peca.pk})
+
+    def test_gravacao_com_versao_antiga_resulta_em_conflito(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(etag, f'"{self.peca.versao}"')
+
+        response = self.client.patch(self.url, {'observacoes': 'Primeira'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{self.peca.versao + 1}"')
+
+        # Segunda alteração a partir da mesma leitura
+        response = self.client.patch(self.url, {'observacoes': 'Segunda'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 409)
+        response = self.client.post(
+            reverse('peca-ajustar-estoque', kwargs={'pk': self.peca.pk}), {'quantidade_total': 1, 'versao': 1}
+        )
+        self.assertEqual(response.status_code, 409)
+        self.peca.refresh_from_db()
+        self.assertEqual(self.peca.observacoes, 'Primeira')
+        self.assertFalse(MovimentacaoEstoque.objects.filter(peca=self.peca, locacao__isnull=True).exists())
+
+    def test_update_condicional_no_modelo(self):
+        leitura = Peca.objects.get(pk=self.peca.pk)
+        # A reserva de uma locação muda a versão no mesmo UPDATE das quantidades
+        Peca.objects.reservar({self.peca.pk: 1})
+        leitura.quantidade_total = 500
+        with self.assertRaises(ConflitoVersao), CaptureQueriesContext(connection) as consultas, transaction.atomic():
+            leitura.save()
+        atualizacoes = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(atualizacoes), 1)
+        self.assertIn('"versao" = 1', atualizacoes[0])
+
+        locacao = Locacao.objects.filter(status='A').first()
+        versao = locacao.versao
+        response = self.client.post(
+            reverse('locacao-finalizar', kwargs={'pk': locacao.pk}), HTTP_IF_MATCH=f'"{versao}"'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['versao'], versao + 1)
+        with self.assertRaises(ConflitoVersao), transaction.atomic():
+            locacao.save()
+
+
+class NumeracaoLocacaoTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados(total=5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.usuario)
+
+    def criar(self, **dados):
+        return self.client.post(reverse('locacao-list'), {
+            'cliente': Cliente.objects.first().pk,
+            'data_locacao': str(date.today()),
+            'data_previsao_devolucao': str(date.today() + timedelta(days=7)),
+            'itens': [{'peca': Peca.objects.get(codigo='PC0001').pk, 'quantidade': 1}],
+            **dados
+        }, format='json')
+
+    def test_numeros_atribuidos_pelo_servidor(self):
+        # O número enviado pelo cliente é ignorado
+        self.assertEqual(self.criar(numero_locacao=1).data['numero_locacao'], 6)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.criar().data['numero_locacao'], 7)
+        self.assertFalse([q for q in consultas.captured_queries if 'MAX(' in q['sql']])
+
+        # Uma criação desfeita devolve o número para a sequência
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Locacao.objects.create(
+                cliente=Cliente.objects.first(), data_locacao=date.today(), data_previsao_devolucao=date.today()
+            )
+            Cliente.objects.create(cpf_cnpj=Cliente.objects.first().cpf_cnpj)
+        self.assertEqual(SequenciaNumeracao.objects.reservar(SEQUENCIA_LOCACAO, 10), 8)
+        self.assertEqual(self.criar().data['numero_locacao'], 18)
+
+
+class ArquivamentoTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados(total=10)
+        antiga = date.today() - timedelta(days=400)
+        Locacao.objects.filter(numero_locacao__gte=7).update(
+            status='F', data_locacao=antiga, data_previsao_devolucao=antiga, data_devolucao=antiga
+        )
+        ajuste = MovimentacaoEstoque.objects.create(
+            peca=Peca.objects.get(codigo='PC0000'), tipo_movimentacao='E', quantidade=5, motivo='Ajuste',
+            usuario=cls.usuario
+        )
+        MovimentacaoEstoque.objects.filter(pk=ajuste.pk).update(data_movimentacao=timezone.now() - timedelta(days=400))
+        resumos.reconstruir()
+        cls.cliente = Cliente.objects.get(nome='Cliente 0')
+
+    def setUp(self):
+        self.client.force_authenticate(self.usuario)
+
+    def test_arquivamento_com_leitura_do_arquivo(self):
+        url = reverse('cliente-historico-locacoes', kwargs={'pk': self.cliente.pk})
+        historico = self.client.get(url).data
+        saldo = saldo_razao(0, 10 ** 9)
+        resumo = sorted(ResumoDiarioLocacao.objects.values_list('data', 'status', 'quantidade', 'valor_final'))
+        # criar_dados usa bulk_create, que não indexa
+        search.get_backend().reconstruir(Locacao)
+        self.assertEqual(self.client.get(reverse('locacao-list'), {'search': 'Cliente'}).data['count'], 10)
+
+        totais = arquivar()
+        self.assertEqual(totais, {'locacoes': 4, 'itens': 8, 'movimentacoes': 5})
+        # A exclusão pública (delete) não passa pelos receptores de post_delete:
+        # os resumos diários ficam como estavam e o índice sai em lote
+        self.assertEqual(
+            sorted(ResumoDiarioLocacao.objects.values_list('data', 'status', 'quantidade', 'valor_final')), resumo
+        )
+        self.assertEqual(self.client.get(reverse('locacao-list'), {'search': 'Cliente'}).data['count'], 6)
+        self.assertEqual(Locacao.objects.count(), 6)
+        self.assertEqual(LocacaoArquivada.objects.count(), 4)
+        self.assertEqual(MovimentacaoArquivada.objects.filter(locacao_id__isnull=True).count(), 1)
+        self.assertEqual(arquivar(), {'locacoes': 0, 'itens': 0, 'movimentacoes': 0})
+
+        # As leituras do histórico completo continuam iguais
+        depois = self.client.get(url).data
+        for campo in ('total_locacoes', 'valor_total_gasto', 'locacoes_ativas'):
+            self.assertEqual(depois[campo], historico[campo])
+        self.assertEqual(
+            [locacao['numero_locacao'] for locacao in depois['locacoes']],
+            [locacao['numero_locacao'] for locacao in historico['locacoes']]
+        )
+        self.assertEqual(saldo_razao(0, 10 ** 9), saldo)
+        resumos.reconstruir()
+        self.assertEqual(
+            sorted(ResumoDiarioLocacao.objects.values_list('data', 'status', 'quantidade', 'valor_final')), resumo
+        )
+
+        # A numeração continua depois do maior número, mesmo arquivado
+        self.assertEqual(SequenciaNumeracao.objects.reservar(SEQUENCIA_LOCACAO), 11)
+
+
+class ReplicaTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados(total=5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.usuario)
+        # Réplica "configurada" com os dados do principal; dentro do TestCase as
+        # leituras continuam no principal, pois estão em uma transação
+        replica = mock.patch.dict(connections.settings, {ALIAS_REPLICA: connection.settings_dict})
+        replica.start()
+        self.addCleanup(replica.stop)
+
+    def test_roteador(self):
+        roteador = ReplicaRouter()
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            self.assertIsNone(roteador.db_for_read(Peca))
+            with usar_replica():
+                self.assertEqual(roteador.db_for_read(Peca), ALIAS_REPLICA)
+                self.assertEqual(roteador.db_for_write(Peca), 'default')
+        with usar_replica():
+            # Dentro de uma transação a leitura fica no principal
+            self.assertIsNone(roteador.db_for_read(Peca))
+
+    def test_acoes_de_leitura_e_fixacao_apos_gravacao(self):
+        lidos = []
+        original = ReplicaRouter.db_for_read
+
+        def registrar(roteador, model, **hints):
+            lidos.append(lendo_da_replica())
+            return original(roteador, model, **hints)
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', registrar):
+            self.client.get(reverse('locacao-ativas'))
+            self.assertTrue(lidos and all(lidos))
+
+            peca = Peca.objects.get(codigo='PC0000')
+            response = self.client.post(
+                reverse('peca-ajustar-estoque', kwargs={'pk': peca.pk}), {'quantidade_total': 120}
+            )
+            self.assertEqual(response.cookies[COOKIE_PRIMARIO]['max-age'], 10)
+
+            # Logo após gravar, o mesmo cliente lê do principal
+            lidos.clear()
+            self.client.get(reverse('locacao-ativas'))
+            self.assertTrue(lidos and not any(lidos))
+
+
+class PrecificacaoTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_dados(total=5)
+        # Tipo 1 com faixas por período; Tipo 0 e Tipo 2 sem faixas
+        TipoPeca.objects.filter(nome='Tipo 1').update(
+            valor_diaria=Decimal('10.00'), valor_semanal=Decimal('50.00'), valor_mensal=Decimal('150.00')
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.usuario)
+
+    def carrinho(self, dias, quantidades):
+        return {
+            'cliente': Cliente.objects.first().pk,
+            'data_locacao': str(date.today()),
+            'data_previsao_devolucao': str(date.today() + timedelta(days=dias)),
+            'itens': [
+                {'peca': Peca.objects.get(codigo=codigo).pk, 'quantidade': quantidade}
+                for codigo, quantidade in quantidades.items()
+            ],
+        }
+
+    def test_faixas_por_periodo(self):
+        faixas = (Decimal('12.00'), Decimal('10.00'), Decimal('50.00'), Decimal('150.00'))
+        self.assertEqual(
+            [valor_unitario(dias, *faixas) for dias in (1, 3, 6, 7, 10, 25, 30, 40)],
+            [Decimal(valor) for valor in ('10.00', '30.00', '50.00', '50.00', '80.00', '150.00', '150.00', '230.00')]
+        )
+        # Sem diária, a semana cobre os dias avulsos; sem faixas, vale o valor de locação
+        self.assertEqual(valor_unitario(10, Decimal('12.00'), None, Decimal('50.00')), Decimal('100.00'))
+        self.assertEqual(valor_unitario(10, Decimal('12.00')), Decimal('12.00'))
+
+    def test_cotacao_sem_gravacao_igual_a_locacao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            DescontoVolume.objects.create(quantidade_minima=5, percentual=Decimal('10.00'))
+        # PC0000 é do Tipo 0 (R$ 10 por locação) e PC0001 do Tipo 1 (10 dias = R$ 80)
+        carrinho = self.carrinho(10, {'PC0000': 2, 'PC0001': 3})
+        with CaptureQueriesContext(connection) as consultas:
+            cotacao = self.client.post(reverse('locacao-cotacao'), carrinho, format='json')
+        self.assertEqual(cotacao.status_code, 200, cotacao.data)
+        self.assertEqual(len(consultas), 2)
+        self.assertEqual(
+            [(item['codigo'], item['valor_unitario'], item['valor_total_item']) for item in cotacao.data['itens']],
+            [('PC0000', Decimal('10.00'), Decimal('20.00')), ('PC0001', Decimal('80.00'), Decimal('240.00'))]
+        )
+        self.assertEqual(
+            (cotacao.data['valor_total'], cotacao.data['desconto'], cotacao.data['valor_final']),
+            (Decimal('260.00'), Decimal('26.00'), Decimal('234.00'))
+        )
+        self.assertEqual(Locacao.objects.count(), 5)
+
+        locacao = self.client.post(reverse('locacao-list'), {**carrinho, 'desconto': '4.00'}, format='json')
+        self.assertEqual(locacao.status_code, 201, locacao.data)
+        self.assertEqual(
+            (locacao.data['valor_total'], locacao.data['desconto'], locacao.data['valor_final']),
+            ('260.00', '30.00', '230.00')
+        )
+
+        # Abaixo da faixa de volume não há desconto; carrinho inválido responde 400
+        cotacao = self.client.post(reverse('locacao-cotacao'), self.carrinho(10, {'PC0001': 4}), format='json')
+        self.assertEqual(cotacao.data['desconto'], Decimal('0.00'))
+        self.assertEqual(
+            self.client.post(reverse('locacao-cotacao'), {**carrinho, 'itens': []}, format='json').status_code, 400
+        )
+
+    def test_item_avulso_usa_o_periodo_da_locacao(self):
+        locacao = Locacao.objects.first()
+        peca = Peca.objects.get(codigo='PC0004')
+        locacao.data_previsao_devolucao = locacao.data_locacao + timedelta(days=7)
+        item = ItemLocacao(locacao=locacao, peca=peca, quantidade=2)
+        item.save()
+        self.assertEqual(item.valor_total_item, Decimal('100.00'))
+
+    def test_item_mantem_o_preco_acordado(self):
+        locacao = Locacao.objects.first()
+        locacao.data_previsao_devolucao = locacao.data_locacao + timedelta(days=7)
+        item = ItemLocacao.objects.create(locacao=locacao, peca=Peca.objects.get(codigo='PC0004'), quantidade=2)
+        self.assertEqual((item.valor_unitario, item.valor_total_item), (Decimal('50.00'), Decimal('100.00')))
+
+        # A tabela muda depois da locação: salvar o item sem mudar a quantidade não o reprecifica
+        TipoPeca.objects.filter(nome='Tipo 1').update(valor_semanal=Decimal('70.00'))
+        item = ItemLocacao.objects.get(pk=item.pk)
+        item.observacoes = 'Conferido'
+        item.save()
+        response = self.client.get(reverse('itemlocacao-detail', kwargs={'pk': item.pk}))
+        self.assertEqual(
+            (response.data['valor_unitario'], response.data['valor_total_item']), ('50.00', '100.00')
+        )
+
+        item.locacao.data_previsao_devolucao = item.locacao.data_locacao + timedelta(days=7)
+        item.quantidade = 3
+        item.save()
+        self.assertEqual((item.valor_unitario, item.valor_total_item), (Decimal('70.00'), Decimal('210.00')))
+
+
+class AdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        criar_dados(total=20)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_listagens_sem_n_mais_1_e_com_contagem_estimada(self):
+        for model in (Peca, Cliente, Locacao, ItemLocacao, MovimentacaoEstoque):
+            url = reverse(f'admin:main_{model._meta.model_name}_changelist')
+            with self.subTest(model=model.__name__):
+                consultas = []
+                for por_pagina in (1, 20):
+                    with mock.patch.object(admin.ModelAdmin, 'list_per_page', por_pagina):
+                        with CaptureQueriesContext(connection) as pagina:
+                            self.assertEqual(self.client.get(url).status_code, 200)
+                    consultas.append(len(pagina))
+                self.assertEqual(consultas[0], consultas[1])
+
+        # Os resultados do autocomplete já trazem as relações usadas no __str__
+        for campo in ('locacao', 'peca'):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(reverse('admin:autocomplete'), {
+                    'app_label': 'main', 'model_name': 'itemlocacao', 'field_name': campo,
+                })
+            self.assertEqual(len(response.json()['results']), 20)
+            self.assertLessEqual(len(consultas), 5)
+
+        # Com as estatísticas do banco, a listagem sem filtros não conta a tabela
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        url = reverse('admin:main_movimentacaoestoque_changelist')
+        with mock.patch('main.admin.LIMITE_CONTAGEM_EXATA', 0), CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 20)
+        self.assertFalse([q for q in consultas.captured_queries if 'COUNT(*)' in q['sql']])
+
+    def test_acoes_em_lote(self):
+        url = reverse('admin:main_locacao_changelist')
+        locacoes = list(Locacao.objects.values_list('pk', flat=True)[:3])
+        self.client.post(url, {'action': 'finalizar', '_selected_action': locacoes})
+        self.assertEqual(Locacao.objects.filter(status='F').count(), 3)
+        self.assertEqual(MovimentacaoEstoque.objects.filter(motivo='Devolução de locação').count(), 6)
+
+        url = reverse('admin:main_peca_changelist')
+        pecas = list(Peca.objects.values_list('pk', flat=True)[:2])
+        antes = dict(Peca.objects.filter(pk__in=pecas).values_list('pk', 'quantidade_disponivel'))
+        self.client.post(url, {'action': 'ajustar_estoque', '_selected_action': pecas, 'quantidade': -200})
+        self.assertFalse(MovimentacaoEstoque.objects.filter(motivo='Ajuste manual').exists())
+        self.client.post(url, {'action': 'ajustar_estoque', '_selected_action': pecas, 'quantidade': 5})
+        self.assertEqual(
+            dict(Peca.objects.filter(pk__in=pecas).values_list('pk', 'quantidade_disponivel')),
+            {pk: disponivel + 5 for pk, disponivel in antes.items()}
+        )
+        self.assertEqual(MovimentacaoEstoque.objects.filter(motivo='Ajuste manual', tipo_movimentacao='E').count(), 2)
@@ -0,0 +1,103 @@
+"""
+Versões dos modelos (instante da última alteração), usadas para identificar e
+invalidar as respostas em cache e para responder 304 às requisições condicionais.
+
+As versões ficam no cache settings.VERSOES_CACHE ('default' se não definido).
+Todos os processos que servem a API precisam enxergar o mesmo cache de
+versões: com o LocMemCache (cache em memória de cada processo) a invalidação
+só vale para o processo que fez a gravação, e os demais continuam respondendo
+com o cache e o ETag antigos. Em implantações com mais de um processo, aponte
+VERSOES_CACHE para um cache compartilhado (FileBasedCache, Redis, Memcached).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .replicas import lendo_da_replica
+
+
+# Tempo (em segundos) que uma resposta versionada fica em cache; a versão já
+# garante que ela não fica desatualizada, o limite só libera memória
+CACHE_RESPOSTAS_TIMEOUT = 60 * 60
+
+
+def _chave_versao(model):
+    return f'versao:{model._meta.label_lower}'
+
+
+def _cache_versoes():
+    return caches[getattr(settings, 'VERSOES_CACHE', 'default')]
+
+
+def obter_versoes(*models):
+    """
+    Versão atual (instante da última alteração, em nanossegundos) de cada modelo
+    """
+    cache_versoes = _cache_versoes()
+    chaves = [_chave_versao(model) for model in models]
+    versoes = cache_versoes.get_many(chaves)
+    for chave in chaves:
+        if chave not in versoes:
+            # Versão desconhecida (cache novo ou expirado): começa agora
+            cache_versoes.add(chave, time.time_ns(), None)
+            versoes[chave] = cache_versoes.get(chave)
+    return [versoes[chave] for chave in chaves]
+
+
+def incrementar_versao(*models):
+    """
+    Marca os modelos como alterados assim que a transação atual for confirmada
+    """
+    def incrementar():
+        cache_versoes = _cache_versoes()
+        for model in models:
+            chave = _chave_versao(model)
+            cache_versoes.set(chave, max(time.time_ns(), (cache_versoes.get(chave) or 0) + 1), None)
+
+    transaction.on_commit(incrementar)
+
+
+def resposta_versionada(*models):
+    """
+    Guarda em cache os dados da resposta de uma ação de leitura, enquanto a versão
+    dos modelos dos quais ela depende não mudar, e responde às requisições
+    condicionais (If-None-Match/If-Modified-Since) com 304 Not Modified
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def wrapper(self, request, *args, **kwargs):
+            versoes = obter_versoes(*models)
+            assinatura = ':'.join([
+                request.get_full_path(), request.accepted_renderer.format, *map(str, versoes)
+            ])
+            etag = quote_etag(hashlib.md5(assinatura.encode()).hexdigest())
+            last_modified = max(versoes) // 1_000_000_000
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                chave = f'resposta:{etag}'
+                dados = cache.get(chave)
+                if dados is not None:
+                    response = Response(dados)
+                else:
+                    response = metodo(self, request, *args, **kwargs)
+                    if response.status_code != 200 or lendo_da_replica():
+                        # Os dados lidos da réplica podem ser anteriores à versão atual:
+                        # não são guardados nem identificados por ela
+                        return response
+                    cache.set(chave, response.data, CACHE_RESPOSTAS_TIMEOUT)
+
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # O navegador pode guardar a resposta, mas deve revalidá-la a cada uso
+            response['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorador
@@ -0,0 +1,74 @@
+"""
+Versões assíncronas (ASGI) das ações de relatório e do dashboard.
+
+As views síncronas do DRF rodam, no ASGI, em uma única thread compartilhada;
+um relatório demorado ali atrasa todas as outras requisições. Estas views
+liberam o event loop enquanto as consultas do relatório rodam em paralelo,
+cada uma em uma thread do pool com conexão própria (ver Relatorio.aexecutar).
+Respondem o mesmo JSON das ações equivalentes em /api/ e, como elas, leem
+da réplica quando configurada (main/replicas.py).
+"""
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.utils.encoders import JSONEncoder
+
+from .controller import DASHBOARD_CACHE_TIMEOUT
+from .replicas import leitura_replica
+from .relatorios import (
+    intervalo_relatorio, EstatisticasTipos, RelatorioEstoque, RelatorioFinanceiro, RelatorioMovimentacoes, Dashboard
+)
+
+
+def resposta(dados, status=200):
+    # Mesmo encoder das respostas do DRF, para o JSON ser idêntico ao das views síncronas
+    return JsonResponse(dados, status=status, encoder=JSONEncoder, safe=False)
+
+
+@require_GET
+@leitura_replica
+async def estatisticas_tipos(request):
+    return resposta(await EstatisticasTipos().aexecutar())
+
+
+@require_GET
+@leitura_replica
+async def relatorio_estoque(request):
+    return resposta(await RelatorioEstoque().aexecutar())
+
+
+@require_GET
+@leitura_replica
+async def relatorio_financeiro(request):
+    try:
+        parametros = intervalo_relatorio(request.GET)
+    except ValueError as e:
+        return resposta({'error': str(e)}, status=400)
+    return resposta(await RelatorioFinanceiro(*parametros).aexecutar())
+
+
+@require_GET
+@leitura_replica
+async def relatorio_movimentacoes(request):
+    try:
+        parametros = intervalo_relatorio(request.GET)
+    except ValueError as e:
+        return resposta({'error': str(e)}, status=400)
+    return resposta(await RelatorioMovimentacoes(*parametros).aexecutar())
+
+
+@require_GET
+@leitura_replica
+async def dashboard(request):
+    try:
+        periodo = int(request.GET.get('periodo', '30'))  # dias
+    except ValueError:
+        return resposta({'error': 'Período deve ser um número inteiro de dias'}, status=400)
+
+    # Mesma chave de cache da view síncrona
+    cache_key = f'dashboard:{periodo}'
+    dados = await cache.aget(cache_key)
+    if dados is None:
+        dados = await Dashboard(periodo).aexecutar()
+        await cache.aset(cache_key, dados, DASHBOARD_CACHE_TIMEOUT)
+    return resposta(dados)